@@ -0,0 +1,126 @@
+from django.conf import settings
+from django.contrib import auth
+from django.contrib.auth import HASH_SESSION_KEY, SESSION_KEY
+from django.core.cache import cache
+
+from . import etags
+
+
+def cache_timeout():
+    """Seconds a session's user may be served from the cache; 0 turns the cache off"""
+    return getattr(settings, "NETWORK_AUTH_CACHE_TIMEOUT", 300)
+
+
+def summary(user):
+    """The user data returned by the auth endpoints, from the stored counters"""
+    return {
+        "id": user.id,
+        "username": user.username,
+        "email": user.email,
+        "following_count": user.following_count,
+        "follower_count": user.follower_count,
+    }
+
+
+def cache_key(session_key):
+    return f"network:auth:{session_key}"
+
+
+def scopes(user_id):
+    # Follows, unfollows and saves of the user bump its scope
+    return [etags.GLOBAL_SCOPE, f"user:{user_id}"]
+
+
+def entry(request, user, versions):
+    return {"user": user, "hash": request.session.get(HASH_SESSION_KEY), "versions": versions}
+
+
+def is_fresh(request, entry, user_id, versions):
+    """Whether a cached entry still belongs to the session's user and holds their current row"""
+    return (
+        str(entry["user"].pk) == str(user_id)
+        and entry["hash"] == request.session.get(HASH_SESSION_KEY)
+        and entry["versions"] == versions
+    )
+
+
+def remember(request, user):
+    """Cache the user logged in to the request's session"""
+    session_key = request.session.session_key
+    if session_key and cache_timeout():
+        versions = etags.get_versions(scopes(user.pk))
+        cache.set(cache_key(session_key), entry(request, user, versions), timeout=cache_timeout())
+
+
+async def aremember(request, user):
+    """Async counterpart of ``remember``"""
+    session_key = request.session.session_key
+    if session_key and cache_timeout():
+        versions = await etags.aget_versions(scopes(user.pk))
+        await cache.aset(
+            cache_key(session_key), entry(request, user, versions), timeout=cache_timeout()
+        )
+
+
+def recall(request):
+    """
+    The cached user of the request's session, read without querying the user table
+    The session itself is still loaded, so expired and logged out sessions never hit.
+    :return: The user, or None when it must be loaded
+    """
+    user_id = request.session.get(SESSION_KEY)
+    session_key = request.session.session_key
+    if not session_key or user_id is None or not cache_timeout():
+        return None
+
+    cached = cache.get(cache_key(session_key))
+    if cached is None or not is_fresh(
+        request, cached, user_id, etags.get_versions(scopes(cached["user"].pk))
+    ):
+        return None
+    return cached["user"]
+
+
+async def arecall(request):
+    """Async counterpart of ``recall``"""
+    user_id = await request.session.aget(SESSION_KEY)
+    session_key = request.session.session_key
+    if not session_key or user_id is None or not cache_timeout():
+        return None
+
+    cached = await cache.aget(cache_key(session_key))
+    if cached is None or not is_fresh(
+        request, cached, user_id, await etags.aget_versions(scopes(cached["user"].pk))
+    ):
+        return None
+    return cached["user"]
+
+
+def get_user(request):
+    """
+    ``request.user`` from the session's cache entry, else as Django loads it
+    Django's ``get_user`` also verifies the session against the password hash, so a
+    password change, which bumps the user's scope, logs other sessions out as before.
+    """
+    user = recall(request)
+    if user is None:
+        user = auth.get_user(request)
+        if user.is_authenticated:
+            remember(request, user)
+    return user
+
+
+async def aget_user(request):
+    """Async counterpart of ``get_user``"""
+    user = await arecall(request)
+    if user is None:
+        user = await auth.aget_user(request)
+        if user.is_authenticated:
+            await aremember(request, user)
+    return user
+
+
+def forget(request):
+    """Drop the cached user of the request's session, e.g. on logout"""
+    if request.session.session_key:
+        cache.delete(cache_key(request.session.session_key))
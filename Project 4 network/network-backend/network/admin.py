@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import User, Post, Following, Like, Comment
+from .models import User, Post, Following, Like, Comment, TimelineEntry
 
 # Register your models here
 admin.site.register(User)
@@ -7,3 +7,4 @@ admin.site.register(Post)
 admin.site.register(Following)
 admin.site.register(Like)
 admin.site.register(Comment)
+admin.site.register(TimelineEntry)
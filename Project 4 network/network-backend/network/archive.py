@@ -0,0 +1,194 @@
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from . import etags
+from .management.commands.rebuild_counters import count_of
+from .models import ArchivedComment, ArchivedPost, Comment, Like, Post, TimelineEntry
+
+
+def retention_days():
+    """Days soft-deleted posts and comments stay in place before they may be archived"""
+    return getattr(settings, "NETWORK_ARCHIVE_RETENTION_DAYS", 30)
+
+
+def cutoff(days=None):
+    """Rows soft-deleted before this time are past the retention period"""
+    return timezone.now() - timedelta(days=retention_days() if days is None else days)
+
+
+def archive_posts(before, batch_size=500, pause=0):
+    """
+    Move posts soft-deleted before ``before`` and all their comments into the archive
+    A batch of posts is emptied first: its likes and timeline entries are deleted and its
+    comments archived ``batch_size`` rows per transaction, so a viral post never holds a
+    lock for its whole cascade. Each of those transactions locks the posts and empties only
+    those still deleted, and the emptied posts are archived in one short transaction.
+    :param before: Archive posts whose ``deleted_at`` is earlier than this
+    :param batch_size: Number of posts, and of rows of their cascade, per transaction
+    :param pause: Seconds to sleep between batches, yielding to other writers
+    :return: Tuple of (posts archived, comments archived with them)
+    """
+    posts = comments = 0
+    while True:
+        # Oldest first, seeking post_deleted_idx; archived rows leave the index
+        deleted_at = dict(
+            Post.objects.filter(is_deleted=True, deleted_at__lt=before)
+            .order_by("deleted_at", "id")
+            .values_list("pk", "deleted_at")[:batch_size]
+        )
+        if not deleted_at:
+            return posts, comments
+
+        for model in (Like, TimelineEntry):
+            delete_rows(model, deleted_at, batch_size, pause)
+        comments += archive_post_comments(deleted_at, batch_size, pause)
+
+        with transaction.atomic():
+            batch = lock_deleted(deleted_at)
+            ArchivedPost.objects.bulk_create(
+                [
+                    ArchivedPost(
+                        id=post.pk,
+                        content=post.content,
+                        created_by_id=post.created_by_id,
+                        created_at=post.created_at,
+                        updated_at=post.updated_at,
+                        deleted_at=post.deleted_at,
+                        likes_count=post.likes_count,
+                        comments_count=post.comments_count,
+                    )
+                    for post in batch
+                ]
+            )
+            # Only rows added since the posts were emptied are left to cascade; the
+            # post_delete signal retires each post's ETags and trending entry once
+            Post.objects.filter(pk__in=[post.pk for post in batch]).delete()
+
+            # A post restored by hand meanwhile stays live, without what was emptied
+            # before the restore; its counters are recounted from what is left
+            restored = set(deleted_at) - {post.pk for post in batch}
+            if restored:
+                Post.objects.filter(pk__in=restored).update(
+                    likes_count=count_of(Like.objects.all(), "post"),
+                    comments_count=count_of(Comment.objects.filter(is_deleted=False), "post"),
+                )
+
+        # The deletes and recounts above sent no signals
+        etags.bump(*(f"comments:{post_id}" for post_id in deleted_at))
+        if restored:
+            etags.bump("posts", *(f"post:{post_id}" for post_id in restored))
+        posts += len(batch)
+        if pause:
+            time.sleep(pause)
+
+
+def lock_deleted(post_ids):
+    """
+    Lock the given posts and return those still soft-deleted
+    Restoring a post waits for the lock, and after it the post's rows are left alone.
+    """
+    return list(Post.objects.select_for_update().filter(pk__in=post_ids, is_deleted=True))
+
+
+def delete_rows(model, post_ids, batch_size, pause=0):
+    """
+    Delete the rows of ``model`` pointing at the posts still deleted, ``batch_size`` at a time
+    ``QuerySet.delete()`` would load every row to send its post_delete signal.
+    """
+    while True:
+        with transaction.atomic():
+            post_ids = [post.pk for post in lock_deleted(post_ids)]
+            ids = list(
+                model.objects.filter(post_id__in=post_ids)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not ids:
+                return
+            delete_ids(model, ids)
+
+        if pause:
+            time.sleep(pause)
+
+
+def delete_ids(model, ids):
+    """Delete rows by primary key in one statement, without signals or cascades"""
+    quote = connection.ops.quote_name
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {quote(model._meta.db_table)} WHERE {quote(model._meta.pk.column)} "
+            f"IN ({', '.join(['%s'] * len(ids))})",
+            ids,
+        )
+
+
+def archive_post_comments(deleted_at, batch_size, pause=0):
+    """
+    Move every comment of the posts still deleted into the archive, a batch per transaction
+    :param deleted_at: Dict of post id to when the post was deleted
+    :return: Number of comments archived
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            post_ids = [post.pk for post in lock_deleted(deleted_at)]
+            batch = list(Comment.objects.filter(post_id__in=post_ids).order_by("pk")[:batch_size])
+            if not batch:
+                return archived
+
+            # Comments still visible when their post was deleted went with it
+            ArchivedComment.objects.bulk_create(
+                [
+                    archived_comment(comment, comment.deleted_at or deleted_at[comment.post_id])
+                    for comment in batch
+                ]
+            )
+            delete_ids(Comment, [comment.pk for comment in batch])
+
+        archived += len(batch)
+        if pause:
+            time.sleep(pause)
+
+
+def archive_comments(before, batch_size=500, pause=0):
+    """
+    Move comments soft-deleted before ``before`` into the archive, a batch per transaction
+    :param before: Archive comments whose ``deleted_at`` is earlier than this
+    :param batch_size: Number of comments per transaction
+    :param pause: Seconds to sleep between batches, yielding to other writers
+    :return: Number of comments archived
+    """
+    archived = 0
+    while True:
+        with transaction.atomic():
+            batch = list(
+                Comment.objects.select_for_update()
+                .filter(is_deleted=True, deleted_at__lt=before)
+                .order_by("deleted_at", "id")[:batch_size]
+            )
+            if not batch:
+                return archived
+
+            ArchivedComment.objects.bulk_create(
+                [archived_comment(comment, comment.deleted_at) for comment in batch]
+            )
+            Comment.objects.filter(pk__in=[comment.pk for comment in batch]).delete()
+
+        archived += len(batch)
+        if pause:
+            time.sleep(pause)
+
+
+def archived_comment(comment, deleted_at):
+    return ArchivedComment(
+        id=comment.pk,
+        post_id=comment.post_id,
+        content=comment.content,
+        created_by_id=comment.created_by_id,
+        created_at=comment.created_at,
+        deleted_at=deleted_at,
+    )
@@ -0,0 +1,5 @@
+from . import async_views
+from .urls import network_patterns
+
+# URLconf with the read endpoints always served by ``async_views``
+urlpatterns = network_patterns(async_views)
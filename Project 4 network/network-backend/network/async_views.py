@@ -0,0 +1,398 @@
+from asgiref.sync import sync_to_async
+from django.db import DatabaseError
+from django.http import JsonResponse
+
+from . import etags, follows, suggestions, timeline, trending, views
+from .etags import acondition
+from .feed import FeedOptionsError, get_feed_options
+from .models import NOT_DELETED, Comment, Following, Post, User
+from .pagination import (
+    PaginationError,
+    apaginate,
+    encode_cursor,
+    get_page_params,
+    get_page_size,
+    get_since_params,
+)
+from .streaming import astream_posts
+
+# Native async variants of the read endpoints, routed instead of ``views`` when
+# NETWORK_ASYNC_VIEWS is set. Writes stay synchronous and run in the thread pool.
+
+
+@acondition(etags.aposts_etag)
+async def posts(request):
+
+    # Create new post
+    if request.method != "GET":
+        return await sync_to_async(views.posts)(request)
+
+    try:
+        cursor, page_size = get_page_params(request.GET)
+        options = get_feed_options(request.GET)
+    except (PaginationError, FeedOptionsError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        user = await request.auser()
+        posts = Post.objects.select_related("created_by").filter(NOT_DELETED)
+
+        # Streaming sends every post past the cursor instead of one page
+        if options.stream:
+            return astream_posts(
+                {"message": "Get posts successfully."}, posts, cursor, user, options
+            )
+
+        page = await apaginate(posts, cursor, page_size)
+
+        return JsonResponse(
+            {
+                "message": "Get posts successfully.",
+                "posts": await Post.aserialize_many(
+                    page.items,
+                    user=user,
+                    latest_comments=options.latest_comments,
+                    fields=options.fields,
+                ),
+                "next": page.next,
+                "prev": page.prev,
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse(
+            {"error": "Database operation error, please try again later."},
+            status=500,
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@acondition(etags.apost_etag)
+async def post_detail(request, post_id):
+
+    # Edit or soft delete post
+    if request.method != "GET":
+        return await sync_to_async(views.post_detail)(request, post_id)
+
+    try:
+        options = get_feed_options(request.GET)
+    except FeedOptionsError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        post = await Post.objects.select_related("created_by").aget(pk=post_id)
+
+        if post.is_deleted:
+            return JsonResponse({"error": "This post has been deleted by the author."}, status=410)
+
+        [serialized] = await Post.aserialize_many(
+            [post],
+            user=await request.auser(),
+            latest_comments=options.latest_comments,
+            fields=options.fields,
+        )
+        return JsonResponse(
+            {"message": "Get post successfully.", "post": serialized},
+            status=200,
+        )
+
+    except Post.DoesNotExist:
+        return JsonResponse({"error": "Post not found."}, status=404)
+    except DatabaseError:
+        return JsonResponse(
+            {"error": "Database operation error, please try again later."},
+            status=500,
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@acondition(etags.auser_etag)
+async def user_detail(request, username):
+
+    # Invalid method
+    if request.method != "GET":
+        return await sync_to_async(views.user_detail)(request, username)
+
+    try:
+        cursor, page_size = get_page_params(request.GET)
+        options = get_feed_options(request.GET)
+    except (PaginationError, FeedOptionsError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        viewer = await request.auser()
+        user = await (
+            User.with_is_following(viewer)
+            .only("username", "email", "following_count", "follower_count")
+            .aget(username=username)
+        )
+
+        header = {
+            "username": user.username,
+            "email": user.email,
+            "following_count": user.following_count,
+            "follower_count": user.follower_count,
+            "is_following": user.is_following,
+        }
+
+        posts = Post.objects.select_related("created_by").filter(NOT_DELETED, created_by=user)
+        if options.stream:
+            return astream_posts(
+                {"message": "Get user detail successfully.", "user": header},
+                posts,
+                cursor,
+                viewer,
+                options,
+            )
+
+        page = await apaginate(posts, cursor, page_size)
+
+        return JsonResponse(
+            {
+                "message": "Get user detail successfully.",
+                "user": header,
+                "posts": (
+                    await Post.aserialize_many(
+                        page.items,
+                        user=viewer,
+                        latest_comments=options.latest_comments,
+                        fields=options.fields,
+                    )
+                    if page.items
+                    else None
+                ),
+                "next": page.next,
+                "prev": page.prev,
+            },
+            status=200,
+        )
+
+    except User.DoesNotExist:
+        return JsonResponse({"error": "User not found."}, status=404)
+    except DatabaseError:
+        return JsonResponse({"error": "Database operation failed."}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
+
+
+@acondition(etags.afollows_etag)
+async def user_followers(request, username):
+    return await follow_list(request, username, "followers")
+
+
+@acondition(etags.afollows_etag)
+async def user_following(request, username):
+    return await follow_list(request, username, "following")
+
+
+async def follow_list(request, username, relation):
+
+    # Invalid method
+    if request.method != "GET":
+        return await sync_to_async(views.follow_list)(request, username, relation)
+
+    try:
+        cursor, page_size = get_page_params(request.GET)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        user_id = await User.objects.filter(username=username).values_list("pk", flat=True).afirst()
+        if user_id is None:
+            return JsonResponse({"error": "User not found."}, status=404)
+
+        viewer = await request.auser()
+        page = await apaginate(follows.connections(relation, user_id, viewer), cursor, page_size)
+
+        return JsonResponse(
+            {
+                "message": f"Get {relation} successfully.",
+                "users": [follows.serialize_connection(row, relation) for row in page.items],
+                "next": page.next,
+                "prev": page.prev,
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse({"error": "Database operation failed."}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
+
+
+async def trending_posts(request):
+
+    # Invalid method
+    if request.method != "GET":
+        return await sync_to_async(views.trending_posts)(request)
+
+    try:
+        count = get_page_size(request.GET)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return JsonResponse(
+            {
+                "message": "Get trending posts successfully.",
+                "posts": await trending.aload(await request.auser(), count),
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse(
+            {"error": "Database operation error, please try again later."},
+            status=500,
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+async def suggested_users(request):
+    viewer = await request.auser()
+
+    # Check if user is authenticated
+    if not viewer.is_authenticated:
+        return JsonResponse({"error": "You must be logged in to view suggestions."}, status=401)
+
+    # Invalid method
+    if request.method != "GET":
+        return await sync_to_async(views.suggested_users)(request)
+
+    try:
+        count = get_page_size(request.GET)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return JsonResponse(
+            {
+                "message": "Get suggestions successfully.",
+                "users": [
+                    suggestions.serialize(suggestion)
+                    async for suggestion in suggestions.for_user(viewer, count)
+                ],
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse({"error": "Database operation failed."}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
+
+
+async def posts_following(request):
+    user = await request.auser()
+
+    # Check if user is authenticated
+    if not user.is_authenticated:
+        return JsonResponse(
+            {"error": "You must be logged in to view following posts, follow/unfollow users."},
+            status=401,
+        )
+
+    # Not GET method
+    if request.method != "GET":
+        return JsonResponse({"error": "Only accept GET method."}, status=400)
+
+    try:
+        cursor, page_size = get_page_params(request.GET)
+        options = get_feed_options(request.GET)
+    except (PaginationError, FeedOptionsError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        # The stream reads followed authors directly, which the timeline only mirrors
+        if timeline.is_enabled() and not options.stream:
+            posts = Post.objects.select_related("created_by")
+            page = await timeline.ahome_page(user, posts, cursor, page_size)
+        else:
+            following_users = Following.objects.filter(follower=user).values_list(
+                "following", flat=True
+            )
+
+            posts = Post.objects.select_related("created_by").filter(
+                NOT_DELETED, created_by__in=following_users
+            )
+            if options.stream:
+                return astream_posts(
+                    {"message": "Get following posts successfully."}, posts, cursor, user, options
+                )
+
+            page = await apaginate(posts, cursor, page_size)
+
+        return JsonResponse(
+            {
+                "message": "Get following posts successfully.",
+                "posts": await Post.aserialize_many(
+                    page.items,
+                    user=user,
+                    latest_comments=options.latest_comments,
+                    fields=options.fields,
+                ),
+                "next": page.next,
+                "prev": page.prev,
+            },
+            status=200,
+        )
+    except DatabaseError:
+        return JsonResponse(
+            {"error": "Database operation error, please try again later."},
+            status=500,
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+@acondition(etags.acomments_etag)
+async def comments(request, post_id):
+
+    # Comment a post
+    if request.method != "GET":
+        return await sync_to_async(views.comments)(request, post_id)
+
+    # Check if post exists
+    if not await Post.objects.filter(pk=post_id).aexists():
+        return JsonResponse({"error": "Post not found."}, status=404)
+
+    try:
+        # Polling clients only ask for comments newer than the latest one they have
+        if request.GET.get("since"):
+            cursor, page_size = get_since_params(request.GET)
+        else:
+            cursor, page_size = get_page_params(request.GET)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        comments = Comment.objects.select_related("created_by").filter(NOT_DELETED, post_id=post_id)
+        page = await apaginate(comments, cursor, page_size)
+
+        if page.items:
+            latest = encode_cursor(page.items[0], "prev")
+        else:
+            latest = request.GET.get("since")
+
+        return JsonResponse(
+            {
+                "message": "Get comments successfully.",
+                "comments": [comment.serialize() for comment in page.items],
+                "next": page.next,
+                "prev": page.prev,
+                "latest": latest,
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse(
+            {"error": "Database operation error, please try again later."},
+            status=500,
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
@@ -0,0 +1,43 @@
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.checks import Error, Tags, register
+from django.db import connections
+
+from . import like_buffer, search
+
+
+@register(Tags.caches)
+def check_like_buffer_cache(app_configs, **kwargs):
+    """The like buffer must live in a cache every worker and ``flush_likes`` can see"""
+    if not getattr(settings, "NETWORK_LIKE_BUFFER_ENABLED", False):
+        return []
+    if isinstance(like_buffer.get_cache(), LocMemCache):
+        return [
+            Error(
+                "The like buffer needs a shared cache that does not evict, not LocMemCache.",
+                hint="Point NETWORK_LIKE_BUFFER_CACHE at e.g. Redis with noeviction.",
+                id="network.E001",
+            )
+        ]
+    return []
+
+
+@register(Tags.database)
+def check_search_triggers(app_configs, databases=None, **kwargs):
+    """The SQLite search index must still have the triggers keeping it in sync"""
+    errors = []
+    for alias in databases or []:
+        missing = search.missing_triggers(connections[alias])
+        if missing:
+            errors.append(
+                Error(
+                    f"The search index of database {alias!r} lost its triggers: "
+                    f"{', '.join(missing)}. New and edited posts and comments are not found.",
+                    hint=(
+                        "A migration rebuilt the table; drop and recreate the index around it "
+                        "with search.drop_index and search.create_index, as 0011 does."
+                    ),
+                    id="network.E002",
+                )
+            )
+    return errors
@@ -0,0 +1,194 @@
+import hashlib
+import uuid
+from functools import wraps
+
+from django.core.cache import cache
+from django.db import transaction
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from .models import User
+
+# Seconds a version stamp may live in the cache; an expired stamp only costs one full response
+CACHE_TIMEOUT = 86400  # 24 hours in seconds
+
+# Bumped when data outside the tracked scopes changes, e.g. by rebuild_counters
+GLOBAL_SCOPE = "all"
+
+
+def cache_key(scope):
+    return f"network:version:{scope}"
+
+
+def get_versions(scopes):
+    """
+    Fetch the version stamps of several scopes, issuing new ones for missing scopes
+    :param scopes: Names such as "posts", "post:1" or "user:1"
+    :return: List of stamps in the order of ``scopes``
+    """
+    keys = [cache_key(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+
+    # Stamps are random so an evicted scope never reissues a stamp a client has seen
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=CACHE_TIMEOUT)
+        versions.update(missing)
+
+    return [versions[key] for key in keys]
+
+
+async def aget_versions(scopes):
+    """Async counterpart of ``get_versions``"""
+    keys = [cache_key(scope) for scope in scopes]
+    versions = await cache.aget_many(keys)
+
+    missing = {key: uuid.uuid4().hex for key in keys if key not in versions}
+    if missing:
+        await cache.aset_many(missing, timeout=CACHE_TIMEOUT)
+        versions.update(missing)
+
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Retire the version stamps of scopes now and again once the surrounding transaction commits"""
+    keys = [cache_key(scope) for scope in scopes]
+    cache.delete_many(keys)
+
+    # A concurrent reader may stamp the old rows before this transaction commits
+    transaction.on_commit(lambda: cache.delete_many(keys))
+
+
+def make_etag(request, *scopes):
+    """
+    Build an ETag for a GET request from version stamps, without loading the response data
+    :param request: Current request; its path, query string and viewer are part of the tag
+    :param scopes: Scopes whose data the response is built from
+    """
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    viewer = request.user.pk if request.user.is_authenticated else None
+    versions = get_versions(viewer_scopes(viewer, scopes))
+    return digest(request, viewer, versions)
+
+
+async def amake_etag(request, *scopes):
+    """Async counterpart of ``make_etag``"""
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    user = await request.auser()
+    viewer = user.pk if user.is_authenticated else None
+    versions = await aget_versions(viewer_scopes(viewer, scopes))
+    return digest(request, viewer, versions)
+
+
+def viewer_scopes(viewer, scopes):
+    """All scopes a response depends on, including the viewer's own"""
+    # Viewer-specific flags such as is_liked and is_following have their own scope
+    if viewer:
+        scopes += (f"viewer:{viewer}",)
+    return [GLOBAL_SCOPE, *scopes]
+
+
+def digest(request, viewer, versions):
+    key = "|".join([request.get_full_path(), str(viewer), *versions])
+    return hashlib.md5(key.encode()).hexdigest()
+
+
+def posts_etag(request):
+    return make_etag(request, "posts")
+
+
+def post_etag(request, post_id):
+    return make_etag(request, f"post:{post_id}")
+
+
+def comments_etag(request, post_id):
+    return make_etag(request, f"comments:{post_id}")
+
+
+def user_etag(request, username):
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    user_id = User.objects.filter(username=username).values_list("pk", flat=True).first()
+    if user_id is None:
+        return None
+
+    # The profile lists the user's posts, so any post change retires its tag too
+    return make_etag(request, "posts", f"user:{user_id}")
+
+
+def follows_etag(request, username):
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    user_id = User.objects.filter(username=username).values_list("pk", flat=True).first()
+    if user_id is None:
+        return None
+
+    # Follows and unfollows on either side bump the user's scope
+    return make_etag(request, f"user:{user_id}")
+
+
+async def aposts_etag(request):
+    return await amake_etag(request, "posts")
+
+
+async def apost_etag(request, post_id):
+    return await amake_etag(request, f"post:{post_id}")
+
+
+async def acomments_etag(request, post_id):
+    return await amake_etag(request, f"comments:{post_id}")
+
+
+async def auser_etag(request, username):
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    user_id = await User.objects.filter(username=username).values_list("pk", flat=True).afirst()
+    if user_id is None:
+        return None
+
+    return await amake_etag(request, "posts", f"user:{user_id}")
+
+
+async def afollows_etag(request, username):
+    if request.method not in ("GET", "HEAD"):
+        return None
+
+    user_id = await User.objects.filter(username=username).values_list("pk", flat=True).afirst()
+    if user_id is None:
+        return None
+
+    return await amake_etag(request, f"user:{user_id}")
+
+
+def acondition(etag_func):
+    """
+    Async counterpart of Django's ``condition`` decorator for coroutine ETag functions
+    ``condition`` calls its ETag function synchronously, which can not touch the
+    database or ``request.user`` from an async view.
+    """
+
+    def decorator(view):
+        @wraps(view)
+        async def inner(request, *args, **kwargs):
+            etag = await etag_func(request, *args, **kwargs)
+            etag = quote_etag(etag) if etag else None
+
+            response = get_conditional_response(request, etag=etag)
+            if response is None:
+                response = await view(request, *args, **kwargs)
+
+            if etag and request.method in ("GET", "HEAD"):
+                response.headers.setdefault("ETag", etag)
+            return response
+
+        return inner
+
+    return decorator
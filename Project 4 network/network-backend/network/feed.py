@@ -0,0 +1,62 @@
+from typing import NamedTuple
+
+MAX_LATEST_COMMENTS = 5
+
+# Values of ``?stream=`` that switch a feed to a streaming response
+STREAM_FORMATS = frozenset({"json", "ndjson"})
+
+# Keys of a serialized feed post that ``?fields=`` may select
+POST_FIELDS = frozenset(
+    {
+        "id",
+        "content",
+        "created_by",
+        "created_at",
+        "updated_at",
+        "is_deleted",
+        "likes_count",
+        "comments_count",
+        "is_liked",
+        "latest_comments",
+    }
+)
+
+
+class FeedOptionsError(ValueError):
+    """Raised when the comments or fields parameters in a request cannot be used"""
+
+
+class FeedOptions(NamedTuple):
+    latest_comments: int
+    fields: frozenset | None
+    stream: str | None = None
+
+
+def get_feed_options(params):
+    """
+    Read ``comments``, ``fields`` and ``stream`` from a request's query parameters
+    :param params: ``request.GET``
+    :return: FeedOptions with the number of latest comments, the selected fields and the
+        streaming format
+    """
+    latest_comments = params.get("comments", 0)
+    try:
+        latest_comments = int(latest_comments)
+    except (TypeError, ValueError):
+        raise FeedOptionsError("Comments must be an integer.")
+
+    if not 0 <= latest_comments <= MAX_LATEST_COMMENTS:
+        raise FeedOptionsError(f"Comments must be between 0 and {MAX_LATEST_COMMENTS}.")
+
+    fields = None
+    if params.get("fields"):
+        fields = frozenset(field.strip() for field in params["fields"].split(",") if field.strip())
+        unknown = sorted(fields - POST_FIELDS)
+        if unknown:
+            raise FeedOptionsError(f"Unknown fields: {', '.join(unknown)}.")
+
+    stream = params.get("stream") or None
+    if stream is not None and stream not in STREAM_FORMATS:
+        raise FeedOptionsError(f"Stream must be one of: {', '.join(sorted(STREAM_FORMATS))}.")
+
+    return FeedOptions(latest_comments=latest_comments, fields=fields, stream=stream)
@@ -0,0 +1,170 @@
+from typing import NamedTuple
+
+from django.db import transaction
+from django.db.models import Exists, F, OuterRef, Value
+
+from . import etags, suggestions, timeline
+from .models import Following, User
+
+# Most usernames one batch request may follow or unfollow
+MAX_BATCH_SIZE = 500
+
+# Lists of users: the Following column holding the list's owner, and the listed user
+RELATIONS = {"followers": ("following", "follower"), "following": ("follower", "following")}
+
+
+class BatchError(ValueError):
+    """Raised when the usernames of a batch follow request cannot be used"""
+
+
+class BatchResult(NamedTuple):
+    changed: list
+    unchanged: list
+    not_found: list
+    following_count: int
+    follower_counts: dict
+
+
+def get_usernames(data):
+    """
+    Read the usernames of a batch follow request
+    :param data: Decoded JSON body
+    :return: Usernames without duplicates, in the order given
+    """
+    usernames = data.get("usernames") if isinstance(data, dict) else None
+    if not isinstance(usernames, list) or not all(isinstance(name, str) for name in usernames):
+        raise BatchError("Usernames must be a list of strings.")
+    if not usernames:
+        raise BatchError("Usernames cannot be empty.")
+    if len(usernames) > MAX_BATCH_SIZE:
+        raise BatchError(f"At most {MAX_BATCH_SIZE} usernames per request.")
+
+    return list(dict.fromkeys(usernames))
+
+
+def resolve(usernames):
+    """
+    Look up the targets of a batch in one query
+    :return: Tuple of (dict of username to user id, usernames not found)
+    """
+    found = dict(User.objects.filter(username__in=usernames).values_list("username", "pk"))
+    return found, [username for username in usernames if username not in found]
+
+
+def bump(follower_id, followee_ids):
+    """Retire what the signals of saved or deleted Following rows would have"""
+    etags.bump(
+        f"user:{follower_id}",
+        f"viewer:{follower_id}",
+        *(f"user:{followee_id}" for followee_id in followee_ids),
+    )
+
+
+def result(follower, found, changed_ids, not_found):
+    """Read back the counters touched by a batch"""
+    counts = dict(User.objects.filter(pk__in=found.values()).values_list("pk", "follower_count"))
+    follower.refresh_from_db(fields=["following_count"])
+
+    return BatchResult(
+        changed=[username for username, pk in found.items() if pk in changed_ids],
+        unchanged=[username for username, pk in found.items() if pk not in changed_ids],
+        not_found=not_found,
+        following_count=follower.following_count,
+        follower_counts={username: counts[pk] for username, pk in found.items()},
+    )
+
+
+def follow_many(follower, usernames):
+    """
+    Follow several users at once, skipping those already followed
+    :param follower: User who follows
+    :param usernames: Usernames from ``get_usernames``
+    :return: BatchResult with the newly followed usernames as ``changed``
+    """
+    found, not_found = resolve(usernames)
+
+    with transaction.atomic():
+        # Lock the follower so concurrent batches can not both count the same follow
+        list(User.objects.select_for_update().filter(pk=follower.pk).only("pk"))
+
+        existing = set(
+            Following.objects.filter(
+                follower=follower, following_id__in=found.values()
+            ).values_list("following_id", flat=True)
+        )
+        new_ids = [pk for pk in found.values() if pk not in existing]
+
+        Following.objects.bulk_create(
+            [Following(follower=follower, following_id=pk) for pk in new_ids],
+            ignore_conflicts=True,
+        )
+        if new_ids:
+            User.adjust_counters(follower.pk, following_count=len(new_ids))
+            User.objects.filter(pk__in=new_ids).update(follower_count=F("follower_count") + 1)
+            timeline.follow_many(follower, new_ids)
+
+            # bulk_create sends no signals
+            bump(follower.pk, new_ids)
+            suggestions.mark([follower.pk])
+
+    return result(follower, found, set(new_ids), not_found)
+
+
+def unfollow_many(follower, usernames):
+    """
+    Unfollow several users at once, skipping those not followed
+    :param follower: User who unfollows
+    :param usernames: Usernames from ``get_usernames``
+    :return: BatchResult with the unfollowed usernames as ``changed``
+    """
+    found, not_found = resolve(usernames)
+
+    with transaction.atomic():
+        list(User.objects.select_for_update().filter(pk=follower.pk).only("pk"))
+
+        followings = Following.objects.filter(follower=follower, following_id__in=found.values())
+        removed_ids = list(followings.values_list("following_id", flat=True))
+
+        if removed_ids:
+            followings.delete()
+            User.adjust_counters(follower.pk, following_count=-len(removed_ids))
+            User.objects.filter(pk__in=removed_ids, follower_count__gt=0).update(
+                follower_count=F("follower_count") - 1
+            )
+            timeline.unfollow_many(follower, removed_ids)
+
+    return result(follower, found, set(removed_ids), not_found)
+
+
+def connections(relation, user_id, viewer):
+    """
+    Following rows listing a user's followers or followings, for ``paginate``
+    :param relation: "followers" or "following"
+    :param user_id: Id of the user whose list it is
+    :param viewer: Current user instance, possibly anonymous
+    :return: Queryset with the listed user joined and ``is_followed_by_viewer`` annotated
+    """
+    owner, listed = RELATIONS[relation]
+
+    if viewer.is_authenticated:
+        is_followed = Exists(
+            Following.objects.filter(follower=viewer, following=OuterRef(f"{listed}_id"))
+        )
+    else:
+        is_followed = Value(False)
+
+    return (
+        Following.objects.filter(**{f"{owner}_id": user_id})
+        .select_related(listed)
+        .only("created_at", listed, f"{listed}__username")
+        .annotate(is_followed_by_viewer=is_followed)
+    )
+
+
+def serialize_connection(row, relation):
+    """Serialize a row of ``connections`` as the listed user"""
+    return {
+        "username": getattr(row, RELATIONS[relation][1]).username,
+        "is_followed_by_viewer": row.is_followed_by_viewer,
+        "followed_at": row.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+    }
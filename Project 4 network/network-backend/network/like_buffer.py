@@ -0,0 +1,209 @@
+import time
+from typing import NamedTuple
+
+from django.conf import settings
+from django.core.cache import caches
+
+# Seconds a buffered intent is remembered; must be much longer than the flush interval
+INTENT_TIMEOUT = 604800  # 7 days in seconds
+
+# Seconds a user's like or unlike of one post holds its lock
+LOCK_TIMEOUT = 10
+
+# Seconds a like or unlike waits for the lock held by the same user's previous click, and
+# between its attempts to take it
+LOCK_WAIT = 2
+LOCK_POLL = 0.01
+
+# Seconds a counted but unwritten entry may hold up the flush before it is skipped; the
+# request recording it died, or the entry was evicted. Longer than LOCK_TIMEOUT, since a
+# request records while holding its lock.
+GAP_TIMEOUT = 60
+
+# Last sequence number handed out and last one written to the database
+SEQ_KEY = "network:likes:seq"
+FLUSHED_KEY = "network:likes:flushed"
+
+
+class LockTimeout(Exception):
+    """The same user's like or unlike of a post held its lock for longer than LOCK_WAIT"""
+
+
+class Entry(NamedTuple):
+    seq: int
+    user_id: int
+    post_id: int
+    liked: bool
+
+
+class Buffered(NamedTuple):
+    """Buffered likes of a page of posts, merged into their serialized form"""
+
+    deltas: dict
+    intents: dict
+
+
+def is_enabled():
+    """Whether likes go through the buffer; the network.E001 check vets its cache"""
+    return getattr(settings, "NETWORK_LIKE_BUFFER_ENABLED", False)
+
+
+def get_cache():
+    return caches[getattr(settings, "NETWORK_LIKE_BUFFER_CACHE", "default")]
+
+
+def entry_key(seq):
+    return f"network:likes:entry:{seq}"
+
+
+def intent_key(post_id, user_id):
+    return f"network:likes:intent:{post_id}:{user_id}"
+
+
+def delta_key(post_id):
+    return f"network:likes:delta:{post_id}"
+
+
+def gap_key(seq):
+    return f"network:likes:gap:{seq}"
+
+
+def lock_key(post_id, user_id):
+    return f"network:likes:lock:{post_id}:{user_id}"
+
+
+def acquire(post_id, user_id):
+    """
+    Take the lock of one user's like of one post, waiting for a request that holds it
+    :raises LockTimeout: When the lock is still held after LOCK_WAIT seconds
+    """
+    deadline = time.monotonic() + LOCK_WAIT
+    while not get_cache().add(lock_key(post_id, user_id), 1, timeout=LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            raise LockTimeout("This post is still being liked or unliked, please try again.")
+        time.sleep(LOCK_POLL)
+
+
+def release(post_id, user_id):
+    get_cache().delete(lock_key(post_id, user_id))
+
+
+def incr(key, delta):
+    """Add to a counter in the cache, creating it at zero first"""
+    cache = get_cache()
+    cache.add(key, 0, timeout=None)
+    return cache.incr(key, delta)
+
+
+def intent(post_id, user_id):
+    """Whether the user's buffered state is liked, or None if nothing is buffered"""
+    return get_cache().get(intent_key(post_id, user_id))
+
+
+def record(post_id, user_id, liked):
+    """
+    Append a like or unlike that changes the user's state to the buffer
+    Hold the pair's lock and only call this when ``liked`` differs from the current state.
+    """
+    cache = get_cache()
+    seq = incr(SEQ_KEY, 1)
+    cache.set(entry_key(seq), (user_id, post_id, liked), timeout=None)
+    cache.set(intent_key(post_id, user_id), liked, timeout=INTENT_TIMEOUT)
+    incr(delta_key(post_id), 1 if liked else -1)
+
+
+def deltas(post_ids):
+    """
+    Buffered changes to likes_count not yet written to the database
+    :return: Dict of post id to delta for the posts that have one
+    """
+    keys = {delta_key(post_id): post_id for post_id in post_ids}
+    return {keys[key]: delta for key, delta in get_cache().get_many(list(keys)).items() if delta}
+
+
+async def adeltas(post_ids):
+    """Async counterpart of ``deltas``"""
+    keys = {delta_key(post_id): post_id for post_id in post_ids}
+    found = await get_cache().aget_many(list(keys))
+    return {keys[key]: delta for key, delta in found.items() if delta}
+
+
+def intents(post_ids, user_id):
+    """
+    The user's buffered states of several posts
+    :return: Dict of post id to whether it is liked, for the posts with a buffered state
+    """
+    keys = {intent_key(post_id, user_id): post_id for post_id in post_ids}
+    return {keys[key]: liked for key, liked in get_cache().get_many(list(keys)).items()}
+
+
+async def aintents(post_ids, user_id):
+    """Async counterpart of ``intents``"""
+    keys = {intent_key(post_id, user_id): post_id for post_id in post_ids}
+    return {keys[key]: liked for key, liked in (await get_cache().aget_many(list(keys))).items()}
+
+
+def load(post_ids, user):
+    """
+    Buffered deltas of several posts and the viewer's buffered states of them
+    :param user: Current user instance, possibly anonymous or None
+    """
+    viewer = user.pk if user and user.is_authenticated else None
+    return Buffered(
+        deltas=deltas(post_ids) if post_ids else {},
+        intents=intents(post_ids, viewer) if post_ids and viewer else {},
+    )
+
+
+async def aload(post_ids, user):
+    """Async counterpart of ``load``"""
+    viewer = user.pk if user and user.is_authenticated else None
+    return Buffered(
+        deltas=await adeltas(post_ids) if post_ids else {},
+        intents=await aintents(post_ids, viewer) if post_ids and viewer else {},
+    )
+
+
+def pending(limit):
+    """
+    Read up to ``limit`` unflushed entries in the order they were recorded
+    Stops at an entry that is counted but not yet written, unless it has been missing for
+    GAP_TIMEOUT seconds; then it is lost and skipped, so it can not stall the flush.
+    """
+    cache = get_cache()
+    flushed = cache.get(FLUSHED_KEY, 0)
+    last = min(cache.get(SEQ_KEY, 0), flushed + limit)
+
+    found = cache.get_many([entry_key(seq) for seq in range(flushed + 1, last + 1)])
+    entries = []
+    now = time.time()
+    for seq in range(flushed + 1, last + 1):
+        if entry_key(seq) in found:
+            entries.append(Entry(seq, *found[entry_key(seq)]))
+            continue
+
+        # Remember when the gap was first seen, as the flush may run in another process
+        cache.add(gap_key(seq), now, timeout=GAP_TIMEOUT * 10)
+        if now - cache.get(gap_key(seq), now) < GAP_TIMEOUT:
+            break
+    return entries
+
+
+def acknowledge(entries):
+    """
+    Drop flushed entries and their deltas from the buffer
+    :param entries: Entries from ``pending`` that are now in the database
+    """
+    if not entries:
+        return
+
+    cache = get_cache()
+    totals = {}
+    for entry in entries:
+        totals[entry.post_id] = totals.get(entry.post_id, 0) + (1 if entry.liked else -1)
+    for post_id, total in totals.items():
+        if total:
+            incr(delta_key(post_id), -total)
+
+    cache.set(FLUSHED_KEY, entries[-1].seq, timeout=None)
+    cache.delete_many([entry_key(entry.seq) for entry in entries])
@@ -0,0 +1,195 @@
+from django.db import connection, transaction
+from django.db.models import Exists, OuterRef
+from django.utils import timezone
+
+from . import etags, like_buffer, trending
+from .models import Like, Post, User
+
+
+def table(model):
+    return connection.ops.quote_name(model._meta.db_table)
+
+
+def column(model, name):
+    return connection.ops.quote_name(model._meta.get_field(name).column)
+
+
+def read_count(cursor, post_id, delta):
+    """
+    Apply ``delta`` to the post's likes_count and read it back in the same query
+    :return: The post's likes_count, or None when the post does not exist
+    """
+    post, likes_count = table(Post), column(Post, "likes_count")
+
+    if delta:
+        # New likes add to the trending score in the same UPDATE; unlikes take nothing back
+        trend, trend_params = "", []
+        if delta > 0:
+            trend_score = column(Post, "trend_score")
+            sql, trend_params = trending.score_sql(trend_score, trending.LIKE_WEIGHT * delta)
+            trend = f", {trend_score} = {sql}"
+
+        # Never below zero, like CounterMixin.adjust_counters
+        cursor.execute(
+            f"UPDATE {post} SET {likes_count} = CASE WHEN {likes_count} + %s > 0 "
+            f"THEN {likes_count} + %s ELSE 0 END{trend} WHERE {column(Post, 'id')} = %s "
+            f"RETURNING {likes_count}",
+            [delta, delta, *trend_params, post_id],
+        )
+    else:
+        cursor.execute(
+            f"SELECT {likes_count} FROM {post} WHERE {column(Post, 'id')} = %s", [post_id]
+        )
+
+    row = cursor.fetchone()
+    return row[0] if row else None
+
+
+def changed(user, post_id):
+    """Retire what the signals of a saved or deleted Like would have"""
+    etags.bump("posts", f"post:{post_id}", f"viewer:{user.pk}")
+
+
+def add_like(user, post_id):
+    """
+    Like a post, doing nothing if the user already does, in two queries
+    :param user: User who likes the post
+    :param post_id: Id of the post
+    :return: The post's likes_count, or None when the post does not exist
+    """
+    if like_buffer.is_enabled():
+        return buffer_like(user, post_id, True)
+
+    like = table(Like)
+    user_column, post_column = column(Like, "user"), column(Like, "post")
+    created_at = connection.ops.adapt_datetimefield_value(timezone.now())
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        # Selecting from Post inserts nothing for a missing post, and the unique
+        # (user, post) pair turns repeated and concurrent likes into no-ops
+        cursor.execute(
+            f"INSERT INTO {like} ({user_column}, {post_column}, {column(Like, 'created_at')}) "
+            f"SELECT %s, {column(Post, 'id')}, %s FROM {table(Post)} "
+            f"WHERE {column(Post, 'id')} = %s ON CONFLICT DO NOTHING",
+            [user.pk, created_at, post_id],
+        )
+        created = cursor.rowcount == 1
+        likes_count = read_count(cursor, post_id, 1 if created else 0)
+
+    if created:
+        changed(user, post_id)
+    return likes_count
+
+
+def remove_like(user, post_id):
+    """
+    Unlike a post, doing nothing if the user does not like it, in two queries
+    :param user: User who unlikes the post
+    :param post_id: Id of the post
+    :return: The post's likes_count, or None when the post does not exist
+    """
+    if like_buffer.is_enabled():
+        return buffer_like(user, post_id, False)
+
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(
+            f"DELETE FROM {table(Like)} WHERE {column(Like, 'user')} = %s "
+            f"AND {column(Like, 'post')} = %s",
+            [user.pk, post_id],
+        )
+        deleted = cursor.rowcount == 1
+        likes_count = read_count(cursor, post_id, -1 if deleted else 0)
+
+    if deleted:
+        changed(user, post_id)
+    return likes_count
+
+
+def buffer_like(user, post_id, liked):
+    """
+    Accept a like or unlike into the write-behind buffer without writing to the database
+    :param user: User who likes or unlikes the post
+    :param post_id: Id of the post
+    :param liked: True to like, False to unlike
+    :return: The post's likes_count with buffered changes, or None when the post does not exist
+    :raises like_buffer.LockTimeout: When the user's previous click of the post holds its lock
+    """
+    post = (
+        Post.objects.filter(pk=post_id)
+        .annotate(is_liked=Exists(Like.objects.filter(user=user, post=OuterRef("pk"))))
+        .values("likes_count", "is_liked")
+        .first()
+    )
+    if post is None:
+        return None
+
+    # Clicks of the same user and post take turns, so each sees the state the last one left
+    like_buffer.acquire(post_id, user.pk)
+    try:
+        current = like_buffer.intent(post_id, user.pk)
+        if current is None:
+            current = post["is_liked"]
+        if current != liked:
+            like_buffer.record(post_id, user.pk, liked)
+            etags.bump("posts", f"post:{post_id}", f"viewer:{user.pk}")
+    finally:
+        like_buffer.release(post_id, user.pk)
+
+    return max(post["likes_count"] + like_buffer.deltas([post_id]).get(post_id, 0), 0)
+
+
+def flush_buffer(batch_size=1000):
+    """
+    Write up to ``batch_size`` buffered likes and unlikes to the database
+    :return: Number of buffered entries flushed
+    """
+    entries = like_buffer.pending(batch_size)
+    if not entries:
+        return 0
+
+    # Only the last state of each user and post is written
+    final = {(entry.user_id, entry.post_id): entry.liked for entry in entries}
+    user_ids = {user_id for user_id, _ in final}
+    post_ids = {post_id for _, post_id in final}
+
+    with transaction.atomic():
+        # Skip pairs whose post or user was deleted since the click
+        live_posts = set(Post.objects.filter(pk__in=post_ids).values_list("pk", flat=True))
+        live_users = set(User.objects.filter(pk__in=user_ids).values_list("pk", flat=True))
+        existing = set(
+            Like.objects.filter(user_id__in=user_ids, post_id__in=post_ids).values_list(
+                "user_id", "post_id"
+            )
+        )
+
+        created, removed = [], {}
+        for (user_id, post_id), liked in final.items():
+            if post_id not in live_posts or user_id not in live_users:
+                continue
+            if liked and (user_id, post_id) not in existing:
+                created.append(Like(user_id=user_id, post_id=post_id))
+            elif not liked and (user_id, post_id) in existing:
+                removed.setdefault(post_id, []).append(user_id)
+
+        Like.objects.bulk_create(created, batch_size=500, ignore_conflicts=True)
+        for post_id, removed_users in removed.items():
+            Like.objects.filter(post_id=post_id, user_id__in=removed_users).delete()
+
+        deltas = {}
+        for like in created:
+            deltas[like.post_id] = deltas.get(like.post_id, 0) + 1
+        for post_id, removed_users in removed.items():
+            deltas[post_id] = deltas.get(post_id, 0) - len(removed_users)
+        for post_id, delta in deltas.items():
+            if delta:
+                Post.adjust_counters(post_id, likes_count=delta)
+
+        # The buffered likes trend from when they are written, not from when they were clicked
+        liked = {}
+        for like in created:
+            liked[like.post_id] = liked.get(like.post_id, 0) + 1
+        for post_id, count in liked.items():
+            trending.record(post_id, trending.LIKE_WEIGHT * count)
+
+    like_buffer.acknowledge(entries)
+    return len(entries)
@@ -0,0 +1,49 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from network import archive
+
+
+class Command(BaseCommand):
+    help = (
+        "Move posts and comments soft-deleted longer ago than the retention period into the "
+        "archive tables, in short batches."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--days",
+            type=float,
+            help=(
+                "Retention period in days "
+                "(default: NETWORK_ARCHIVE_RETENTION_DAYS, or 30 if unset)."
+            ),
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of posts or comments moved per transaction (default: 500).",
+        )
+        parser.add_argument(
+            "--pause",
+            type=float,
+            default=0,
+            help="Seconds to sleep between batches to let other writers in (default: 0).",
+        )
+
+    def handle(self, *args, **options):
+        if options["days"] is not None and options["days"] < 0:
+            raise CommandError("Days must not be negative.")
+        if options["batch_size"] < 1:
+            raise CommandError("Batch size must be a positive integer.")
+
+        before = archive.cutoff(options["days"])
+        posts, post_comments = archive.archive_posts(
+            before, options["batch_size"], options["pause"]
+        )
+        comments = archive.archive_comments(before, options["batch_size"], options["pause"])
+
+        self.stdout.write(
+            f"Archived {posts} posts with {post_comments} comments and {comments} other comments "
+            f"deleted before {before:%Y-%m-%d %H:%M:%S}."
+        )
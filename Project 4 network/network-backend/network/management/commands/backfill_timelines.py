@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from network import timeline
+from network.models import User
+
+
+class Command(BaseCommand):
+    help = "Rebuild materialized home timelines from the Following graph."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "usernames",
+            nargs="*",
+            help="Only rebuild the timelines of these users (default: every user).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=500,
+            help="Number of users loaded per query (default: 500).",
+        )
+
+    def handle(self, *args, **options):
+        users = User.objects.order_by("pk").only("pk")
+        if options["usernames"]:
+            users = users.filter(username__in=options["usernames"])
+            missing = set(options["usernames"]) - set(users.values_list("username", flat=True))
+            if missing:
+                raise CommandError(f"Unknown users: {', '.join(sorted(missing))}")
+
+        rebuilt = entries = 0
+        for user in users.iterator(chunk_size=options["batch_size"]):
+            with transaction.atomic():
+                entries += timeline.rebuild(user)
+            rebuilt += 1
+
+        self.stdout.write(f"Rebuilt {rebuilt} timelines with {entries} entries.")
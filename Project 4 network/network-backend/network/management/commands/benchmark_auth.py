@@ -0,0 +1,104 @@
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from django.urls import reverse
+
+from network.management.commands.benchmark_views import percentile
+from network.models import Post, User
+
+# Session engine and authentication middleware of each setup compared
+SETUPS = {
+    "db sessions": (
+        "django.contrib.sessions.backends.db",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+    ),
+    "cached_db sessions": (
+        "django.contrib.sessions.backends.cached_db",
+        "django.contrib.auth.middleware.AuthenticationMiddleware",
+    ),
+    "cached_db + cached user": (
+        "django.contrib.sessions.backends.cached_db",
+        "network.middleware.CachedAuthenticationMiddleware",
+    ),
+}
+
+AUTH_MIDDLEWARE = {middleware for _, middleware in SETUPS.values()}
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the queries and latency of logged-in requests with database sessions, "
+        "cached sessions, and cached sessions plus the per-session cached user, in a "
+        "throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=1000,
+            help="Number of requests per endpoint and setup (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("Requests must be a positive integer.")
+
+        # Never write the benchmark user and sessions to the configured database
+        databases = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            self.run(options["requests"])
+        finally:
+            teardown_databases(databases, verbosity=0)
+
+    def run(self, requests):
+        user = User.objects.create_user(username="viewer", password="benchmark")
+        post = Post.objects.create(content="Benchmark post", created_by=user)
+        urls = {
+            "check_auth": reverse("check_auth"),
+            "post_detail": reverse("post", kwargs={"post_id": post.pk}),
+        }
+
+        # The test client sends Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name, url in urls.items():
+                for setup, (engine, middleware) in SETUPS.items():
+                    stack = [
+                        middleware if entry in AUTH_MIDDLEWARE else entry
+                        for entry in settings.MIDDLEWARE
+                    ]
+                    with override_settings(SESSION_ENGINE=engine, MIDDLEWARE=stack):
+                        queries, timings = self.measure(user, url, requests)
+                    self.stdout.write(
+                        f"{name:<12} {setup:<24} {queries:5.2f} queries/request  "
+                        f"p50 {percentile(timings, 0.5) * 1000:6.3f} ms  "
+                        f"p99 {percentile(timings, 0.99) * 1000:6.3f} ms"
+                    )
+
+    def measure(self, user, url, requests):
+        """
+        Send ``requests`` GETs as ``user`` from a new session
+        :return: Tuple of (queries per request, list of latencies in seconds)
+        """
+        caches[settings.SESSION_CACHE_ALIAS].clear()
+        client = Client()
+        client.force_login(user)
+
+        # Warm the caches outside the measurement
+        client.get(url)
+
+        timings = []
+        with CaptureQueriesContext(connection) as context:
+            for _ in range(requests):
+                started = time.perf_counter()
+                response = client.get(url)
+                timings.append(time.perf_counter() - started)
+                if response.status_code != 200:
+                    raise CommandError(f"GET {url} returned {response.status_code}.")
+
+        return len(context.captured_queries) / requests, timings
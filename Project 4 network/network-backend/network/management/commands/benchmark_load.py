@@ -0,0 +1,299 @@
+import json
+import random
+import time
+from typing import Callable, NamedTuple
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import Client, override_settings
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+from django.urls import reverse
+
+from network import suggestions, synthetic, trending, views
+from network.metrics import percentile
+from network.models import Comment, Following, Post, User
+from network.urls import network_patterns
+
+
+class Endpoint(NamedTuple):
+    """One route and method, requested once per iteration ``i``"""
+
+    name: str
+    method: str
+    path: Callable
+    body: Callable | None = None
+    client: str = "viewer"
+    prepare: Callable | None = None
+    # Share of --requests sent; password hashing makes the auth endpoints slow
+    share: float = 1.0
+
+
+class Command(BaseCommand):
+    help = (
+        "Generate a synthetic dataset in a throwaway test database, send requests to every "
+        "route of network/urls.py in-process, and report throughput, latency percentiles "
+        "and queries per request of each endpoint."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=100,
+            help="Number of requests per endpoint; a tenth for login and register (default: 100).",
+        )
+        parser.add_argument(
+            "--users", type=int, default=2000, help="Number of users (default: 2000)."
+        )
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="Mean number of users each user follows (default: 20).",
+        )
+        parser.add_argument(
+            "--posts", type=int, default=10000, help="Number of posts (default: 10000)."
+        )
+        parser.add_argument(
+            "--likes", type=int, default=40000, help="Number of likes (default: 40000)."
+        )
+        parser.add_argument(
+            "--comments", type=int, default=10000, help="Number of comments (default: 10000)."
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1:
+            raise CommandError("Requests must be a positive integer.")
+        if options["users"] < 3 * options["requests"]:
+            raise CommandError("Generate at least three users per request to follow them all.")
+
+        # Never write the synthetic dataset to the configured database
+        databases = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            started = time.perf_counter()
+            dataset = synthetic.generate(
+                random.Random(options["seed"]),
+                options["users"],
+                options["follows"],
+                options["posts"],
+                options["likes"],
+                options["comments"],
+            )
+            self.stdout.write(
+                f"dataset  {dataset.users} users, {dataset.follows} follows, "
+                f"{dataset.posts} posts, {dataset.likes} likes, {dataset.comments} comments "
+                f"in {time.perf_counter() - started:.1f} s"
+            )
+
+            with override_settings(
+                # The test client sends Host: testserver
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"],
+                ROOT_URLCONF="network.urls",
+                NETWORK_RATE_LIMIT_ENABLED=False,
+                NETWORK_METRICS_SAMPLE_RATE=0,
+                NETWORK_SUGGESTIONS_ENABLED=True,
+            ):
+                self.run(options["requests"])
+        finally:
+            teardown_databases(databases, verbosity=0)
+
+    def run(self, requests):
+        endpoints = self.endpoints(requests)
+
+        # A route without a request here would silently go unmeasured
+        routes = {pattern.name for pattern in network_patterns(views)}
+        missing = routes - {endpoint.name for endpoint in endpoints}
+        if missing:
+            raise CommandError(f"No requests defined for: {', '.join(sorted(missing))}.")
+
+        clients = {"viewer": Client(), "anonymous": Client()}
+        clients["viewer"].force_login(self.viewer)
+
+        for endpoint in endpoints:
+            count = max(1, int(requests * endpoint.share))
+            timings, queries = self.measure(clients[endpoint.client], endpoint, count)
+            self.stdout.write(
+                f"{endpoint.name + ' ' + endpoint.method:<26} "
+                f"{count / sum(timings):8.1f} req/s  "
+                f"p50 {percentile(timings, 0.5) * 1000:7.2f} ms  "
+                f"p95 {percentile(timings, 0.95) * 1000:7.2f} ms  "
+                f"p99 {percentile(timings, 0.99) * 1000:7.2f} ms  "
+                f"{queries / count:5.1f} queries/request"
+            )
+
+    def measure(self, client, endpoint, count):
+        """
+        Send ``count`` requests of one endpoint, one at a time
+        :return: Tuple of (latencies in seconds, total number of queries)
+        """
+        timings, queries = [], 0
+        for i in range(count):
+            if endpoint.prepare:
+                endpoint.prepare(client, i)
+            kwargs = {}
+            if endpoint.body:
+                kwargs = {"data": json.dumps(endpoint.body(i)), "content_type": "application/json"}
+
+            # The log is bounded; once full, CaptureQueriesContext would see no new queries
+            connection.queries_log.clear()
+            with CaptureQueriesContext(connection) as context:
+                started = time.perf_counter()
+                response = getattr(client, endpoint.method.lower())(endpoint.path(i), **kwargs)
+                timings.append(time.perf_counter() - started)
+            queries += len(context.captured_queries)
+
+            if response.status_code >= 400:
+                raise CommandError(
+                    f"{endpoint.method} {endpoint.path(i)} returned {response.status_code}: "
+                    f"{response.content[:200]!r}"
+                )
+        return timings, queries
+
+    def endpoints(self, requests):
+        """Requests for every route, against the busiest parts of the dataset"""
+        # The viewer follows the most users and may read the metrics
+        self.viewer = User.objects.order_by("-following_count").first()
+        User.objects.filter(pk=self.viewer.pk).update(is_staff=True)
+        self.viewer.is_staff = True
+        author = User.objects.order_by("-follower_count").first()
+        popular = Post.objects.order_by("-comments_count").first()
+        own_post = Post.objects.create(content="Benchmark post", created_by=self.viewer)
+        own_comment = Comment.objects.create(
+            post=popular, content="Benchmark comment", created_by=self.viewer
+        )
+        liked = list(Post.objects.order_by("-id").values_list("pk", flat=True)[:requests])
+
+        # Users the viewer does not follow yet, to follow and unfollow
+        followed = Following.objects.filter(follower=self.viewer).values("following")
+        strangers = list(
+            User.objects.exclude(pk=self.viewer.pk)
+            .exclude(pk__in=followed)
+            .order_by("pk")
+            .values_list("username", flat=True)[: 3 * requests]
+        )
+        singles, batches = strangers[:requests], strangers[requests:]
+
+        suggestions.recompute([self.viewer.pk])
+        trending.refresh()
+
+        def create_post(client, i):
+            self.deleted_post = Post.objects.create(content="Delete me", created_by=self.viewer)
+
+        def create_comment(client, i):
+            self.deleted_comment = Comment.objects.create(
+                post=popular, content="Delete me", created_by=self.viewer
+            )
+
+        def login(client, i):
+            client.force_login(User.objects.get(username=f"loadtest{i}"))
+
+        def post_path(name, post_id):
+            return lambda i: reverse(name, kwargs={"post_id": post_id})
+
+        def user_path(name, username):
+            return lambda i: reverse(name, kwargs={"username": username})
+
+        def batch(i):
+            return {"usernames": batches[2 * i % len(batches) : 2 * i % len(batches) + 2]}
+
+        credentials = {"password": synthetic.PASSWORD}
+        return [
+            Endpoint("index", "GET", lambda i: reverse("index")),
+            Endpoint("csrf", "GET", lambda i: reverse("csrf")),
+            Endpoint("check_auth", "GET", lambda i: reverse("check_auth")),
+            Endpoint(
+                "register",
+                "POST",
+                lambda i: reverse("register"),
+                lambda i: {
+                    "username": f"loadtest{i}",
+                    "email": f"loadtest{i}@example.com",
+                    "password": synthetic.PASSWORD,
+                    "confirmation": synthetic.PASSWORD,
+                },
+                client="anonymous",
+                share=0.1,
+            ),
+            Endpoint(
+                "login",
+                "POST",
+                lambda i: reverse("login"),
+                lambda i: {"username": f"loadtest{i}", **credentials},
+                client="anonymous",
+                share=0.1,
+            ),
+            Endpoint(
+                "logout",
+                "POST",
+                lambda i: reverse("logout"),
+                client="anonymous",
+                prepare=login,
+                share=0.1,
+            ),
+            Endpoint("posts", "GET", lambda i: reverse("posts")),
+            Endpoint(
+                "posts",
+                "GET",
+                lambda i: reverse("posts") + "?comments=3&page_size=20",
+            ),
+            Endpoint(
+                "posts", "POST", lambda i: reverse("posts"), lambda i: {"content": f"Post {i}"}
+            ),
+            Endpoint("posts_following", "GET", lambda i: reverse("posts_following")),
+            Endpoint("trending_posts", "GET", lambda i: reverse("trending_posts")),
+            Endpoint("post", "GET", post_path("post", popular.pk)),
+            Endpoint(
+                "post", "PATCH", post_path("post", own_post.pk), lambda i: {"content": f"Edit {i}"}
+            ),
+            Endpoint(
+                "post",
+                "DELETE",
+                lambda i: reverse("post", kwargs={"post_id": self.deleted_post.pk}),
+                prepare=create_post,
+            ),
+            Endpoint("like", "POST", lambda i: reverse("like", kwargs={"post_id": liked[i]})),
+            Endpoint("like", "DELETE", lambda i: reverse("like", kwargs={"post_id": liked[i]})),
+            Endpoint("comments", "GET", post_path("comments", popular.pk)),
+            Endpoint(
+                "comments",
+                "POST",
+                post_path("comments", popular.pk),
+                lambda i: {"content": f"Comment {i}"},
+            ),
+            Endpoint(
+                "comment_detail",
+                "PATCH",
+                lambda i: reverse("comment_detail", kwargs={"comment_id": own_comment.pk}),
+                lambda i: {"content": f"Edit {i}"},
+            ),
+            Endpoint(
+                "comment_detail",
+                "DELETE",
+                lambda i: reverse("comment_detail", kwargs={"comment_id": self.deleted_comment.pk}),
+                prepare=create_comment,
+            ),
+            Endpoint("batch_follow", "POST", lambda i: reverse("batch_follow"), batch),
+            Endpoint("batch_follow", "DELETE", lambda i: reverse("batch_follow"), batch),
+            Endpoint("suggested_users", "GET", lambda i: reverse("suggested_users")),
+            Endpoint(
+                "search",
+                "GET",
+                lambda i: reverse("search") + f"?q={synthetic.WORDS[i % len(synthetic.WORDS)]}",
+            ),
+            Endpoint("metrics", "GET", lambda i: reverse("metrics")),
+            Endpoint("user_detail", "GET", user_path("user_detail", author.username)),
+            Endpoint(
+                "follow",
+                "POST",
+                lambda i: reverse("follow", kwargs={"username": singles[i]}),
+            ),
+            Endpoint(
+                "follow",
+                "DELETE",
+                lambda i: reverse("follow", kwargs={"username": singles[i]}),
+            ),
+            Endpoint("user_followers", "GET", user_path("user_followers", author.username)),
+            Endpoint("user_following", "GET", user_path("user_following", self.viewer.username)),
+        ]
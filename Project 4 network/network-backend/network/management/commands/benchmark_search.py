@@ -0,0 +1,109 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import setup_databases, teardown_databases
+
+from network import search
+from network.management.commands.benchmark_views import percentile
+from network.models import Comment, Post, User
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog coffee morning weekend python django react "
+    "music concert travel beach mountain photo sunset dinner recipe garden rain city night "
+    "game movie book friend family work project launch release bug fix deploy team"
+).split()
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure what keeping the full-text search index in sync costs bulk inserts of posts "
+        "and comments, and how long ranked searches take, in a throwaway test database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--rows",
+            type=int,
+            default=20000,
+            help="Number of posts, and of comments, inserted per run (default: 20000).",
+        )
+        parser.add_argument(
+            "--searches",
+            type=int,
+            default=500,
+            help="Number of searches timed (default: 500).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+
+    def handle(self, *args, **options):
+        if not search.is_supported():
+            raise CommandError("Search needs SQLite or PostgreSQL.")
+
+        # Never write the synthetic posts to the configured database
+        databases = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            self.run(random.Random(options["seed"]), options)
+        finally:
+            teardown_databases(databases, verbosity=0)
+
+    def run(self, rng, options):
+        author = User.objects.create(username="author", password="!")
+        rows = options["rows"]
+
+        indexed = self.insert(rng, author, rows)
+        with connection.schema_editor() as schema_editor:
+            search.drop_index(schema_editor)
+        plain = self.insert(rng, author, rows)
+
+        # Rebuilding fills the index from every row inserted so far
+        started = time.perf_counter()
+        with connection.schema_editor() as schema_editor:
+            search.create_index(schema_editor)
+        rebuild = time.perf_counter() - started
+
+        for kind, (with_index, without_index) in zip(("posts", "comments"), zip(indexed, plain)):
+            self.stdout.write(
+                f"{kind:<9} {rows / with_index:9.0f} rows/s indexed  "
+                f"{rows / without_index:9.0f} rows/s without index  "
+                f"overhead {(with_index / without_index - 1):+.0%}"
+            )
+        self.stdout.write(f"rebuild   {4 * rows} rows in {rebuild:.2f} s")
+
+        timings = []
+        for _ in range(options["searches"]):
+            query = " ".join(rng.sample(WORDS, rng.randint(1, 2)))
+            started = time.perf_counter()
+            search.load(search.search(query, search.KINDS, 0, 10), None)
+            timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"search    p50 {percentile(timings, 0.5) * 1000:.2f} ms  "
+            f"p99 {percentile(timings, 0.99) * 1000:.2f} ms  (first page of 10)"
+        )
+
+    def insert(self, rng, author, rows):
+        """
+        Bulk insert ``rows`` posts and ``rows`` comments of random words
+        :return: Tuple of seconds taken by the posts and by the comments
+        """
+        # Build the rows first so only the inserts are timed
+        posts = [
+            Post(content=" ".join(rng.choices(WORDS, k=rng.randint(5, 40))), created_by=author)
+            for _ in range(rows)
+        ]
+        started = time.perf_counter()
+        Post.objects.bulk_create(posts, batch_size=1000)
+        posts_elapsed = time.perf_counter() - started
+
+        comments = [
+            Comment(
+                post=rng.choice(posts),
+                content=" ".join(rng.choices(WORDS, k=rng.randint(3, 20))),
+                created_by=author,
+            )
+            for _ in range(rows)
+        ]
+        started = time.perf_counter()
+        Comment.objects.bulk_create(comments, batch_size=1000)
+        return posts_elapsed, time.perf_counter() - started
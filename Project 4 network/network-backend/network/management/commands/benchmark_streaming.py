@@ -0,0 +1,125 @@
+import json
+import multiprocessing
+import resource
+import time
+import tracemalloc
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import Client, override_settings
+from django.urls import reverse
+
+from network.models import User
+from network.pagination import MAX_PAGE_SIZE
+
+MODES = ["paged", "json", "ndjson"]
+
+
+def measure(url, viewer_id, mode, results):
+    """
+    Fetch a whole feed in one mode, in a fresh process so its peak RSS is its own
+    :param mode: "paged" to follow next cursors through JsonResponse pages, or a stream format
+    :param results: Queue the measurements are put on
+    """
+    client = Client()
+    if viewer_id:
+        client.force_login(User.objects.get(pk=viewer_id))
+
+    # Load the views and open the connection before measuring
+    client.get(url, {"page_size": 1})
+
+    rss_before = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    tracemalloc.start()
+    started = time.perf_counter()
+    first_byte = None
+    sent = 0
+
+    if mode == "paged":
+        cursor = None
+        while True:
+            params = {"page_size": MAX_PAGE_SIZE, **({"cursor": cursor} if cursor else {})}
+            response = client.get(url, params)
+            first_byte = first_byte or time.perf_counter() - started
+            sent += len(response.content)
+            cursor = json.loads(response.content)["next"]
+            if not cursor:
+                break
+    else:
+        # Count the chunks as they arrive instead of keeping the body
+        response = client.get(url, {"stream": mode})
+        for chunk in response.streaming_content:
+            first_byte = first_byte or time.perf_counter() - started
+            sent += len(chunk)
+
+    elapsed = time.perf_counter() - started
+    _, peak_heap = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    rss_after = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    connections.close_all()
+
+    results.put(
+        {
+            "sent": sent,
+            "first_byte": first_byte,
+            "elapsed": elapsed,
+            "peak_heap": peak_heap,
+            # ru_maxrss is in kilobytes on Linux
+            "peak_rss": (rss_after - rss_before) * 1024,
+        }
+    )
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare time-to-first-byte, total time and peak memory of fetching a whole feed "
+        "page by page against the json and ndjson streaming modes."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--feed",
+            choices=["posts", "following"],
+            default="posts",
+            help="Feed to fetch (default: posts).",
+        )
+        parser.add_argument(
+            "--username",
+            help="Fetch logged in as this user; required for the following feed.",
+        )
+
+    def handle(self, *args, **options):
+        viewer_id = None
+        if options["username"]:
+            viewer_id = (
+                User.objects.filter(username=options["username"])
+                .values_list("pk", flat=True)
+                .first()
+            )
+            if viewer_id is None:
+                raise CommandError(f"Unknown user: {options['username']}")
+        elif options["feed"] == "following":
+            raise CommandError("The following feed needs --username.")
+
+        url = reverse("posts" if options["feed"] == "posts" else "posts_following")
+
+        # Forked children must not share the parent's database connections
+        connections.close_all()
+        context = multiprocessing.get_context("fork")
+
+        # The test client sends Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for mode in MODES:
+                results = context.Queue()
+                process = context.Process(target=measure, args=(url, viewer_id, mode, results))
+                process.start()
+                result = results.get()
+                process.join()
+
+                self.stdout.write(
+                    f"{mode:<7} {result['sent'] / 2**20:8.2f} MiB sent  "
+                    f"first byte {result['first_byte'] * 1000:8.2f} ms  "
+                    f"total {result['elapsed'] * 1000:9.2f} ms  "
+                    f"peak heap {result['peak_heap'] / 2**20:7.2f} MiB  "
+                    f"peak RSS +{result['peak_rss'] / 2**20:.2f} MiB"
+                )
@@ -0,0 +1,142 @@
+import itertools
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext, setup_databases, teardown_databases
+
+from network import suggestions
+from network.management.commands.benchmark_views import percentile
+from network.models import Following, Suggestion, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Build a synthetic follow graph in a throwaway test database and time a full "
+        "recompute of who-to-follow suggestions, an incremental one after a few follows, "
+        "and the read of one user's suggestions."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users",
+            type=int,
+            default=100000,
+            help="Number of users in the graph (default: 100000).",
+        )
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="Number of users each user follows (default: 20).",
+        )
+        parser.add_argument(
+            "--changes",
+            type=int,
+            default=100,
+            help="Number of new follows before the incremental recompute (default: 100).",
+        )
+        parser.add_argument(
+            "--reads",
+            type=int,
+            default=1000,
+            help="Number of suggestion reads timed (default: 1000).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of users ranked per query (default: 200).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+
+    def handle(self, *args, **options):
+        if options["users"] <= options["follows"]:
+            raise CommandError("There must be more users than follows per user.")
+
+        # Never write the synthetic graph to the configured database
+        databases = setup_databases(verbosity=0, interactive=False, aliases={"default"})
+        try:
+            with override_settings(NETWORK_SUGGESTIONS_ENABLED=True):
+                self.run(random.Random(options["seed"]), options)
+        finally:
+            teardown_databases(databases, verbosity=0)
+
+    def run(self, rng, options):
+        started = time.perf_counter()
+        user_ids = self.build_graph(rng, options["users"], options["follows"])
+        self.stdout.write(
+            f"graph        {len(user_ids)} users, {Following.objects.count()} follows "
+            f"built in {time.perf_counter() - started:.1f} s"
+        )
+
+        started = time.perf_counter()
+        suggestions.recompute_all(options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"full         {len(user_ids)} users in {elapsed:.1f} s "
+            f"({elapsed / len(user_ids) * 1000:.2f} ms/user), "
+            f"{Suggestion.objects.count()} suggestions stored"
+        )
+
+        # New follows queue their followers through the signals, like the follow views
+        for follower_id in rng.sample(user_ids, options["changes"]):
+            Following.objects.get_or_create(
+                follower_id=follower_id, following_id=rng.choice(user_ids)
+            )
+
+        started = time.perf_counter()
+        changed, recomputed = suggestions.recompute_pending(options["batch_size"])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(
+            f"incremental  {recomputed} users after {changed} changed follows in {elapsed:.2f} s "
+            f"({recomputed / len(user_ids):.1%} of the graph)"
+        )
+
+        timings = []
+        with CaptureQueriesContext(connection) as queries:
+            for user_id in rng.choices(user_ids, k=options["reads"]):
+                started = time.perf_counter()
+                list(suggestions.for_user(User(pk=user_id), suggestions.max_suggestions()))
+                timings.append(time.perf_counter() - started)
+        self.stdout.write(
+            f"read         {len(queries) / len(timings):.0f} query per read, "
+            f"p50 {percentile(timings, 0.5) * 1000:.3f} ms  "
+            f"p99 {percentile(timings, 0.99) * 1000:.3f} ms"
+        )
+
+    def build_graph(self, rng, users, follows):
+        """
+        Create users who each follow ``follows`` others, favouring a popular few
+        :return: Ids of the users
+        """
+        # The password hash is never checked, so skip hashing 100k passwords
+        User.objects.bulk_create(
+            [User(username=f"user{i}", password="!") for i in range(users)], batch_size=5000
+        )
+        user_ids = list(User.objects.order_by("pk").values_list("pk", flat=True))
+
+        # Zipf-like popularity, so some users have far more followers than others
+        weights = list(itertools.accumulate(1 / (rank + 1) ** 0.8 for rank in range(users)))
+        popular = user_ids[:]
+        rng.shuffle(popular)
+
+        batch = []
+        for follower_id in user_ids:
+            followed = set()
+            while len(followed) < follows:
+                following_id = rng.choices(popular, cum_weights=weights)[0]
+                if following_id != follower_id:
+                    followed.add(following_id)
+            batch.extend(
+                Following(follower_id=follower_id, following_id=following_id)
+                for following_id in followed
+            )
+            if len(batch) >= 10000:
+                Following.objects.bulk_create(batch)
+                batch = []
+        Following.objects.bulk_create(batch)
+
+        return user_ids
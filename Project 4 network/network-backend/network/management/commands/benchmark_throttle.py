@@ -0,0 +1,78 @@
+import time
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.management.base import BaseCommand, CommandError
+from django.http import JsonResponse
+from django.test import RequestFactory, override_settings
+
+from network import throttle
+from network.management.commands.benchmark_views import percentile
+from network.models import User
+
+
+def empty_view(request):
+    return JsonResponse({})
+
+
+class Command(BaseCommand):
+    help = (
+        "Measure the time the rate limiter adds to a write request, with buckets in the "
+        "configured NETWORK_RATE_LIMIT_CACHE, without touching the database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=100000,
+            help="Number of requests per run (default: 100000).",
+        )
+        parser.add_argument(
+            "--clients",
+            type=int,
+            default=1000,
+            help="Number of distinct users whose buckets are cycled through (default: 1000).",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["clients"] < 1:
+            raise CommandError("Requests and clients must be positive integers.")
+
+        factory = RequestFactory()
+        requests = []
+        for i in range(options["clients"]):
+            request = factory.post("/api/posts")
+            # Unsaved users: the limiter only reads the primary key
+            request.user = User(pk=i + 1) if i % 2 else AnonymousUser()
+            request.META["REMOTE_ADDR"] = f"10.0.{i // 256 % 256}.{i % 256}"
+            requests.append(request)
+
+        view = throttle.rate_limit("post")(empty_view)
+        # A rate no client reaches, so every request takes the full path through the bucket
+        rates = {"post": (options["requests"], 1)}
+        with override_settings(NETWORK_RATE_LIMITS=rates, NETWORK_RATE_LIMIT_ENABLED=False):
+            baseline = self.measure(view, requests, options["requests"])
+        with override_settings(NETWORK_RATE_LIMITS=rates, NETWORK_RATE_LIMIT_ENABLED=True):
+            throttle.get_cache().delete_many(
+                [throttle.cache_key("post", throttle.get_ident(r)) for r in requests]
+            )
+            limited = self.measure(view, requests, options["requests"])
+
+        for name, timings in (("disabled", baseline), ("enabled", limited)):
+            self.stdout.write(
+                f"{name:<9} p50 {percentile(timings, 0.5) * 1e6:7.2f} us  "
+                f"p99 {percentile(timings, 0.99) * 1e6:7.2f} us"
+            )
+        overhead = percentile(limited, 0.5) - percentile(baseline, 0.5)
+        self.stdout.write(f"overhead  {overhead * 1e6:7.2f} us per request at p50")
+
+    def measure(self, view, requests, count):
+        timings = []
+        for i in range(count):
+            request = requests[i % len(requests)]
+            started = time.perf_counter()
+            response = view(request)
+            timings.append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise CommandError(f"Request {i} returned {response.status_code}.")
+        return timings
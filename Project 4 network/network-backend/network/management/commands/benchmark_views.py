@@ -0,0 +1,168 @@
+import asyncio
+import statistics
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+from network.metrics import percentile
+from network.models import NOT_DELETED, Post, User
+
+
+def split(total, parts):
+    """Share ``total`` requests out between ``parts`` workers as evenly as possible"""
+    return [total // parts + (i < total % parts) for i in range(parts)]
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare requests/sec and latency of the read endpoints through the WSGI handler "
+        "with the sync views and the ASGI handler with the async views, against the "
+        "configured database."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--requests",
+            type=int,
+            default=500,
+            help="Number of requests per endpoint and handler (default: 500).",
+        )
+        parser.add_argument(
+            "--concurrency",
+            type=int,
+            default=10,
+            help="Requests in flight at once; WSGI threads or ASGI tasks (default: 10).",
+        )
+        parser.add_argument(
+            "--username",
+            help="Send requests logged in as this user (default: anonymous).",
+        )
+
+    def handle(self, *args, **options):
+        if options["requests"] < 1 or options["concurrency"] < 1:
+            raise CommandError("Requests and concurrency must be positive integers.")
+        if getattr(settings, "NETWORK_ASYNC_VIEWS", False):
+            raise CommandError("Turn NETWORK_ASYNC_VIEWS off so the WSGI run uses the sync views.")
+
+        post = Post.objects.filter(NOT_DELETED).order_by("-created_at").first()
+        author = User.objects.order_by("-follower_count").first()
+        if post is None or author is None:
+            raise CommandError("The database has no posts to benchmark against.")
+
+        viewer = None
+        if options["username"]:
+            viewer = User.objects.filter(username=options["username"]).first()
+            if viewer is None:
+                raise CommandError(f"Unknown user: {options['username']}")
+
+        urls = {
+            "posts": reverse("posts"),
+            "post_detail": reverse("post", kwargs={"post_id": post.pk}),
+            "comments": reverse("comments", kwargs={"post_id": post.pk}),
+            "user_detail": reverse("user_detail", kwargs={"username": author.username}),
+        }
+        if viewer:
+            urls["posts_following"] = reverse("posts_following")
+
+        # The test clients send Host: testserver
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, "testserver"]):
+            for name, url in urls.items():
+                with override_settings(ROOT_URLCONF="network.urls"):
+                    wsgi = self.run_wsgi(url, viewer, options["requests"], options["concurrency"])
+                with override_settings(ROOT_URLCONF="network.async_urls"):
+                    asgi = asyncio.run(
+                        self.run_asgi(url, viewer, options["requests"], options["concurrency"])
+                    )
+
+                self.report(name, "WSGI", *wsgi)
+                self.report(name, "ASGI", *asgi)
+
+    def report(self, name, handler, elapsed, timings):
+        self.stdout.write(
+            f"{name:<16} {handler}  {len(timings) / elapsed:8.1f} req/s  "
+            f"p50 {statistics.median(timings) * 1000:7.2f} ms  "
+            f"p99 {percentile(timings, 0.99) * 1000:7.2f} ms"
+        )
+
+    def run_wsgi(self, url, viewer, requests, concurrency):
+        """Send requests through the WSGI handler from a pool of threads"""
+
+        def fetch(client):
+            started = time.perf_counter()
+            response = client.get(url)
+            timing = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f"GET {url} returned {response.status_code}.")
+            return timing
+
+        # Each thread walks its own slice of the requests with its own client and connection
+        def worker(count, results):
+            try:
+                client = Client()
+                if viewer:
+                    client.force_login(viewer)
+                fetch(client)
+                ready.wait()
+                results.extend(fetch(client) for _ in range(count))
+            except Exception as e:
+                errors.append(e)
+                ready.abort()
+            finally:
+                connections.close_all()
+
+        shares = split(requests, concurrency)
+        results = [[] for _ in shares]
+        errors = []
+        ready = threading.Barrier(concurrency + 1)
+        threads = [
+            threading.Thread(target=worker, args=(share, result))
+            for share, result in zip(shares, results)
+        ]
+        for thread in threads:
+            thread.start()
+
+        # Start the clock once every thread has logged in and warmed up
+        try:
+            ready.wait()
+        except threading.BrokenBarrierError:
+            pass
+        started = time.perf_counter()
+        for thread in threads:
+            thread.join()
+        elapsed = time.perf_counter() - started
+
+        if errors:
+            raise errors[0]
+        return elapsed, [timing for timings in results for timing in timings]
+
+    async def run_asgi(self, url, viewer, requests, concurrency):
+        """Send requests through the ASGI handler from concurrent tasks on one event loop"""
+        client = AsyncClient()
+        if viewer:
+            await client.aforce_login(viewer)
+
+        async def fetch():
+            started = time.perf_counter()
+            response = await client.get(url)
+            timing = time.perf_counter() - started
+            if response.status_code != 200:
+                raise CommandError(f"GET {url} returned {response.status_code}.")
+            return timing
+
+        # Each task walks its own slice of the requests, keeping ``concurrency`` in flight
+        async def worker(count):
+            return [await fetch() for _ in range(count)]
+
+        # Warm the post cache outside the measurement
+        await asyncio.gather(*(fetch() for _ in range(concurrency)))
+
+        started = time.perf_counter()
+        results = await asyncio.gather(*(worker(share) for share in split(requests, concurrency)))
+        elapsed = time.perf_counter() - started
+
+        return elapsed, [timing for timings in results for timing in timings]
@@ -0,0 +1,37 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network import like_buffer, likes
+
+
+class Command(BaseCommand):
+    help = "Write likes and unlikes from the write-behind buffer to the database."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of buffered entries written per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running as a worker, flushing every this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        if not like_buffer.is_enabled():
+            raise CommandError("NETWORK_LIKE_BUFFER_ENABLED is off, so there is nothing to flush.")
+
+        while True:
+            total = 0
+            while flushed := likes.flush_buffer(options["batch_size"]):
+                total += flushed
+
+            if total or options["interval"] is None:
+                self.stdout.write(f"Flushed {total} buffered likes.")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
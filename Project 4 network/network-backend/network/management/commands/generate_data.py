@@ -0,0 +1,87 @@
+import random
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network import suggestions, synthetic, timeline
+from network.models import User
+
+
+class Command(BaseCommand):
+    help = (
+        "Fill the configured database with synthetic users, a power-law follow graph, "
+        "posts, likes and comments, to reproduce a production-shaped dataset locally. "
+        f"Every generated user's password is {synthetic.PASSWORD!r}."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--users", type=int, default=10000, help="Number of users (default: 10000)."
+        )
+        parser.add_argument(
+            "--follows",
+            type=int,
+            default=20,
+            help="Mean number of users each user follows (default: 20).",
+        )
+        parser.add_argument(
+            "--posts", type=int, default=50000, help="Number of posts (default: 50000)."
+        )
+        parser.add_argument(
+            "--likes", type=int, default=200000, help="Number of likes (default: 200000)."
+        )
+        parser.add_argument(
+            "--comments", type=int, default=50000, help="Number of comments (default: 50000)."
+        )
+        parser.add_argument(
+            "--days",
+            type=float,
+            default=30,
+            help="Days of activity the posts and follows are spread over (default: 30).",
+        )
+        parser.add_argument(
+            "--prefix",
+            default="user",
+            help="Usernames are this prefix followed by a number (default: user).",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of rows inserted per transaction (default: 5000).",
+        )
+        parser.add_argument("--seed", type=int, default=0, help="Random seed (default: 0).")
+
+    def handle(self, *args, **options):
+        if options["users"] < 2 or min(options["posts"], options["batch_size"]) < 1:
+            raise CommandError("Generate at least two users, one post and batches of one row.")
+        if min(options["follows"], options["likes"], options["comments"], options["days"]) < 0:
+            raise CommandError("Follows, likes, comments and days can not be negative.")
+        if User.objects.filter(username__startswith=options["prefix"]).exists():
+            raise CommandError(
+                f"Usernames starting with {options['prefix']!r} exist; pick another --prefix."
+            )
+
+        started = time.perf_counter()
+        dataset = synthetic.generate(
+            random.Random(options["seed"]),
+            options["users"],
+            options["follows"],
+            options["posts"],
+            options["likes"],
+            options["comments"],
+            prefix=options["prefix"],
+            batch_size=options["batch_size"],
+            days=options["days"],
+        )
+        self.stdout.write(
+            f"Created {dataset.users} users, {dataset.follows} follows, {dataset.posts} posts, "
+            f"{dataset.likes} likes and {dataset.comments} comments "
+            f"in {time.perf_counter() - started:.1f} s."
+        )
+
+        if timeline.is_enabled():
+            self.stdout.write("Run backfill_timelines to fill the new users' home timelines.")
+        if suggestions.is_enabled():
+            self.stdout.write("Run recompute_suggestions --all to suggest users to follow.")
+        self.stdout.write("Run refresh_trending to cache the trending posts.")
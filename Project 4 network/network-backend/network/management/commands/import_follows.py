@@ -0,0 +1,97 @@
+import csv
+import sys
+from itertools import islice
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from network import etags, suggestions, timeline
+from network.management.commands.rebuild_counters import count_of
+from network.models import Following, User
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-load a follow graph from a CSV file with follower and following columns of "
+        "usernames. Existing follows, unknown users and self-follows are skipped."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="CSV file to read, or - for standard input.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=5000,
+            help="Number of CSV rows inserted per transaction (default: 5000).",
+        )
+
+    def handle(self, *args, **options):
+        if options["path"] == "-":
+            self.load(sys.stdin, options)
+        else:
+            try:
+                with open(options["path"], newline="", encoding="utf-8") as file:
+                    self.load(file, options)
+            except OSError as e:
+                raise CommandError(f"Cannot read {options['path']}: {e.strerror}")
+
+    def load(self, file, options):
+        reader = csv.DictReader(file)
+        if not reader.fieldnames or not {"follower", "following"} <= set(reader.fieldnames):
+            raise CommandError("The CSV header must have follower and following columns.")
+
+        rows = created = skipped = 0
+        while batch := list(islice(reader, options["batch_size"])):
+            rows += len(batch)
+            added = self.import_batch(batch)
+            created += added
+            skipped += len(batch) - added
+
+        # bulk_create sends no signals, so retire every ETag by hand
+        if created:
+            etags.bump(etags.GLOBAL_SCOPE)
+
+        self.stdout.write(f"Read {rows} rows: {created} follows created, {skipped} skipped.")
+        if created and timeline.is_enabled():
+            self.stdout.write("Run backfill_timelines to add the new follows to home timelines.")
+
+    def import_batch(self, batch):
+        """
+        Insert one chunk of CSV rows and recount the users it touched
+        :return: Number of follows created
+        """
+        usernames = {row[column] for row in batch for column in ("follower", "following")}
+        ids = dict(User.objects.filter(username__in=usernames).values_list("username", "pk"))
+
+        pairs = {
+            (ids[row["follower"]], ids[row["following"]])
+            for row in batch
+            if row["follower"] in ids
+            and row["following"] in ids
+            and row["follower"] != row["following"]
+        }
+        if not pairs:
+            return 0
+
+        touched = {pk for pair in pairs for pk in pair}
+        with transaction.atomic():
+            before = Following.objects.filter(follower_id__in=touched).count()
+            Following.objects.bulk_create(
+                [
+                    Following(follower_id=follower, following_id=following)
+                    for follower, following in pairs
+                ],
+                batch_size=1000,
+                ignore_conflicts=True,
+            )
+            added = Following.objects.filter(follower_id__in=touched).count() - before
+
+            # Counters are recounted rather than adjusted, since conflicts are not reported
+            if added:
+                suggestions.mark([follower for follower, _ in pairs])
+                User.objects.filter(pk__in=touched).update(
+                    following_count=count_of(Following.objects.all(), "follower"),
+                    follower_count=count_of(Following.objects.all(), "following"),
+                )
+
+        return added
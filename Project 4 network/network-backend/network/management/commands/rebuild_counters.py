@@ -0,0 +1,98 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count, F, OuterRef, Q, Subquery
+from django.db.models.functions import Coalesce
+
+from network import etags
+from network.models import Comment, Following, Like, Post, User
+
+
+def count_of(queryset, field):
+    """Correlated subquery counting rows of ``queryset`` that point at the outer row"""
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+class Command(BaseCommand):
+    help = "Recompute denormalized like, comment and follow counters that have drifted."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=1000,
+            help="Number of rows checked per transaction (default: 1000).",
+        )
+        parser.add_argument(
+            "--dry-run",
+            action="store_true",
+            help="Report drifted rows without writing.",
+        )
+
+    def handle(self, *args, **options):
+        counters = {
+            Post: {
+                "likes_count": count_of(Like.objects.all(), "post"),
+                "comments_count": count_of(Comment.objects.filter(is_deleted=False), "post"),
+            },
+            User: {
+                "following_count": count_of(Following.objects.all(), "follower"),
+                "follower_count": count_of(Following.objects.all(), "following"),
+            },
+        }
+
+        total = 0
+        for model, fields in counters.items():
+            fixed = self.rebuild(model, fields, options["batch_size"], options["dry_run"])
+            verb = "would be fixed" if options["dry_run"] else "fixed"
+            self.stdout.write(f"{model.__name__}: {fixed} rows {verb}.")
+            total += fixed
+
+        # bulk_update sends no signals, so retire every ETag by hand
+        if total and not options["dry_run"]:
+            etags.bump(etags.GLOBAL_SCOPE)
+
+    def rebuild(self, model, fields, batch_size, dry_run):
+        """Walk ``model`` in primary key order and rewrite drifted counters"""
+        annotations = {f"actual_{field}": expression for field, expression in fields.items()}
+        drifted = Q()
+        for field in fields:
+            drifted |= ~Q(**{field: F(f"actual_{field}")})
+
+        fixed = 0
+        last_pk = 0
+        while True:
+            batch = list(
+                model.objects.filter(pk__gt=last_pk)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            if not batch:
+                return fixed
+            last_pk = batch[-1]
+
+            # Lock the batch so concurrent F() updates are not overwritten
+            with transaction.atomic():
+                rows = list(
+                    model.objects.select_for_update()
+                    .filter(pk__in=batch)
+                    .annotate(**annotations)
+                    .filter(drifted)
+                    .only("pk", *fields)
+                )
+                for row in rows:
+                    for field in fields:
+                        setattr(row, field, getattr(row, f"actual_{field}"))
+
+                if rows and not dry_run:
+                    model.objects.bulk_update(rows, list(fields))
+
+            fixed += len(rows)
@@ -0,0 +1,50 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from network import suggestions
+
+
+class Command(BaseCommand):
+    help = (
+        "Recompute stored who-to-follow suggestions of the users whose follows changed since "
+        "the last run, and of their followers."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--all",
+            action="store_true",
+            help="Recompute every user, e.g. after turning suggestions on.",
+        )
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=200,
+            help="Number of users ranked per query (default: 200).",
+        )
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running as a worker, recomputing every this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        if not suggestions.is_enabled():
+            raise CommandError("NETWORK_SUGGESTIONS_ENABLED is off, so no changes are queued.")
+
+        if options["all"]:
+            total = suggestions.recompute_all(options["batch_size"])
+            self.stdout.write(f"Recomputed suggestions of {total} users.")
+            return
+
+        while True:
+            changed, total = suggestions.recompute_pending(options["batch_size"])
+
+            if changed or options["interval"] is None:
+                self.stdout.write(
+                    f"Recomputed suggestions of {total} users; {changed} changed their follows."
+                )
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from network import trending
+
+
+class Command(BaseCommand):
+    help = "Cache the top posts by time-decayed engagement for the trending posts endpoint."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep running as a worker, refreshing every this many seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            payloads = trending.refresh()
+
+            if options["interval"] is None:
+                self.stdout.write(f"Cached {len(payloads)} trending posts.")
+                return
+            time.sleep(options["interval"])
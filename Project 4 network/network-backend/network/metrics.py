@@ -0,0 +1,143 @@
+import random
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import NamedTuple
+
+from django.conf import settings
+
+# Recorder of the sampled request being served, if any
+current = ContextVar("network_metrics_recorder", default=None)
+
+# Rolling samples of each view, shared by the threads of this process
+lock = threading.Lock()
+samples = {}
+
+PERCENTILES = {"p50": 0.5, "p95": 0.95, "p99": 0.99}
+
+
+class Sample(NamedTuple):
+    queries: int
+    db: float
+    serialize: float
+    total: float
+    size: int
+
+
+def sample_rate():
+    """Fraction of requests instrumented; 0 turns the instrumentation off"""
+    return getattr(settings, "NETWORK_METRICS_SAMPLE_RATE", 0)
+
+
+def window():
+    return getattr(settings, "NETWORK_METRICS_WINDOW", 1000)
+
+
+def is_sampled():
+    rate = sample_rate()
+    return rate >= 1 or (rate > 0 and random.random() < rate)
+
+
+def percentile(timings, fraction):
+    """Latency below which ``fraction`` of the requests completed"""
+    ordered = sorted(timings)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+class Recorder:
+    """Adds up the queries of one sampled request"""
+
+    def __init__(self):
+        self.queries = 0
+        self.db = 0.0
+        self.serialize = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.db += time.perf_counter() - started
+            self.queries += 1
+
+
+def dispatch(execute, sql, params, many, context):
+    """
+    Execute wrapper of every connection, passing queries to the sampled request's recorder
+    Each thread has its own connection and async views query from sync_to_async threads,
+    so the recorder is found through the request's context instead of being installed
+    on one connection for the duration of the request.
+    """
+    recorder = current.get()
+    if recorder is None:
+        return execute(sql, params, many, context)
+    return recorder(execute, sql, params, many, context)
+
+
+@contextmanager
+def serializing():
+    """Count the enclosed time as serialization of the sampled request, less its queries"""
+    recorder = current.get()
+    if recorder is None:
+        yield
+        return
+
+    started, db = time.perf_counter(), recorder.db
+    try:
+        yield
+    finally:
+        recorder.serialize += time.perf_counter() - started - (recorder.db - db)
+
+
+def record(view_name, recorder, total, size):
+    sample = Sample(recorder.queries, recorder.db, recorder.serialize, total, size)
+    with lock:
+        if view_name not in samples:
+            samples[view_name] = deque(maxlen=window())
+        samples[view_name].append(sample)
+
+
+def server_timing(recorder, total):
+    """Server-Timing header value of a sampled request, durations in milliseconds"""
+    return (
+        f'db;dur={recorder.db * 1000:.2f};desc="{recorder.queries} queries", '
+        f"serialize;dur={recorder.serialize * 1000:.2f}, "
+        f"total;dur={total * 1000:.2f}"
+    )
+
+
+def snapshot():
+    """
+    Rolling percentiles of each view's recent samples
+    :return: Dict of view name to sample count and percentiles of each measure
+    """
+    with lock:
+        copies = {view_name: list(view_samples) for view_name, view_samples in samples.items()}
+
+    report = {}
+    for view_name, view_samples in sorted(copies.items()):
+        measures = {
+            "queries": [sample.queries for sample in view_samples],
+            "db_ms": [sample.db * 1000 for sample in view_samples],
+            "serialize_ms": [sample.serialize * 1000 for sample in view_samples],
+            "total_ms": [sample.total * 1000 for sample in view_samples],
+            "bytes": [sample.size for sample in view_samples],
+        }
+        report[view_name] = {
+            "count": len(view_samples),
+            **{
+                measure: {
+                    name: round(percentile(values, fraction), 3)
+                    for name, fraction in PERCENTILES.items()
+                }
+                for measure, values in measures.items()
+            },
+        }
+    return report
+
+
+def reset():
+    with lock:
+        samples.clear()
@@ -0,0 +1,79 @@
+import time
+from functools import partial
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.contrib.auth.middleware import AuthenticationMiddleware
+from django.utils.functional import SimpleLazyObject
+
+from . import accounts, metrics
+
+
+async def auser(request):
+    if not hasattr(request, "_acached_user"):
+        request._acached_user = await accounts.aget_user(request)
+    return request._acached_user
+
+
+class CachedAuthenticationMiddleware(AuthenticationMiddleware):
+    """
+    ``AuthenticationMiddleware`` serving ``request.user`` from a per-session cache entry
+    With cached_db sessions an authenticated request then needs no query before the view.
+    """
+
+    def process_request(self, request):
+        super().process_request(request)
+        request.user = SimpleLazyObject(lambda: accounts.get_user(request))
+        request.auser = partial(auser, request)
+
+
+class InstrumentationMiddleware:
+    """
+    Record the queries, SQL time, serialization time and size of sampled responses
+    Sampled responses carry a Server-Timing header; ``/api/metrics`` reports each view's
+    rolling percentiles. Requests not sampled only cost one random number.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not metrics.is_sampled():
+            return self.get_response(request)
+
+        recorder = metrics.Recorder()
+        token = metrics.current.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    async def __acall__(self, request):
+        if not metrics.is_sampled():
+            return await self.get_response(request)
+
+        # The recorder follows the request's context into sync_to_async threads
+        recorder = metrics.Recorder()
+        token = metrics.current.set(recorder)
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            metrics.current.reset(token)
+        return self.finish(request, response, recorder, time.perf_counter() - started)
+
+    def finish(self, request, response, recorder, total):
+        match = request.resolver_match
+        # Streamed bodies are sent after this returns, so only their headers are measured
+        size = 0 if response.streaming else len(response.content)
+        metrics.record(match.view_name if match else "unresolved", recorder, total, size)
+        response.headers["Server-Timing"] = metrics.server_timing(recorder, total)
+        return response
@@ -0,0 +1,19 @@
+# Generated by Django 5.2.2 on 2026-10-16 20:55
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0001_initial"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                fields=["is_deleted", "-created_at", "-id"], name="post_feed_idx"
+            ),
+        ),
+    ]
@@ -0,0 +1,66 @@
+# Generated by Django 5.2.2 on 2026-10-16 20:56
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_of(queryset, field):
+    return Coalesce(
+        Subquery(
+            queryset.filter(**{field: OuterRef("pk")})
+            .order_by()
+            .values(field)
+            .annotate(total=Count("pk"))
+            .values("total")
+        ),
+        0,
+    )
+
+
+def populate_counters(apps, schema_editor):
+    Post = apps.get_model("network", "Post")
+    User = apps.get_model("network", "User")
+    Like = apps.get_model("network", "Like")
+    Comment = apps.get_model("network", "Comment")
+    Following = apps.get_model("network", "Following")
+
+    Post.objects.update(
+        likes_count=count_of(Like.objects.all(), "post"),
+        comments_count=count_of(Comment.objects.filter(is_deleted=False), "post"),
+    )
+    User.objects.update(
+        following_count=count_of(Following.objects.all(), "follower"),
+        follower_count=count_of(Following.objects.all(), "following"),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0002_post_feed_idx"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="comments_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="likes_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="follower_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="following_count",
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
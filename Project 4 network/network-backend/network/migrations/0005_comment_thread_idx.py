@@ -0,0 +1,20 @@
+# Generated by Django 5.2.2 on 2026-10-16 21:03
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0004_timelineentry"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                fields=["post", "is_deleted", "created_at", "id"],
+                name="comment_thread_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 5.2.2 on 2026-10-16 22:41
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0005_comment_thread_idx"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="following",
+            index=models.Index(fields=["following", "-created_at", "-id"], name="followers_idx"),
+        ),
+        migrations.AddIndex(
+            model_name="following",
+            index=models.Index(fields=["follower", "-created_at", "-id"], name="followings_idx"),
+        ),
+    ]
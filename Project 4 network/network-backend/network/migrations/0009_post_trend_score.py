@@ -0,0 +1,22 @@
+# Generated by Django 5.2.2 on 2026-10-16 23:13
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0008_search"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="post",
+            name="trend_score",
+            field=models.FloatField(blank=True, null=True),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(fields=["is_deleted", "-trend_score"], name="post_trending_idx"),
+        ),
+    ]
@@ -0,0 +1,140 @@
+# Generated by Django 5.2.2 on 2026-10-16 23:34
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import F
+from django.utils import timezone
+
+
+def populate_deleted_at(apps, schema_editor):
+    Post = apps.get_model("network", "Post")
+    Comment = apps.get_model("network", "Comment")
+
+    # A soft delete was the last save of a post; comments keep no such time, so their
+    # retention period starts now
+    Post.objects.filter(is_deleted=True).update(deleted_at=F("updated_at"))
+    Comment.objects.filter(is_deleted=True).update(deleted_at=timezone.now())
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0009_post_trend_score"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ArchivedComment",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("post_id", models.BigIntegerField(db_index=True)),
+                ("content", models.TextField()),
+                ("created_at", models.DateTimeField()),
+                ("deleted_at", models.DateTimeField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name="ArchivedPost",
+            fields=[
+                ("id", models.BigIntegerField(primary_key=True, serialize=False)),
+                ("content", models.TextField()),
+                ("created_at", models.DateTimeField()),
+                ("updated_at", models.DateTimeField()),
+                ("deleted_at", models.DateTimeField()),
+                ("likes_count", models.PositiveIntegerField()),
+                ("comments_count", models.PositiveIntegerField()),
+                ("archived_at", models.DateTimeField(auto_now_add=True)),
+            ],
+        ),
+        migrations.RemoveIndex(
+            model_name="comment",
+            name="comment_thread_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_feed_idx",
+        ),
+        migrations.RemoveIndex(
+            model_name="post",
+            name="post_trending_idx",
+        ),
+        migrations.AddField(
+            model_name="comment",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name="post",
+            name="deleted_at",
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.RunPython(populate_deleted_at, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("is_deleted", models.Value(False))),
+                fields=["post", "created_at", "id"],
+                name="comment_thread_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="comment",
+            index=models.Index(
+                condition=models.Q(("is_deleted", True)),
+                fields=["deleted_at"],
+                name="comment_deleted_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_deleted", models.Value(False))),
+                fields=["-created_at", "-id"],
+                name="post_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_deleted", models.Value(False))),
+                fields=["created_by", "-created_at", "-id"],
+                name="post_author_feed_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_deleted", models.Value(False))),
+                fields=["-trend_score"],
+                name="post_trending_idx",
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(("is_deleted", True)),
+                fields=["deleted_at"],
+                name="post_deleted_idx",
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedcomment",
+            name="created_by",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+        migrations.AddField(
+            model_name="archivedpost",
+            name="created_by",
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="+",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
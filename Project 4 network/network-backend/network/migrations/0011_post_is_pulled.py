@@ -0,0 +1,58 @@
+# Generated by Django 5.2.2 on 2026-10-16 23:55
+
+from django.conf import settings
+from django.db import migrations, models
+
+# SQLite adds a NOT NULL column by rebuilding the table, which drops the triggers keeping
+# the full-text index in sync, so the index is rebuilt around it
+
+
+def drop_sqlite_search_index(apps, schema_editor):
+    from network import search
+
+    if schema_editor.connection.vendor == "sqlite":
+        search.drop_index(schema_editor)
+
+
+def create_sqlite_search_index(apps, schema_editor):
+    from network import search
+
+    if schema_editor.connection.vendor == "sqlite":
+        search.create_index(schema_editor)
+
+
+def mark_pulled_posts(apps, schema_editor):
+    Post = apps.get_model("network", "Post")
+
+    # Posts of authors above the limit were never pushed
+    limit = getattr(settings, "NETWORK_TIMELINE_FANOUT_LIMIT", 1000)
+    Post.objects.filter(created_by__follower_count__gte=limit).update(is_pulled=True)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("network", "0010_partial_indexes_and_archive"),
+    ]
+
+    operations = [
+        migrations.RunPython(drop_sqlite_search_index, create_sqlite_search_index),
+        migrations.AddField(
+            model_name="post",
+            name="is_pulled",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.RunPython(create_sqlite_search_index, drop_sqlite_search_index),
+        migrations.RunPython(mark_pulled_posts, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="post",
+            index=models.Index(
+                condition=models.Q(
+                    ("is_deleted", models.Value(False)),
+                    ("is_pulled", models.Value(True)),
+                ),
+                fields=["created_by", "-created_at", "-id"],
+                name="post_pulled_idx",
+            ),
+        ),
+    ]
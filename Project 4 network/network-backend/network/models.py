@@ -1,27 +1,51 @@
 from django.contrib.auth.models import AbstractUser
 from django.db import models
-from django.utils import timezone
+from django.db.models import Exists, F, OuterRef, Q, Value, Window
+from django.db.models.functions import Greatest, RowNumber
 
+from . import like_buffer, metrics, post_cache
 
-class User(AbstractUser):
+# ``is_deleted=False`` compiles to ``NOT is_deleted`` on SQLite, which does not match the
+# ``WHERE is_deleted = 0`` of the partial feed indexes; comparing to a literal does.
+NOT_DELETED = Q(is_deleted=Value(False))
+PULLED = Q(is_pulled=Value(True))
 
-    @property
-    def following_count(self):
-        return self.following.count()
 
-    @property
-    def follower_count(self):
-        return self.followers.count()
+class CounterMixin:
+    """Helpers for models that store denormalized counter columns"""
+
+    @classmethod
+    def adjust_counters(cls, pk, **deltas):
+        """
+        Atomically add deltas to counter columns in the database
+        :param pk: Primary key of the row to update
+        :param deltas: Counter field names mapped to the amount to add
+        """
+        # Clamp at zero so a drifted counter can not violate the unsigned column
+        return cls.objects.filter(pk=pk).update(
+            **{field: Greatest(F(field) + delta, 0) for field, delta in deltas.items()}
+        )
 
 
-class Post(models.Model):
-    CACHE_TIMEOUT = 86400  # 24 hours in seconds
+class User(CounterMixin, AbstractUser):
+    following_count = models.PositiveIntegerField(default=0)
+    follower_count = models.PositiveIntegerField(default=0)
 
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self._cached_serialized_data = None
-        self._cache_timestamp = None
+    @classmethod
+    def with_is_following(cls, viewer):
+        """
+        Users annotated with ``is_following``, whether the viewer follows each of them
+        :param viewer: Current user instance, possibly anonymous
+        """
+        if not viewer.is_authenticated:
+            return cls.objects.annotate(is_following=Value(False))
 
+        return cls.objects.annotate(
+            is_following=Exists(Following.objects.filter(follower=viewer, following=OuterRef("pk")))
+        )
+
+
+class Post(CounterMixin, models.Model):
     content = models.TextField()
     created_by = models.ForeignKey(
         User,
@@ -31,66 +55,153 @@ class Post(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     is_deleted = models.BooleanField(default=False)
-
-    @property
-    def likes_count(self):
-        return self.likes.count()
-
-    @property
-    def comments_count(self):
-        return self.comments.filter(is_deleted=False).count()
+    # When the post was soft-deleted, starting its retention period before archiving
+    deleted_at = models.DateTimeField(null=True, blank=True)
+    likes_count = models.PositiveIntegerField(default=0)
+    comments_count = models.PositiveIntegerField(default=0)
+    # Decayed engagement kept by network.trending; None until the first like or comment
+    trend_score = models.FloatField(null=True, blank=True)
+    # Written while its author had too many followers to push to, so home timelines
+    # gather it on read for good, whatever the author's follower count becomes
+    is_pulled = models.BooleanField(default=False)
 
     def clear_cache(self):
-        """Clear the cache"""
-        self._cached_serialized_data = None
-        self._cache_timestamp = None
+        """Drop this post's payload from the shared cache"""
+        post_cache.invalidate(self)
 
-    def is_cache_valid(self):
-        """Check if the cache is still valid"""
-        if self._cache_timestamp is None:
-            return False
-
-        cache_age = timezone.now() - self._cache_timestamp
-        return cache_age.total_seconds() < self.CACHE_TIMEOUT
+    def serialize_payload(self):
+        """Serialize the viewer-independent part of the Post data"""
+        return {
+            "id": self.id,
+            "content": self.content,
+            "created_by": self.created_by.username,
+            "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "updated_at": self.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
+            "is_deleted": self.is_deleted,
+            "likes_count": self.likes_count,
+            "comments_count": self.comments_count,
+        }
 
     def serialize(self, user=None, force_refresh=False):
         """
-        Serialize Post data with cache timeout
+        Serialize Post data, reusing the payload from the shared cache
         :param user: Current user instance
-        :param force_refresh: Whether to force refresh the cache
+        :param force_refresh: Whether to rebuild the cached payload
+        """
+        return Post.serialize_many([self], user=user, force_refresh=force_refresh)[0]
+
+    @staticmethod
+    def serialize_many(posts, user=None, force_refresh=False, latest_comments=0, fields=None):
+        """
+        Serialize a page of posts with a constant number of queries
+        :param posts: Posts with created_by already loaded
+        :param user: Current user instance
+        :param force_refresh: Whether to rebuild the cached payloads
+        :param latest_comments: Number of latest visible comments to include per post
+        :param fields: Names of the fields to keep, or None for all of them
+        """
+        with metrics.serializing():
+            post_ids = [post.pk for post in posts]
+            payloads = {} if force_refresh else post_cache.get_payloads(posts)
+
+            missing = {post: post.serialize_payload() for post in posts if post.pk not in payloads}
+            if missing:
+                post_cache.set_payloads(missing)
+                payloads.update((post.pk, payload) for post, payload in missing.items())
+
+            # is_liked depends on the viewer, so it is resolved for the whole page in one query
+            liked_ids = set()
+            if post_ids and user and user.is_authenticated:
+                liked_ids = set(Post.liked_ids(user, post_ids))
+
+            latest = Comment.latest_by_post(post_ids, latest_comments) if latest_comments else None
+
+            buffered = like_buffer.load(post_ids, user) if like_buffer.is_enabled() else None
+
+            return Post.combine(posts, payloads, liked_ids, latest, fields, buffered)
+
+    @staticmethod
+    async def aserialize_many(posts, user=None, latest_comments=0, fields=None):
+        """Async counterpart of ``serialize_many``"""
+        with metrics.serializing():
+            post_ids = [post.pk for post in posts]
+            payloads = await post_cache.aget_payloads(posts)
+
+            missing = {post: post.serialize_payload() for post in posts if post.pk not in payloads}
+            if missing:
+                await post_cache.aset_payloads(missing)
+                payloads.update((post.pk, payload) for post, payload in missing.items())
+
+            liked_ids = set()
+            if post_ids and user and user.is_authenticated:
+                liked_ids = {post_id async for post_id in Post.liked_ids(user, post_ids)}
+
+            latest = None
+            if latest_comments:
+                latest = await Comment.alatest_by_post(post_ids, latest_comments)
+
+            buffered = await like_buffer.aload(post_ids, user) if like_buffer.is_enabled() else None
+
+            return Post.combine(posts, payloads, liked_ids, latest, fields, buffered)
+
+    @staticmethod
+    def liked_ids(user, post_ids):
+        """Ids of the given posts that ``user`` has liked"""
+        return Like.objects.filter(user=user, post_id__in=post_ids).values_list(
+            "post_id", flat=True
+        )
+
+    @staticmethod
+    def combine(posts, payloads, liked_ids, latest, fields, buffered=None):
+        """
+        Assemble serialized posts from their loaded parts
+        :param payloads: Dict of post id to cached payload
+        :param liked_ids: Set of post ids the viewer has liked
+        :param latest: Dict of post id to latest comments, or None to leave them out
+        :param fields: Names of the fields to keep, or None for all of them
+        :param buffered: Buffered likes not yet in the database, or None
         """
-        # If force refresh or cache doesn't exist or cache expired
-        if force_refresh or self._cached_serialized_data is None or not self.is_cache_valid():
-            serialized_data = {
-                "id": self.id,
-                "content": self.content,
-                "created_by": self.created_by.username,
-                "created_at": self.created_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "updated_at": self.updated_at.strftime("%Y-%m-%d %H:%M:%S"),
-                "is_deleted": self.is_deleted,
-                "likes_count": self.likes_count,
-                "comments": [comment.serialize() for comment in self.comments.all()],
-                "comments_count": self.comments_count,
-            }
-
-            # Add is_liked field if user is authenticated
-            if user and user.is_authenticated:
-                serialized_data["is_liked"] = self.likes.filter(user=user).exists()
-            else:
-                serialized_data["is_liked"] = False
-
-            self._cached_serialized_data = serialized_data
-            self._cache_timestamp = timezone.now()
-
-        return self._cached_serialized_data
-
-    def save(self, *args, **kwargs):
-        """Clear cache when saving"""
-        self.clear_cache()  # Clear cache when data is updated
-        super().save(*args, **kwargs)
+        serialized = []
+        for post in posts:
+            data = {**payloads[post.pk], "is_liked": post.pk in liked_ids}
+            if buffered is not None:
+                data["likes_count"] = max(data["likes_count"] + buffered.deltas.get(post.pk, 0), 0)
+                data["is_liked"] = buffered.intents.get(post.pk, data["is_liked"])
+            if latest is not None:
+                data["latest_comments"] = latest.get(post.pk, [])
+            if fields:
+                data = {field: value for field, value in data.items() if field in fields}
+            serialized.append(data)
+
+        return serialized
 
     class Meta:
         ordering = ["-created_at"]
+        # Partial indexes leave soft-deleted posts out, so they never grow the feed indexes
+        indexes = [
+            # Keyset pagination of the feeds over (created_at, id)
+            models.Index(
+                fields=["-created_at", "-id"], condition=NOT_DELETED, name="post_feed_idx"
+            ),
+            # The same per author, for profiles and the following feed
+            models.Index(
+                fields=["created_by", "-created_at", "-id"],
+                condition=NOT_DELETED,
+                name="post_author_feed_idx",
+            ),
+            # Posts home timelines gather on read, per author
+            models.Index(
+                fields=["created_by", "-created_at", "-id"],
+                condition=NOT_DELETED & PULLED,
+                name="post_pulled_idx",
+            ),
+            # Top posts by score for refreshing the trending posts
+            models.Index(fields=["-trend_score"], condition=NOT_DELETED, name="post_trending_idx"),
+            # Soft-deleted posts due for archiving
+            models.Index(
+                fields=["deleted_at"], condition=Q(is_deleted=True), name="post_deleted_idx"
+            ),
+        ]
 
 
 class Following(models.Model):
@@ -100,6 +211,57 @@ class Following(models.Model):
 
     class Meta:
         unique_together = ["follower", "following"]
+        indexes = [
+            # Keyset pagination of a user's followers and followings over (created_at, id)
+            models.Index(fields=["following", "-created_at", "-id"], name="followers_idx"),
+            models.Index(fields=["follower", "-created_at", "-id"], name="followings_idx"),
+        ]
+
+
+class TimelineEntry(models.Model):
+    """A post pushed into a follower's home timeline when it was written"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="timeline")
+    post = models.ForeignKey(Post, on_delete=models.CASCADE, related_name="timeline_entries")
+    author = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    # Copy of the post's created_at so the timeline pages without joining Post
+    created_at = models.DateTimeField()
+    is_deleted = models.BooleanField(default=False)
+
+    class Meta:
+        unique_together = ["user", "post"]
+        indexes = [
+            models.Index(
+                fields=["user", "is_deleted", "-created_at", "-post"], name="timeline_feed_idx"
+            ),
+            models.Index(fields=["user", "author"], name="timeline_author_idx"),
+        ]
+
+
+class Suggestion(models.Model):
+    """A who-to-follow candidate precomputed by ``manage.py recompute_suggestions``"""
+
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="suggestions")
+    candidate = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    # How many of the users the user follows follow the candidate, and the latest such follow
+    mutual_count = models.PositiveIntegerField()
+    latest_at = models.DateTimeField()
+
+    class Meta:
+        unique_together = ["user", "candidate"]
+        indexes = [
+            models.Index(
+                fields=["user", "-mutual_count", "-latest_at"], name="suggestion_rank_idx"
+            ),
+        ]
+
+
+class SuggestionRefresh(models.Model):
+    """A user whose follows changed since their suggestions were last computed"""
+
+    # Not a foreign key: deleting a user deletes their follows, which mark them again
+    user_id = models.BigIntegerField(unique=True)
+    requested_at = models.DateTimeField()
 
 
 class Like(models.Model):
@@ -121,6 +283,7 @@ class Comment(models.Model):
     created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="comments")
     created_at = models.DateTimeField(auto_now_add=True)
     is_deleted = models.BooleanField(default=False)
+    deleted_at = models.DateTimeField(null=True, blank=True)
 
     def serialize(self):
         """Serialize comment data"""
@@ -132,5 +295,87 @@ class Comment(models.Model):
             "is_deleted": self.is_deleted,
         }
 
+    @staticmethod
+    def latest_by_post(post_ids, count):
+        """
+        Fetch the latest visible comments of several posts in one windowed query
+        :param post_ids: Ids of the posts
+        :param count: Maximum number of comments per post
+        :return: Dict of post id to serialized comments, newest first
+        """
+        return Comment.group_by_post(Comment.latest_queryset(post_ids, count))
+
+    @staticmethod
+    async def alatest_by_post(post_ids, count):
+        """Async counterpart of ``latest_by_post``"""
+        comments = [comment async for comment in Comment.latest_queryset(post_ids, count)]
+        return Comment.group_by_post(comments)
+
+    @staticmethod
+    def latest_queryset(post_ids, count):
+        """Latest ``count`` visible comments of each post, ranked with a window function"""
+        return (
+            Comment.objects.filter(NOT_DELETED, post_id__in=post_ids)
+            .select_related("created_by")
+            .annotate(
+                rank=Window(
+                    RowNumber(),
+                    partition_by=F("post_id"),
+                    order_by=[F("created_at").desc(), F("id").desc()],
+                )
+            )
+            .filter(rank__lte=count)
+            .order_by("post_id", "rank")
+        )
+
+    @staticmethod
+    def group_by_post(comments):
+        """Serialize comments into a dict of post id to comments, keeping their order"""
+        latest = {}
+        for comment in comments:
+            latest.setdefault(comment.post_id, []).append(comment.serialize())
+        return latest
+
     class Meta:
         ordering = ["created_at"]
+        indexes = [
+            # Keyset pagination of a post's visible comments over (created_at, id)
+            models.Index(
+                fields=["post", "created_at", "id"],
+                condition=NOT_DELETED,
+                name="comment_thread_idx",
+            ),
+            # Soft-deleted comments due for archiving
+            models.Index(
+                fields=["deleted_at"], condition=Q(is_deleted=True), name="comment_deleted_idx"
+            ),
+        ]
+
+
+class ArchivedPost(models.Model):
+    """A soft-deleted post moved out of Post by ``manage.py archive_deleted``"""
+
+    # The post's own id, which archived comments refer to
+    id = models.BigIntegerField(primary_key=True)
+    content = models.TextField()
+    # Deleting a user still deletes everything they wrote, archived or not
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+    updated_at = models.DateTimeField()
+    deleted_at = models.DateTimeField()
+    likes_count = models.PositiveIntegerField()
+    comments_count = models.PositiveIntegerField()
+    archived_at = models.DateTimeField(auto_now_add=True)
+
+
+class ArchivedComment(models.Model):
+    """A comment moved out of Comment, deleted itself or with its post"""
+
+    id = models.BigIntegerField(primary_key=True)
+    # Not a foreign key: the post may still be live, or archived
+    post_id = models.BigIntegerField(db_index=True)
+    content = models.TextField()
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name="+")
+    created_at = models.DateTimeField()
+    deleted_at = models.DateTimeField()
+    archived_at = models.DateTimeField(auto_now_add=True)
@@ -0,0 +1,182 @@
+import base64
+import binascii
+import json
+from datetime import datetime
+from typing import NamedTuple
+
+from django.db.models import Q
+
+DEFAULT_PAGE_SIZE = 10
+MAX_PAGE_SIZE = 50
+
+
+class PaginationError(ValueError):
+    """Raised when the cursor or page size in a request cannot be used"""
+
+
+class Page(NamedTuple):
+    items: list
+    next: str | None
+    prev: str | None
+
+
+def encode_cursor(item, direction, key="id"):
+    """
+    Build an opaque cursor pointing at ``item``
+    :param item: Object with ``created_at`` and the tie-breaker attribute ``key``
+    :param direction: "next" for older items, "prev" for newer items
+    :param key: Name of the unique tie-breaker field
+    """
+    payload = json.dumps(
+        {"t": item.created_at.isoformat(), "id": getattr(item, key), "d": direction},
+        separators=(",", ":"),
+    )
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """Decode a cursor into a ``(created_at, id, direction)`` tuple"""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json.loads(base64.urlsafe_b64decode(padded.encode()))
+        created_at = datetime.fromisoformat(payload["t"])
+        item_id = int(payload["id"])
+        direction = payload["d"]
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise PaginationError("Invalid cursor.")
+
+    if direction not in ("next", "prev"):
+        raise PaginationError("Invalid cursor.")
+
+    return created_at, item_id, direction
+
+
+def get_page_params(params):
+    """
+    Read ``cursor`` and ``page_size`` from a request's query parameters
+    :param params: ``request.GET``
+    :return: Tuple of (decoded cursor or None, page size)
+    """
+    cursor = params.get("cursor")
+    decoded = decode_cursor(cursor) if cursor else None
+
+    return decoded, get_page_size(params)
+
+
+def get_since_params(params):
+    """
+    Read ``since`` and ``page_size`` for polling items newer than a previous response
+    :param params: ``request.GET``
+    :return: Tuple of (decoded cursor walking to newer items, page size)
+    """
+    created_at, item_id, _ = decode_cursor(params["since"])
+    return (created_at, item_id, "prev"), get_page_size(params)
+
+
+def get_page_size(params):
+    """Read and cap ``page_size`` from a request's query parameters"""
+    page_size = params.get("page_size", DEFAULT_PAGE_SIZE)
+    try:
+        page_size = int(page_size)
+    except (TypeError, ValueError):
+        raise PaginationError("Page size must be an integer.")
+
+    if page_size < 1:
+        raise PaginationError("Page size must be a positive integer.")
+
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def walk(queryset, cursor, key="id"):
+    """
+    All rows past the cursor, ordered the way they are walked
+    :param queryset: Unordered queryset with ``created_at`` and the tie-breaker field ``key``
+    :param cursor: Decoded cursor from ``get_page_params``, or None to start at the newest
+    :param key: Name of the unique tie-breaker field
+    """
+    direction = cursor[2] if cursor else "next"
+
+    if cursor:
+        created_at, item_id = cursor[0], cursor[1]
+        # The OR alone can not seek an index, so each page would read every entry before
+        # the cursor; the redundant range bound lets it start at the cursor
+        if direction == "next":
+            queryset = queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, **{f"{key}__lt": item_id}),
+                created_at__lte=created_at,
+            )
+        else:
+            queryset = queryset.filter(
+                Q(created_at__gt=created_at) | Q(created_at=created_at, **{f"{key}__gt": item_id}),
+                created_at__gte=created_at,
+            )
+
+    # Walk backwards from the cursor when paging to newer items
+    if direction == "next":
+        queryset = queryset.order_by("-created_at", f"-{key}")
+    else:
+        queryset = queryset.order_by("created_at", key)
+
+    return queryset
+
+
+def window(queryset, cursor, limit, key="id"):
+    """Slice of up to ``limit`` rows of ``walk``"""
+    return walk(queryset, cursor, key)[:limit]
+
+
+def fetch_window(queryset, cursor, limit, key="id"):
+    """Fetch the rows of ``window``"""
+    return list(window(queryset, cursor, limit, key))
+
+
+async def afetch_window(queryset, cursor, limit, key="id"):
+    """Async counterpart of ``fetch_window``"""
+    return [row async for row in window(queryset, cursor, limit, key).aiterator()]
+
+
+def make_page(rows, cursor, page_size, key="id"):
+    """
+    Build a newest-first page from rows returned by ``fetch_window``
+    :param rows: Up to ``page_size + 1`` rows in the order they were walked
+    :param cursor: Decoded cursor the rows were fetched with
+    :param page_size: Number of items per page
+    :param key: Name of the unique tie-breaker field
+    """
+    direction = cursor[2] if cursor else "next"
+
+    # One extra row tells whether another page exists
+    has_more = len(rows) > page_size
+    items = rows[:page_size]
+
+    if direction == "prev":
+        items.reverse()
+        has_next = bool(items)
+        has_prev = has_more
+    else:
+        has_next = has_more
+        has_prev = cursor is not None and bool(items)
+
+    return Page(
+        items=items,
+        next=encode_cursor(items[-1], "next", key) if has_next else None,
+        prev=encode_cursor(items[0], "prev", key) if has_prev else None,
+    )
+
+
+def paginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, key="id"):
+    """
+    Keyset pagination over ``(created_at, key)``, newest first
+    :param queryset: Unordered queryset with ``created_at`` and the tie-breaker field ``key``
+    :param cursor: Decoded cursor from ``get_page_params``
+    :param page_size: Number of items per page
+    :param key: Name of the unique tie-breaker field
+    """
+    rows = fetch_window(queryset, cursor, page_size + 1, key)
+    return make_page(rows, cursor, page_size, key)
+
+
+async def apaginate(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, key="id"):
+    """Async counterpart of ``paginate``"""
+    rows = await afetch_window(queryset, cursor, page_size + 1, key)
+    return make_page(rows, cursor, page_size, key)
@@ -0,0 +1,60 @@
+from django.core.cache import cache
+
+# Bump when the shape of the serialized payload changes
+PAYLOAD_VERSION = 2
+
+# Seconds a serialized payload may live in the cache
+CACHE_TIMEOUT = 86400  # 24 hours in seconds
+
+
+def cache_key(post):
+    """
+    Key of the payload of the row version ``post`` was loaded at
+    Edits and soft deletes move updated_at, and likes and comments the counters, so a
+    reader that loaded the row before a write commits caches the old payload under the
+    old version, where readers of the new row never look.
+    """
+    return (
+        f"network:post:v{PAYLOAD_VERSION}:{post.pk}:{post.updated_at.timestamp()}:"
+        f"{post.likes_count}:{post.comments_count}:{int(post.is_deleted)}"
+    )
+
+
+def get_payloads(posts):
+    """
+    Fetch cached viewer-independent payloads
+    :param posts: Iterable of loaded posts
+    :return: Dict of post id to payload for the posts found in the cache
+    """
+    keys = {cache_key(post): post.pk for post in posts}
+    return {keys[key]: payload for key, payload in cache.get_many(list(keys)).items()}
+
+
+async def aget_payloads(posts):
+    """Async counterpart of ``get_payloads``"""
+    keys = {cache_key(post): post.pk for post in posts}
+    return {keys[key]: payload for key, payload in (await cache.aget_many(list(keys))).items()}
+
+
+def set_payloads(payloads):
+    """
+    Store viewer-independent payloads
+    :param payloads: Dict of post to payload
+    """
+    cache.set_many(
+        {cache_key(post): payload for post, payload in payloads.items()},
+        timeout=CACHE_TIMEOUT,
+    )
+
+
+async def aset_payloads(payloads):
+    """Async counterpart of ``set_payloads``"""
+    await cache.aset_many(
+        {cache_key(post): payload for post, payload in payloads.items()},
+        timeout=CACHE_TIMEOUT,
+    )
+
+
+def invalidate(post):
+    """Drop the cached payload of the row version ``post`` was loaded at"""
+    cache.delete(cache_key(post))
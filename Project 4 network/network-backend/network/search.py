@@ -0,0 +1,244 @@
+import base64
+import binascii
+import json
+import re
+
+from django.db import connection
+
+from .models import NOT_DELETED, Comment, Post
+from .pagination import PaginationError
+
+# Longest query accepted, and deepest result reachable by following next cursors
+MAX_QUERY_LENGTH = 200
+MAX_OFFSET = 1000
+
+# Text search configuration of the PostgreSQL indexes; queries must use the same one
+POSTGRES_CONFIG = "english"
+
+KINDS = ["posts", "comments"]
+
+
+class SearchError(ValueError):
+    """Raised when the query or type of a search request cannot be used"""
+
+
+class SearchIndexError(RuntimeError):
+    """Raised after migrating when the SQLite index has lost the triggers keeping it in sync"""
+
+
+def is_supported():
+    return connection.vendor in ("sqlite", "postgresql")
+
+
+# SQLite keeps one external-content FTS5 table per model. Triggers index visible rows
+# on insert and drop them on delete, edit and soft delete, so every write path
+# (save, update, bulk_create) keeps the index in sync.
+SQLITE_SCHEMA = [
+    "CREATE VIRTUAL TABLE {index} USING fts5(content, content='{table}', content_rowid='id')",
+    "INSERT INTO {index}(rowid, content) SELECT id, content FROM {table} WHERE NOT is_deleted",
+    """
+    CREATE TRIGGER {index}_insert AFTER INSERT ON {table} WHEN NOT new.is_deleted BEGIN
+        INSERT INTO {index}(rowid, content) VALUES (new.id, new.content);
+    END
+    """,
+    """
+    CREATE TRIGGER {index}_delete AFTER DELETE ON {table} WHEN NOT old.is_deleted BEGIN
+        INSERT INTO {index}({index}, rowid, content) VALUES ('delete', old.id, old.content);
+    END
+    """,
+    """
+    CREATE TRIGGER {index}_update AFTER UPDATE OF content, is_deleted ON {table}
+    WHEN old.content IS NOT new.content OR old.is_deleted IS NOT new.is_deleted BEGIN
+        INSERT INTO {index}({index}, rowid, content)
+            SELECT 'delete', old.id, old.content WHERE NOT old.is_deleted;
+        INSERT INTO {index}(rowid, content) SELECT new.id, new.content WHERE NOT new.is_deleted;
+    END
+    """,
+]
+
+TRIGGERS = ("insert", "delete", "update")
+
+# PostgreSQL maintains partial GIN expression indexes by itself
+POSTGRES_INDEX = (
+    "CREATE INDEX {index} ON {table} "
+    "USING gin (to_tsvector('{config}', content)) WHERE NOT is_deleted"
+)
+
+
+def index_name(model):
+    return f"{model._meta.db_table}_search"
+
+
+def create_index(schema_editor):
+    """Create and fill the full-text indexes of posts and comments"""
+    vendor = schema_editor.connection.vendor
+    for model in (Post, Comment):
+        names = {"index": index_name(model), "table": model._meta.db_table}
+        if vendor == "sqlite":
+            for statement in SQLITE_SCHEMA:
+                schema_editor.execute(statement.format(**names))
+        elif vendor == "postgresql":
+            schema_editor.execute(POSTGRES_INDEX.format(config=POSTGRES_CONFIG, **names))
+
+
+def drop_index(schema_editor):
+    """Drop the full-text indexes of posts and comments"""
+    vendor = schema_editor.connection.vendor
+    for model in (Post, Comment):
+        index = index_name(model)
+        if vendor == "sqlite":
+            for suffix in TRIGGERS:
+                schema_editor.execute(f"DROP TRIGGER IF EXISTS {index}_{suffix}")
+            schema_editor.execute(f"DROP TABLE IF EXISTS {index}")
+        elif vendor == "postgresql":
+            schema_editor.execute(f"DROP INDEX IF EXISTS {index}")
+
+
+def missing_triggers(using=connection):
+    """
+    Sync triggers of existing SQLite indexes that are gone
+    SQLite drops a table's triggers whenever a migration rebuilds it, e.g. to add a NOT
+    NULL column, while the index table stays; search then silently stops seeing writes.
+    :param using: Database connection to inspect
+    :return: Names of the missing triggers
+    """
+    if using.vendor != "sqlite":
+        return []
+
+    with using.cursor() as cursor:
+        cursor.execute("SELECT type, name FROM sqlite_master WHERE type IN ('table', 'trigger')")
+        found = set(cursor.fetchall())
+
+    missing = []
+    for model in (Post, Comment):
+        index = index_name(model)
+        if ("table", index) in found:
+            for suffix in TRIGGERS:
+                if ("trigger", f"{index}_{suffix}") not in found:
+                    missing.append(f"{index}_{suffix}")
+    return missing
+
+
+def get_search_params(params):
+    """
+    Read ``q``, ``type`` and ``cursor`` from a request's query parameters
+    :param params: ``request.GET``
+    :return: Tuple of (query, kinds to search, offset)
+    """
+    query = params.get("q", "").strip()
+    if not query:
+        raise SearchError("Search query cannot be empty.")
+    if len(query) > MAX_QUERY_LENGTH:
+        raise SearchError(f"Search query must be at most {MAX_QUERY_LENGTH} characters.")
+
+    kind = params.get("type", "all")
+    if kind not in ("all", *KINDS):
+        raise SearchError(f"Type must be one of: all, {', '.join(KINDS)}.")
+
+    cursor = params.get("cursor")
+    return query, KINDS if kind == "all" else [kind], decode_cursor(cursor) if cursor else 0
+
+
+def encode_cursor(offset):
+    payload = json.dumps({"o": offset}, separators=(",", ":"))
+    return base64.urlsafe_b64encode(payload.encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor):
+    """
+    Ranked results have no stable key to seek past, so search cursors hold an offset
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        offset = int(json.loads(base64.urlsafe_b64decode(padded.encode()))["o"])
+    except (binascii.Error, UnicodeDecodeError, ValueError, TypeError, KeyError):
+        raise PaginationError("Invalid cursor.")
+
+    if not 0 <= offset <= MAX_OFFSET:
+        raise PaginationError("Invalid cursor.")
+    return offset
+
+
+def match_expression(query):
+    """
+    Turn free text into an FTS5 query matching every word
+    Each word is quoted, so FTS5 operators and punctuation in the text are literal.
+    """
+    words = re.findall(r"\w+", query)
+    return " ".join(f'"{word}"' for word in words)
+
+
+def ranked_sql(kinds):
+    """
+    One query ranking matches of the given kinds together, best first
+    Selects (kind, id) rows and takes the query text, limit and offset as parameters.
+    """
+    tables = {"posts": Post, "comments": Comment}
+    selects = []
+
+    for kind in kinds:
+        table, index = tables[kind]._meta.db_table, index_name(tables[kind])
+        if connection.vendor == "sqlite":
+            # bm25 is lower for better matches
+            selects.append(
+                f"SELECT '{kind}' AS kind, rowid AS id, -bm25({index}) AS score "
+                f"FROM {index} WHERE {index} MATCH %s"
+            )
+        else:
+            # The expression matches the partial index, so the planner can use it
+            vector = f"to_tsvector('{POSTGRES_CONFIG}', content)"
+            selects.append(
+                f"SELECT '{kind}' AS kind, id, ts_rank({vector}, query) AS score "
+                f"FROM {table}, plainto_tsquery('{POSTGRES_CONFIG}', %s) AS query "
+                f"WHERE NOT is_deleted AND {vector} @@ query"
+            )
+
+    return f"{' UNION ALL '.join(selects)} ORDER BY score DESC, id DESC LIMIT %s OFFSET %s"
+
+
+def search(query, kinds, offset, limit):
+    """
+    Rank posts and comments matching every word of ``query``
+    :param kinds: Kinds to search, from ``KINDS``
+    :param offset: Number of ranked results to skip
+    :param limit: Maximum number of results
+    :return: List of (kind, id) tuples, best first
+    """
+    text = match_expression(query) if connection.vendor == "sqlite" else query
+    if not text:
+        return []
+
+    with connection.cursor() as cursor:
+        cursor.execute(ranked_sql(kinds), [text] * len(kinds) + [limit, offset])
+        return [(kind, item_id) for kind, item_id, _ in cursor.fetchall()]
+
+
+def load(matches, user):
+    """
+    Serialize ranked matches in order, skipping those deleted since the search
+    Comments on soft deleted posts are left out too.
+    :param matches: List of (kind, id) tuples from ``search``
+    :param user: Current user instance, possibly anonymous
+    """
+    post_ids = [item_id for kind, item_id in matches if kind == "posts"]
+    comment_ids = [item_id for kind, item_id in matches if kind == "comments"]
+
+    posts = Post.objects.select_related("created_by").filter(NOT_DELETED, pk__in=post_ids)
+    serialized = {post["id"]: post for post in Post.serialize_many(list(posts), user=user)}
+    comments = {
+        comment.pk: comment
+        for comment in Comment.objects.select_related("created_by").filter(
+            NOT_DELETED, pk__in=comment_ids, post__is_deleted=False
+        )
+    }
+
+    results = []
+    for kind, item_id in matches:
+        if kind == "posts" and item_id in serialized:
+            results.append({"type": "post", "post": serialized[item_id]})
+        elif kind == "comments" and item_id in comments:
+            comment = comments[item_id]
+            results.append(
+                {"type": "comment", "post_id": comment.post_id, "comment": comment.serialize()}
+            )
+    return results
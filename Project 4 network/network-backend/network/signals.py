@@ -0,0 +1,93 @@
+from django.contrib.auth.signals import user_logged_in, user_logged_out
+from django.db.backends.signals import connection_created
+from django.db import connections
+from django.db.models.signals import post_delete, post_migrate, post_save
+from django.dispatch import receiver
+
+from . import accounts, etags, metrics, search, suggestions, trending
+from .models import Comment, Following, Like, Post, User
+
+
+@receiver([post_save, post_delete], sender=Post)
+def invalidate_post(sender, instance, **kwargs):
+    """Edits and soft deletes change the post payload"""
+    etags.bump("posts", f"post:{instance.pk}")
+    if instance.is_deleted or kwargs.get("signal") is post_delete:
+        trending.discard(instance.pk)
+
+
+@receiver([post_save, post_delete], sender=Like)
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_parent_post(sender, instance, **kwargs):
+    """Likes and comments change the counters and comments of their post"""
+    etags.bump("posts", f"post:{instance.post_id}")
+
+
+@receiver([post_save, post_delete], sender=Like)
+def invalidate_liker(sender, instance, **kwargs):
+    """Likes change is_liked for the user who liked"""
+    etags.bump(f"viewer:{instance.user_id}")
+
+
+@receiver([post_save, post_delete], sender=Comment)
+def invalidate_comments(sender, instance, **kwargs):
+    """New, edited and deleted comments change the comment listing"""
+    etags.bump(f"comments:{instance.post_id}")
+
+
+@receiver([post_save, post_delete], sender=Following)
+def invalidate_follow(sender, instance, **kwargs):
+    """Follows change both users' counters and is_following for the follower"""
+    etags.bump(
+        f"user:{instance.follower_id}",
+        f"user:{instance.following_id}",
+        f"viewer:{instance.follower_id}",
+    )
+
+
+@receiver([post_save, post_delete], sender=Following)
+def queue_suggestions(sender, instance, **kwargs):
+    """Follows change the follower's suggestions and their followers'"""
+    suggestions.mark([instance.follower_id])
+
+
+@receiver([post_save, post_delete], sender=User)
+def invalidate_user(sender, instance, update_fields=None, **kwargs):
+    """Profile and password changes retire the user's cached session users"""
+    # Every login saves last_login, which nothing cached shows
+    if update_fields is not None and set(update_fields) <= {"last_login"}:
+        return
+    etags.bump(f"user:{instance.pk}")
+
+
+@receiver(user_logged_in)
+def remember_user(sender, request, user, **kwargs):
+    """Prime the new session's cached user, so the next request needs no user query"""
+    accounts.remember(request, user)
+
+
+@receiver(user_logged_out)
+def forget_user(sender, request, user, **kwargs):
+    """Logging out drops the session's cached user before the session is flushed"""
+    accounts.forget(request)
+
+
+@receiver(connection_created)
+def instrument_connection(sender, connection, **kwargs):
+    """Let sampled requests count the queries of every connection, see metrics.dispatch"""
+    # The wrapper list outlives reconnects
+    if metrics.dispatch not in connection.execute_wrappers:
+        connection.execute_wrappers.append(metrics.dispatch)
+
+
+@receiver(post_migrate)
+def verify_search_index(sender, using, **kwargs):
+    """Fail the migration that rebuilt Post or Comment without restoring the search triggers"""
+    if sender.label != "network":
+        return
+    missing = search.missing_triggers(connections[using])
+    if missing:
+        raise search.SearchIndexError(
+            f"Migrating dropped the search index triggers {', '.join(missing)}; drop and "
+            "recreate the index around the operation that rebuilds the table, as 0011 does."
+        )
@@ -0,0 +1,121 @@
+import json
+from itertools import batched
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+from .models import Post
+from .pagination import walk
+
+# Rows fetched from the database cursor and serialized together
+CHUNK_SIZE = 200
+
+CONTENT_TYPES = {
+    "json": "application/json",
+    "ndjson": "application/x-ndjson",
+}
+
+
+def encode(data):
+    return json.dumps(data, cls=DjangoJSONEncoder)
+
+
+def encode_chunks(envelope, chunks, stream):
+    """
+    Encode a response envelope followed by chunks of serialized posts
+    :param envelope: Dict of the response's other keys, sent before any post
+    :param chunks: Iterable of lists of serialized posts
+    :param stream: "json" for one object with a ``posts`` array, "ndjson" for the
+        envelope on the first line and one post per line after it
+    """
+    if stream == "ndjson":
+        yield encode(envelope) + "\n"
+        for chunk in chunks:
+            yield "".join(encode(post) + "\n" for post in chunk)
+        return
+
+    # Cut the closing "]}" off so the posts can be written inside the array
+    head = encode({**envelope, "posts": []})
+    yield head[:-2]
+    separator = ""
+    for chunk in chunks:
+        if chunk:
+            yield separator + ",".join(encode(post) for post in chunk)
+            separator = ","
+    yield head[-2:]
+
+
+async def aencode_chunks(envelope, chunks, stream):
+    """Async counterpart of ``encode_chunks`` over an async iterable of chunks"""
+    if stream == "ndjson":
+        yield encode(envelope) + "\n"
+        async for chunk in chunks:
+            yield "".join(encode(post) + "\n" for post in chunk)
+        return
+
+    head = encode({**envelope, "posts": []})
+    yield head[:-2]
+    separator = ""
+    async for chunk in chunks:
+        if chunk:
+            yield separator + ",".join(encode(post) for post in chunk)
+            separator = ","
+    yield head[-2:]
+
+
+def serialized_chunks(posts, cursor, user, options):
+    """Walk every post past the cursor with a database cursor, serializing a chunk at a time"""
+    rows = walk(posts, cursor).iterator(chunk_size=CHUNK_SIZE)
+    for chunk in batched(rows, CHUNK_SIZE):
+        yield Post.serialize_many(
+            chunk,
+            user=user,
+            latest_comments=options.latest_comments,
+            fields=options.fields,
+        )
+
+
+async def aserialized_chunks(posts, cursor, user, options):
+    """Async counterpart of ``serialized_chunks``"""
+    chunk = []
+    async for post in walk(posts, cursor).aiterator(chunk_size=CHUNK_SIZE):
+        chunk.append(post)
+        if len(chunk) == CHUNK_SIZE:
+            yield await Post.aserialize_many(
+                chunk,
+                user=user,
+                latest_comments=options.latest_comments,
+                fields=options.fields,
+            )
+            chunk = []
+
+    if chunk:
+        yield await Post.aserialize_many(
+            chunk,
+            user=user,
+            latest_comments=options.latest_comments,
+            fields=options.fields,
+        )
+
+
+def stream_posts(envelope, posts, cursor, user, options):
+    """
+    Stream every post past the cursor instead of one page, holding one chunk at a time
+    :param envelope: Dict of the response's other keys
+    :param posts: Unordered queryset of the posts to send, with created_by selected
+    :param cursor: Decoded cursor to start from, or None for the newest post
+    :param user: Current user instance
+    :param options: FeedOptions with ``stream`` set
+    """
+    return StreamingHttpResponse(
+        encode_chunks(envelope, serialized_chunks(posts, cursor, user, options), options.stream),
+        content_type=CONTENT_TYPES[options.stream],
+    )
+
+
+def astream_posts(envelope, posts, cursor, user, options):
+    """Async counterpart of ``stream_posts`` for ASGI, which would buffer a sync iterator"""
+    return StreamingHttpResponse(
+        aencode_chunks(envelope, aserialized_chunks(posts, cursor, user, options), options.stream),
+        content_type=CONTENT_TYPES[options.stream],
+    )
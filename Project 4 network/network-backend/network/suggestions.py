@@ -0,0 +1,170 @@
+import heapq
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, Exists, F, Max, OuterRef
+from django.utils import timezone
+
+from .models import Following, Suggestion, SuggestionRefresh, User
+
+
+def is_enabled():
+    return getattr(settings, "NETWORK_SUGGESTIONS_ENABLED", False)
+
+
+def max_suggestions():
+    return getattr(settings, "NETWORK_SUGGESTIONS_LIMIT", 20)
+
+
+def mark(user_ids):
+    """
+    Queue users whose follows changed for the next recompute
+    Their followers' suggestions go stale too; ``recompute_pending`` adds them.
+    :param user_ids: Ids of the users who followed or unfollowed someone
+    """
+    if not is_enabled() or not user_ids:
+        return
+
+    now = timezone.now()
+    SuggestionRefresh.objects.bulk_create(
+        [SuggestionRefresh(user_id=user_id, requested_at=now) for user_id in set(user_ids)],
+        update_conflicts=True,
+        unique_fields=["user_id"],
+        update_fields=["requested_at"],
+    )
+
+
+def rank(user_ids):
+    """
+    Rank friends-of-friends of several users in one aggregate query
+    A candidate is followed by someone the user follows, and not followed by the user.
+    :return: Dict of user id to up to ``max_suggestions`` Suggestion instances, best first
+    """
+    followed = {}
+    pairs = Following.objects.filter(follower_id__in=user_ids).values_list(
+        "follower_id", "following_id"
+    )
+    for follower_id, following_id in pairs:
+        followed.setdefault(follower_id, set()).add(following_id)
+
+    # user -> mutual -> candidate, grouped per (user, candidate)
+    paths = (
+        Following.objects.filter(follower__followers__follower_id__in=user_ids)
+        .values(viewer_id=F("follower__followers__follower_id"), candidate_id=F("following_id"))
+        .annotate(mutual_count=Count("pk"), latest_at=Max("created_at"))
+        .order_by()
+    )
+
+    candidates = {}
+    for path in paths:
+        viewer_id, candidate_id = path["viewer_id"], path["candidate_id"]
+        if candidate_id != viewer_id and candidate_id not in followed.get(viewer_id, ()):
+            candidates.setdefault(viewer_id, []).append(path)
+
+    ranked = {}
+    for viewer_id, found in candidates.items():
+        best = heapq.nlargest(
+            max_suggestions(), found, key=lambda path: (path["mutual_count"], path["latest_at"])
+        )
+        ranked[viewer_id] = [
+            Suggestion(
+                user_id=viewer_id,
+                candidate_id=path["candidate_id"],
+                mutual_count=path["mutual_count"],
+                latest_at=path["latest_at"],
+            )
+            for path in best
+        ]
+    return ranked
+
+
+def recompute(user_ids):
+    """
+    Replace the stored suggestions of several users
+    :return: Number of suggestions stored
+    """
+    ranked = rank(user_ids)
+    rows = [suggestion for suggestions in ranked.values() for suggestion in suggestions]
+
+    with transaction.atomic():
+        Suggestion.objects.filter(user_id__in=user_ids).delete()
+        Suggestion.objects.bulk_create(rows, batch_size=1000)
+
+    return len(rows)
+
+
+def recompute_pending(batch_size=200):
+    """
+    Recompute only the users whose suggestions went stale since the last run
+    Those are the users who followed or unfollowed someone, and their followers.
+    :return: Tuple of (users whose follows changed, users recomputed)
+    """
+    started = timezone.now()
+    changed = list(
+        SuggestionRefresh.objects.filter(requested_at__lte=started)
+        .order_by("user_id")
+        .values_list("user_id", flat=True)
+    )
+
+    stale = set()
+    for start in range(0, len(changed), batch_size):
+        chunk = changed[start : start + batch_size]
+        stale.update(User.objects.filter(pk__in=chunk).values_list("pk", flat=True))
+        stale.update(
+            Following.objects.filter(following_id__in=chunk).values_list("follower_id", flat=True)
+        )
+
+    stale = sorted(stale)
+    for start in range(0, len(stale), batch_size):
+        recompute(stale[start : start + batch_size])
+
+    # Users marked again while this ran keep their newer mark for the next run
+    for start in range(0, len(changed), batch_size):
+        SuggestionRefresh.objects.filter(
+            user_id__in=changed[start : start + batch_size], requested_at__lte=started
+        ).delete()
+
+    return len(changed), len(stale)
+
+
+def recompute_all(batch_size=200):
+    """
+    Recompute every user's suggestions, e.g. after turning suggestions on
+    :return: Number of users recomputed
+    """
+    started = timezone.now()
+    total = 0
+    last_pk = 0
+    while batch := list(
+        User.objects.filter(pk__gt=last_pk).order_by("pk").values_list("pk", flat=True)[:batch_size]
+    ):
+        recompute(batch)
+        total += len(batch)
+        last_pk = batch[-1]
+
+    SuggestionRefresh.objects.filter(requested_at__lte=started).delete()
+    return total
+
+
+def for_user(user, count):
+    """
+    Stored suggestions of a user, best first, in one indexed query
+    Candidates the user followed since the last recompute are left out.
+    """
+    return (
+        Suggestion.objects.filter(user=user)
+        .exclude(
+            Exists(Following.objects.filter(follower=user, following=OuterRef("candidate_id")))
+        )
+        .select_related("candidate")
+        .only("mutual_count", "candidate__username", "candidate__follower_count")
+        .order_by("-mutual_count", "-latest_at")[:count]
+    )
+
+
+def serialize(suggestion):
+    return {
+        "username": suggestion.candidate.username,
+        "mutual_count": suggestion.mutual_count,
+        "follower_count": suggestion.candidate.follower_count,
+    }
@@ -0,0 +1,225 @@
+import itertools
+import math
+from datetime import timedelta
+from typing import NamedTuple
+
+from django.contrib.auth.hashers import make_password
+from django.db import transaction
+from django.utils import timezone
+
+from . import etags, trending
+from .models import Comment, Following, Like, Post, User
+
+WORDS = (
+    "the quick brown fox jumps over lazy dog coffee morning weekend python django react "
+    "music concert travel beach mountain photo sunset dinner recipe garden rain city night "
+    "game movie book friend family work project launch release bug fix deploy team"
+).split()
+
+# Password of every generated user, hashed once for all of them
+PASSWORD = "synthetic"
+
+# Mean seconds between a post and a like or comment of it; most come soon after
+REACTION_DELAY = 21600  # 6 hours in seconds
+
+
+class Dataset(NamedTuple):
+    """Numbers of rows created by ``generate``"""
+
+    users: int
+    follows: int
+    posts: int
+    likes: int
+    comments: int
+
+
+def popularity(rng, count, exponent=0.8):
+    """
+    Zipf-like cumulative weights over ``count`` items in a random order
+    :return: Tuple of (shuffled item indexes, cumulative weights for ``rng.choices``)
+    """
+    order = list(range(count))
+    rng.shuffle(order)
+    return order, list(itertools.accumulate(1 / (rank + 1) ** exponent for rank in range(count)))
+
+
+def heavy_tailed(rng, mean, cap):
+    """A Pareto-distributed count with the given mean, the shape of activity per user"""
+    # A Pareto variate of shape 1.5 has a mean of 3
+    return min(int(rng.paretovariate(1.5) * mean / 3), cap)
+
+
+def sentence(rng, low, high):
+    return " ".join(rng.choices(WORDS, k=rng.randint(low, high)))
+
+
+def insert(model, rows, batch_size, times=None, fields=("created_at",)):
+    """
+    Bulk insert ``rows`` in batches, one transaction each
+    :param times: When each row was created, written to ``fields`` after the insert, since
+        bulk_create stamps auto_now_add and auto_now fields with the current time
+    """
+    for start in range(0, len(rows), batch_size):
+        with transaction.atomic():
+            batch = model.objects.bulk_create(rows[start : start + batch_size])
+            if times:
+                for row, at in zip(batch, times[start : start + batch_size]):
+                    for field in fields:
+                        setattr(row, field, at)
+                model.objects.bulk_update(batch, list(fields))
+
+
+def spread(rng, count, start, end):
+    """``count`` random times between ``start`` and ``end``, in order"""
+    seconds = (end - start).total_seconds()
+    return [
+        start + timedelta(seconds=offset)
+        for offset in sorted(rng.uniform(0, seconds) for _ in range(count))
+    ]
+
+
+def reaction(rng, posted, end):
+    """When a like or comment of a post written at ``posted`` happened, before ``end``"""
+    delay = min(rng.expovariate(1 / REACTION_DELAY), (end - posted).total_seconds())
+    return posted + timedelta(seconds=delay)
+
+
+def add_score(score, weight, at):
+    """Add an engagement event to a trending score the way ``trending.record`` does"""
+    event = trending.event_score(weight, at)
+    if score is None:
+        return event
+    return max(score, event) + math.log1p(math.exp(-abs(score - event)))
+
+
+def generate(rng, users, follows, posts, likes, comments, prefix="user", batch_size=5000, days=30):
+    """
+    Create a synthetic network shaped like a real one, in batches of ``batch_size`` rows
+    Follows, posts, likes and comments go to a popular few, so followers and engagement
+    have long tails. Posts and follows are spread over the last ``days`` days, and likes
+    and comments follow their post by hours, so time windows and cursors see real
+    history. Counters and trending scores are computed while generating, so no recount
+    is needed afterwards.
+    :param users: Number of users, named ``prefix`` followed by a number
+    :param follows: Mean number of users each user follows
+    :param posts: Number of posts
+    :param likes: Number of likes
+    :param comments: Number of comments
+    :param days: Number of days of activity, ending now
+    :return: Dataset with the numbers of rows created
+    """
+    end = timezone.now()
+    start = end - timedelta(days=days)
+
+    # Who follows whom, by user index
+    ranked, weights = popularity(rng, users)
+    graph = []
+    for follower in range(users):
+        followed = set()
+        for _ in range(heavy_tailed(rng, follows, users - 1)):
+            following = rng.choices(ranked, cum_weights=weights)[0]
+            if following != follower:
+                followed.add(following)
+        graph.extend((follower, following) for following in followed)
+
+    follower_counts = [0] * users
+    following_counts = [0] * users
+    for follower, following in graph:
+        following_counts[follower] += 1
+        follower_counts[following] += 1
+
+    # Popular users post more and their posts draw more likes and comments
+    authors = rng.choices(ranked, cum_weights=weights, k=posts)
+    post_weights = list(itertools.accumulate(follower_counts[author] + 1 for author in authors))
+
+    liked = set()
+    for _ in range(likes * 2):
+        if len(liked) >= likes:
+            break
+        post = rng.choices(range(posts), cum_weights=post_weights)[0]
+        liked.add((rng.randrange(users), post))
+
+    commented = [
+        (rng.randrange(users), rng.choices(range(posts), cum_weights=post_weights)[0])
+        for _ in range(comments)
+    ]
+
+    # Post ids grow with time, as they do when posts are written one by one
+    posted = spread(rng, posts, start, end)
+    liked = sorted(liked)
+    liked_at = [reaction(rng, posted[post], end) for _, post in liked]
+    commented_at = [reaction(rng, posted[post], end) for _, post in commented]
+
+    likes_counts = [0] * posts
+    comments_counts = [0] * posts
+    scores = [None] * posts
+    for (_, post), at in zip(liked, liked_at):
+        likes_counts[post] += 1
+        scores[post] = add_score(scores[post], trending.LIKE_WEIGHT, at)
+    for (_, post), at in zip(commented, commented_at):
+        comments_counts[post] += 1
+        scores[post] = add_score(scores[post], trending.COMMENT_WEIGHT, at)
+
+    password = make_password(PASSWORD)
+    insert(
+        User,
+        [
+            User(
+                username=f"{prefix}{i}",
+                password=password,
+                following_count=following_counts[i],
+                follower_count=follower_counts[i],
+            )
+            for i in range(users)
+        ],
+        batch_size,
+    )
+    user_ids = dict(User.objects.filter(username__startswith=prefix).values_list("username", "pk"))
+    user_ids = [user_ids[f"{prefix}{i}"] for i in range(users)]
+
+    insert(
+        Following,
+        [
+            Following(follower_id=user_ids[follower], following_id=user_ids[following])
+            for follower, following in graph
+        ],
+        batch_size,
+        times=[start + (end - start) * rng.random() for _ in graph],
+    )
+
+    post_rows = [
+        Post(
+            content=sentence(rng, 5, 40),
+            created_by_id=user_ids[author],
+            likes_count=likes_counts[i],
+            comments_count=comments_counts[i],
+            trend_score=scores[i],
+        )
+        for i, author in enumerate(authors)
+    ]
+    insert(Post, post_rows, batch_size, times=posted, fields=("created_at", "updated_at"))
+    post_ids = [post.pk for post in post_rows]
+
+    insert(
+        Like,
+        [Like(user_id=user_ids[user], post_id=post_ids[post]) for user, post in liked],
+        batch_size,
+        times=liked_at,
+    )
+    insert(
+        Comment,
+        [
+            Comment(
+                post_id=post_ids[post],
+                created_by_id=user_ids[user],
+                content=sentence(rng, 3, 20),
+            )
+            for user, post in commented
+        ],
+        batch_size,
+        times=commented_at,
+    )
+
+    # bulk_create sends no signals, so retire every ETag by hand
+    etags.bump(etags.GLOBAL_SCOPE)
+    return Dataset(users, len(graph), posts, len(liked), comments)
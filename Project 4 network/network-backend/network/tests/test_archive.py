@@ -0,0 +1,214 @@
+from datetime import timedelta
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.db.models.signals import post_delete
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from network import archive
+from network.models import (
+    NOT_DELETED,
+    ArchivedComment,
+    ArchivedPost,
+    Comment,
+    Like,
+    Post,
+    TimelineEntry,
+)
+
+User = get_user_model()
+
+
+class ArchiveTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.other = User.objects.create_user(username="otheruser", password="testpass123")
+        self.now = timezone.now()
+        self.old = self.now - timedelta(days=40)
+        self.recent = self.now - timedelta(days=5)
+        self.client = Client()
+
+    def deleted_post(self, deleted_at, content="Deleted post"):
+        return Post.objects.create(
+            content=content, created_by=self.user, is_deleted=True, deleted_at=deleted_at
+        )
+
+    def comment(self, post, deleted_at=None):
+        return Comment.objects.create(
+            post=post,
+            content="A comment",
+            created_by=self.other,
+            is_deleted=deleted_at is not None,
+            deleted_at=deleted_at,
+        )
+
+    def test_delete_post_sets_deleted_at(self):
+        """Test soft-deleting a post records when, and deleting again keeps that time"""
+        post = Post.objects.create(content="Post", created_by=self.user)
+        self.client.force_login(self.user)
+        url = reverse("post", kwargs={"post_id": post.id})
+
+        self.assertEqual(self.client.delete(url).status_code, 200)
+        post.refresh_from_db()
+        self.assertIsNotNone(post.deleted_at)
+        deleted_at = post.deleted_at
+
+        self.client.delete(url)
+        post.refresh_from_db()
+        self.assertEqual(post.deleted_at, deleted_at)
+
+    def test_delete_comment_sets_deleted_at(self):
+        """Test soft-deleting a comment records when"""
+        comment = self.comment(Post.objects.create(content="Post", created_by=self.user))
+        self.client.force_login(self.other)
+
+        response = self.client.delete(reverse("comment_detail", kwargs={"comment_id": comment.id}))
+
+        self.assertEqual(response.status_code, 200)
+        comment.refresh_from_db()
+        self.assertIsNotNone(comment.deleted_at)
+
+    def test_archive_posts_past_retention(self):
+        """Test old deleted posts move with all their comments, and their likes go"""
+        post = self.deleted_post(self.old)
+        live_comment = self.comment(post)
+        deleted_comment = self.comment(post, deleted_at=self.recent)
+        Like.objects.create(user=self.other, post=post)
+
+        posts, comments = archive.archive_posts(self.now - timedelta(days=30))
+
+        self.assertEqual((posts, comments), (1, 2))
+        self.assertFalse(Post.objects.filter(pk=post.pk).exists())
+        self.assertFalse(Like.objects.filter(post_id=post.pk).exists())
+        archived = ArchivedPost.objects.get(pk=post.pk)
+        self.assertEqual(archived.content, "Deleted post")
+        self.assertEqual(archived.deleted_at, self.old)
+        self.assertEqual(
+            dict(ArchivedComment.objects.filter(post_id=post.pk).values_list("pk", "deleted_at")),
+            {live_comment.pk: self.old, deleted_comment.pk: self.recent},
+        )
+
+    def test_archive_posts_keeps_recent_and_live_posts(self):
+        """Test posts deleted within the retention period and live posts stay"""
+        recent = self.deleted_post(self.recent)
+        live = Post.objects.create(content="Live post", created_by=self.user)
+
+        self.assertEqual(archive.archive_posts(self.now - timedelta(days=30)), (0, 0))
+        self.assertEqual(set(Post.objects.values_list("pk", flat=True)), {recent.pk, live.pk})
+        self.assertFalse(ArchivedPost.objects.exists())
+
+    def test_archive_posts_in_batches(self):
+        """Test every due post is archived when there are more than one batch"""
+        posts = [self.deleted_post(self.old, f"Deleted {i}") for i in range(5)]
+
+        self.assertEqual(archive.archive_posts(self.now, batch_size=2), (5, 0))
+        self.assertEqual(
+            set(ArchivedPost.objects.values_list("pk", flat=True)), {post.pk for post in posts}
+        )
+
+    def test_archive_posts_bounds_the_cascade(self):
+        """Test likes beyond the batch size go in chunks, without a signal per like"""
+        post = self.deleted_post(self.old)
+        fans = User.objects.bulk_create([User(username=f"fan{i}") for i in range(5)])
+        Like.objects.bulk_create([Like(user=fan, post=post) for fan in fans])
+        TimelineEntry.objects.bulk_create(
+            [
+                TimelineEntry(user=fan, post=post, author=self.user, created_at=post.created_at)
+                for fan in fans
+            ]
+        )
+        for i in range(5):
+            self.comment(post)
+
+        deleted_likes = []
+
+        def receiver(sender, instance, **kwargs):
+            deleted_likes.append(instance.pk)
+
+        post_delete.connect(receiver, sender=Like)
+        self.addCleanup(post_delete.disconnect, receiver, sender=Like)
+
+        self.assertEqual(archive.archive_posts(self.now, batch_size=2), (1, 5))
+        self.assertEqual(deleted_likes, [])
+        self.assertFalse(Like.objects.filter(post_id=post.pk).exists())
+        self.assertFalse(TimelineEntry.objects.filter(post_id=post.pk).exists())
+        self.assertEqual(ArchivedComment.objects.filter(post_id=post.pk).count(), 5)
+
+    def test_post_restored_during_archive(self):
+        """Test a post restored while being emptied keeps what is left, with true counters"""
+        post = self.deleted_post(self.old)
+        Like.objects.create(user=self.other, post=post)
+        comments = [self.comment(post), self.comment(post, deleted_at=self.recent)]
+        Post.objects.filter(pk=post.pk).update(likes_count=1, comments_count=1)
+        archive_post_comments = archive.archive_post_comments
+
+        # Restored after its likes were deleted, before its comments are archived
+        def restore_then_archive(*args, **kwargs):
+            Post.objects.filter(pk=post.pk).update(is_deleted=False, deleted_at=None)
+            return archive_post_comments(*args, **kwargs)
+
+        with patch("network.archive.archive_post_comments", side_effect=restore_then_archive):
+            self.assertEqual(archive.archive_posts(self.now), (0, 0))
+
+        post.refresh_from_db()
+        self.assertFalse(post.is_deleted)
+        self.assertEqual((post.likes_count, post.comments_count), (0, 1))
+        self.assertEqual(
+            set(Comment.objects.values_list("pk", flat=True)), {comment.pk for comment in comments}
+        )
+        self.assertFalse(ArchivedPost.objects.exists())
+        self.assertFalse(ArchivedComment.objects.exists())
+
+    def test_archive_comments_past_retention(self):
+        """Test only comments deleted before the cutoff move to the archive"""
+        post = Post.objects.create(content="Live post", created_by=self.user)
+        old = self.comment(post, deleted_at=self.old)
+        recent = self.comment(post, deleted_at=self.recent)
+        live = self.comment(post)
+
+        self.assertEqual(archive.archive_comments(self.now - timedelta(days=30), batch_size=1), 1)
+        self.assertEqual(set(Comment.objects.values_list("pk", flat=True)), {recent.pk, live.pk})
+        self.assertEqual(ArchivedComment.objects.get().pk, old.pk)
+
+    @override_settings(NETWORK_ARCHIVE_RETENTION_DAYS=10)
+    def test_command_uses_retention_setting(self):
+        """Test the command archives what is older than the retention setting"""
+        old = self.deleted_post(self.old)
+        recent = self.deleted_post(self.recent)
+        self.comment(Post.objects.create(content="Live", created_by=self.user), self.old)
+        out = StringIO()
+
+        call_command("archive_deleted", stdout=out)
+
+        self.assertIn("Archived 1 posts with 0 comments and 1 other comments", out.getvalue())
+        self.assertEqual(list(ArchivedPost.objects.values_list("pk", flat=True)), [old.pk])
+
+        call_command("archive_deleted", "--days", "1", stdout=StringIO())
+        self.assertEqual(ArchivedPost.objects.count(), 2)
+        self.assertFalse(Post.objects.filter(pk=recent.pk).exists())
+
+    def test_command_rejects_invalid_options(self):
+        """Test negative days and non-positive batch sizes are rejected"""
+        with self.assertRaises(CommandError):
+            call_command("archive_deleted", "--days", "-1", stdout=StringIO())
+        with self.assertRaises(CommandError):
+            call_command("archive_deleted", "--batch-size", "0", stdout=StringIO())
+
+    def test_feed_queries_use_partial_indexes(self):
+        """Test the feeds seek the indexes that leave deleted posts out"""
+        feed = Post.objects.filter(NOT_DELETED).order_by("-created_at", "-id")[:10].explain()
+        profile = (
+            Post.objects.filter(NOT_DELETED, created_by=self.user)
+            .order_by("-created_at", "-id")[:10]
+            .explain()
+        )
+        due = Post.objects.filter(is_deleted=True, deleted_at__lt=self.now).explain()
+
+        self.assertIn("post_feed_idx", feed)
+        self.assertIn("post_author_feed_idx", profile)
+        self.assertIn("post_deleted_idx", due)
+        self.assertNotIn("TEMP B-TREE", feed + profile)
@@ -0,0 +1,175 @@
+import json
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from network.models import Comment, Following, Like, Post
+
+User = get_user_model()
+
+
+@override_settings(ROOT_URLCONF="network.async_urls")
+class AsyncViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create test users
+        self.author = User.objects.create_user(username="author", password="testpass123")
+        self.viewer = User.objects.create_user(username="viewer", password="testpass123")
+        Following.objects.create(follower=self.viewer, following=self.author)
+        User.adjust_counters(self.viewer.pk, following_count=1)
+        User.adjust_counters(self.author.pk, follower_count=1)
+
+        # Create test posts and comments
+        self.posts = [
+            Post.objects.create(content=f"Post {i}", created_by=self.author) for i in range(3)
+        ]
+        self.post = self.posts[0]
+        for i in range(3):
+            Comment.objects.create(post=self.post, content=f"Comment {i}", created_by=self.viewer)
+        Like.objects.create(user=self.viewer, post=self.post)
+
+        self.urls = {
+            "posts": reverse("posts"),
+            "posts_following": reverse("posts_following"),
+            "post": reverse("post", kwargs={"post_id": self.post.id}),
+            "comments": reverse("comments", kwargs={"post_id": self.post.id}),
+            "user": reverse("user_detail", kwargs={"username": "author"}),
+            "followers": reverse("user_followers", kwargs={"username": "author"}),
+        }
+
+    async def get_both(self, url, **params):
+        """Fetch a URL from the sync views and then from the async views"""
+        with self.settings(ROOT_URLCONF="project4.urls"):
+            sync_response = await sync_to_async(self.client.get)(url, params)
+        async_response = await self.async_client.get(url, params)
+        return sync_response, async_response
+
+    async def test_async_views_match_sync_views(self):
+        """Test every async read endpoint returns the same body as its sync view"""
+        await self.async_client.aforce_login(self.viewer)
+        await sync_to_async(self.client.force_login)(self.viewer)
+
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                sync_response, async_response = await self.get_both(url, page_size=2, comments=2)
+                self.assertEqual(async_response.status_code, 200)
+                self.assertEqual(
+                    json.loads(async_response.content), json.loads(sync_response.content)
+                )
+
+    async def test_stream_matches_sync_stream(self):
+        """Test the async views stream the same documents as the sync views"""
+        await self.async_client.aforce_login(self.viewer)
+
+        for stream in ["json", "ndjson"]:
+            with self.subTest(stream):
+                with self.settings(ROOT_URLCONF="project4.urls"):
+                    await sync_to_async(self.client.force_login)(self.viewer)
+                    response = await sync_to_async(self.client.get)(
+                        self.urls["posts"], {"stream": stream}
+                    )
+                    expected = await sync_to_async(b"".join)(response.streaming_content)
+
+                response = await self.async_client.get(self.urls["posts"], {"stream": stream})
+                content = b"".join([chunk async for chunk in response.streaming_content])
+                self.assertEqual(content, expected)
+
+    async def test_is_liked_uses_viewer(self):
+        """Test the async feed resolves is_liked for the logged-in viewer"""
+        await self.async_client.aforce_login(self.viewer)
+
+        response = await self.async_client.get(self.urls["posts"])
+
+        liked = {post["id"]: post["is_liked"] for post in json.loads(response.content)["posts"]}
+        self.assertTrue(liked[self.post.id])
+        self.assertFalse(liked[self.posts[1].id])
+
+    async def test_cursor_pages(self):
+        """Test the async feed follows next cursors across pages"""
+        response = await self.async_client.get(self.urls["posts"], {"page_size": 2})
+        data = json.loads(response.content)
+        self.assertEqual(len(data["posts"]), 2)
+
+        response = await self.async_client.get(
+            self.urls["posts"], {"page_size": 2, "cursor": data["next"]}
+        )
+        data = json.loads(response.content)
+        self.assertEqual([post["id"] for post in data["posts"]], [self.posts[0].id])
+        self.assertIsNone(data["next"])
+
+    async def test_conditional_get(self):
+        """Test the async views answer a matching If-None-Match with 304"""
+        for name, url in self.urls.items():
+            if name == "posts_following":
+                continue
+            with self.subTest(name):
+                etag = (await self.async_client.get(url))["ETag"]
+                response = await self.async_client.get(url, headers={"If-None-Match": etag})
+                self.assertEqual(response.status_code, 304)
+
+    async def test_following_requires_login(self):
+        """Test the async following feed rejects anonymous users"""
+        response = await self.async_client.get(self.urls["posts_following"])
+        self.assertEqual(response.status_code, 401)
+
+    @override_settings(NETWORK_TIMELINE_ENABLED=True)
+    async def test_following_with_timeline(self):
+        """Test the async following feed reads the materialized timeline"""
+        await self.async_client.aforce_login(self.author)
+        await self.async_client.post(
+            self.urls["posts"],
+            json.dumps({"content": "Fanned out"}),
+            content_type="application/json",
+        )
+
+        await self.async_client.aforce_login(self.viewer)
+        response = await self.async_client.get(self.urls["posts_following"])
+
+        self.assertEqual(response.status_code, 200)
+        contents = [post["content"] for post in json.loads(response.content)["posts"]]
+        self.assertEqual(contents[0], "Fanned out")
+
+    async def test_not_found(self):
+        """Test the async views return 404 for missing posts and users"""
+        urls = [
+            reverse("post", kwargs={"post_id": 9999}),
+            reverse("comments", kwargs={"post_id": 9999}),
+            reverse("user_detail", kwargs={"username": "nobody"}),
+        ]
+        for url in urls:
+            with self.subTest(url):
+                response = await self.async_client.get(url)
+                self.assertEqual(response.status_code, 404)
+
+    async def test_deleted_post(self):
+        """Test the async post detail returns 410 for a soft deleted post"""
+        await Post.objects.filter(pk=self.post.pk).aupdate(is_deleted=True)
+
+        response = await self.async_client.get(self.urls["post"])
+        self.assertEqual(response.status_code, 410)
+
+    async def test_writes_fall_back_to_sync_views(self):
+        """Test non-GET requests on async routes are handled by the sync views"""
+        await self.async_client.aforce_login(self.author)
+
+        response = await self.async_client.post(
+            self.urls["comments"], json.dumps({"content": "New"}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 201)
+
+        response = await self.async_client.patch(
+            self.urls["post"], json.dumps({"content": "Edited"}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((await Post.objects.aget(pk=self.post.pk)).content, "Edited")
+
+    async def test_invalid_params(self):
+        """Test the async views reject bad cursors and options with 400"""
+        for params in [{"cursor": "bogus"}, {"comments": "many"}, {"page_size": 0}]:
+            with self.subTest(params):
+                response = await self.async_client.get(self.urls["posts"], params)
+                self.assertEqual(response.status_code, 400)
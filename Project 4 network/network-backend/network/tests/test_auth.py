@@ -1,8 +1,13 @@
 import json
+from unittest.mock import patch
+
 from django.contrib.auth import get_user_model
-from django.test import Client, TestCase
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
 from django.urls import reverse
 
+from network.models import Following
+
 User = get_user_model()
 
 class AuthenticationViewTests(TestCase):
@@ -211,3 +216,107 @@ class AuthenticationViewTests(TestCase):
             self.assertEqual(response.status_code, 405)
             data = json.loads(response.content)
             self.assertEqual(data["error"], "GET request required.")
+
+
+class SessionUserCacheTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create test users
+        self.user = User.objects.create_user(
+            username="testuser", password="testpass123", email="test@example.com"
+        )
+        self.other = User.objects.create_user(username="otheruser", password="testpass123")
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.url = reverse("check_auth")
+
+    def check_auth(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)["user"]
+
+    def test_login_primes_cache(self):
+        """Test requests after logging in need no session or user query"""
+        self.client.logout()
+        self.client.post(
+            reverse("login"),
+            data=json.dumps({"username": "testuser", "password": "testpass123"}),
+            content_type="application/json",
+        )
+
+        with self.assertNumQueries(0):
+            user_data = self.check_auth()
+        self.assertEqual(user_data["username"], "testuser")
+
+    def test_user_cached_after_miss(self):
+        """Test a user loaded once is served from the cache afterwards"""
+        cache.clear()
+
+        with self.assertNumQueries(1):
+            self.check_auth()
+        with self.assertNumQueries(0):
+            self.check_auth()
+
+    def test_follow_invalidates(self):
+        """Test follows and unfollows refresh the cached counters"""
+        self.check_auth()
+
+        self.client.post(reverse("follow", kwargs={"username": "otheruser"}))
+        self.assertEqual(self.check_auth()["following_count"], 1)
+
+        self.client.delete(reverse("follow", kwargs={"username": "otheruser"}))
+        self.assertEqual(self.check_auth()["following_count"], 0)
+
+        # Batch follows do not send signals
+        self.client.post(
+            reverse("batch_follow"),
+            json.dumps({"usernames": ["otheruser"]}),
+            content_type="application/json",
+        )
+        self.assertEqual(self.check_auth()["following_count"], 1)
+        self.assertTrue(Following.objects.filter(follower=self.user).exists())
+
+    def test_profile_change_invalidates(self):
+        """Test saving the user refreshes the cached user"""
+        self.check_auth()
+
+        self.user.email = "changed@example.com"
+        self.user.save()
+
+        self.assertEqual(self.check_auth()["email"], "changed@example.com")
+
+    def test_password_change_logs_out(self):
+        """Test a cached user never outlives a password change"""
+        self.check_auth()
+
+        self.user.set_password("newpass123")
+        self.user.save()
+
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_logout(self):
+        """Test a logged out session is not authenticated from the cache"""
+        session_key = self.client.session.session_key
+        self.client.post(reverse("logout"))
+
+        self.assertIsNone(cache.get(f"network:auth:{session_key}"))
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, 401)
+
+    def test_disabled(self):
+        """Test a zero NETWORK_AUTH_CACHE_TIMEOUT loads the user on every request"""
+        with self.settings(NETWORK_AUTH_CACHE_TIMEOUT=0):
+            self.check_auth()
+            with self.assertNumQueries(1):
+                self.check_auth()
+
+    @override_settings(ROOT_URLCONF="network.async_urls")
+    async def test_async_views(self):
+        """Test async views read the session's cached user too"""
+        await self.async_client.aforce_login(self.user)
+
+        with patch("django.contrib.auth.aget_user", side_effect=AssertionError):
+            response = await self.async_client.get(reverse("suggested_users"))
+        self.assertEqual(response.status_code, 200)
@@ -9,7 +9,7 @@ from django.test import Client, TestCase
 from django.urls import reverse
 from django.utils import timezone
 
-from network.models import Comment, Post
+from network.models import NOT_DELETED, Comment, Post
 
 User = get_user_model()
 
@@ -102,6 +102,10 @@ class CommentViewTests(TestCase):
         self.assertEqual(comment.content, "Test comment")
         self.assertEqual(comment.created_by, self.user1)
 
+        # Verify comment was counted on the post
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
     def test_comment_integrity_error(self):
         """Test handling of IntegrityError during comment creation"""
         self.client.login(username="testuser1", password="testpass123")
@@ -187,6 +191,83 @@ class CommentViewTests(TestCase):
             self.assertEqual(data["error"], "Only accept GET and POST method.")
 
 
+class CommentPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.post = Post.objects.create(content="Test post content", created_by=self.user)
+        for i in range(5):
+            Comment.objects.create(post=self.post, content=f"Comment {i}", created_by=self.user)
+        Comment.objects.create(
+            post=self.post, content="Deleted comment", created_by=self.user, is_deleted=True
+        )
+
+        self.client = Client()
+
+    def get_comments(self, **params):
+        response = self.client.get(reverse("comments", kwargs={"post_id": self.post.id}), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def contents(self, data):
+        return [comment["content"] for comment in data["comments"]]
+
+    def test_pages_newest_first(self):
+        """Test comments are paged newest first and skip deleted comments"""
+        first = self.get_comments(page_size=3)
+        self.assertEqual(self.contents(first), ["Comment 4", "Comment 3", "Comment 2"])
+        self.assertIsNone(first["prev"])
+
+        second = self.get_comments(page_size=3, cursor=first["next"])
+        self.assertEqual(self.contents(second), ["Comment 1", "Comment 0"])
+        self.assertIsNone(second["next"])
+
+        back = self.get_comments(page_size=3, cursor=second["prev"])
+        self.assertEqual(self.contents(back), self.contents(first))
+
+    def test_since_returns_only_new_comments(self):
+        """Test polling with since returns only comments added after the latest one seen"""
+        latest = self.get_comments()["latest"]
+
+        empty = self.get_comments(since=latest)
+        self.assertEqual(empty["comments"], [])
+        self.assertEqual(empty["latest"], latest)
+
+        for i in range(5, 8):
+            Comment.objects.create(post=self.post, content=f"Comment {i}", created_by=self.user)
+
+        data = self.get_comments(since=latest, page_size=2)
+        self.assertEqual(self.contents(data), ["Comment 6", "Comment 5"])
+        self.assertIsNotNone(data["prev"])
+
+        data = self.get_comments(since=data["latest"], page_size=2)
+        self.assertEqual(self.contents(data), ["Comment 7"])
+
+    def test_invalid_cursor(self):
+        """Test invalid cursors are rejected"""
+        for params in [{"cursor": "bogus"}, {"since": "bogus"}, {"page_size": "0"}]:
+            response = self.client.get(
+                reverse("comments", kwargs={"post_id": self.post.id}), params
+            )
+            self.assertEqual(response.status_code, 400)
+
+    def test_query_count_independent_of_thread_size(self):
+        """Test a page of comments takes the same number of queries for any thread size"""
+        for i in range(30):
+            Comment.objects.create(post=self.post, content="More", created_by=self.user)
+
+        with self.assertNumQueries(2):
+            data = self.get_comments(page_size=20)
+        self.assertEqual(len(data["comments"]), 20)
+
+    def test_thread_query_uses_index(self):
+        """Test the page query seeks the thread index instead of sorting the thread"""
+        comments = Comment.objects.filter(NOT_DELETED, post=self.post)
+        plan = comments.order_by("-created_at", "-id")[:10].explain()
+
+        self.assertIn("comment_thread_idx", plan)
+        self.assertNotIn("TEMP B-TREE", plan)
+
+
 class CommentDetailViewTests(TestCase):
     def setUp(self):
         """Set up test data"""
@@ -394,6 +475,34 @@ class CommentDetailViewTests(TestCase):
         comment.refresh_from_db()
         self.assertTrue(comment.is_deleted)
 
+        # Deleting again does not decrement the counter twice
+        Post.adjust_counters(self.post.pk, comments_count=1)
+        self.client.delete(reverse("comment_detail", kwargs={"comment_id": comment.id}))
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+
+    def test_concurrent_delete_decrements_once(self):
+        """Test a delete that read the comment before another delete does not decrement"""
+        self.client.login(username="testuser1", password="testpass123")
+        comment = Comment.objects.create(
+            created_by=self.user1, post=self.post, content="Test comment"
+        )
+        # Another visible comment keeps the counter above its floor of zero
+        Post.adjust_counters(self.post.pk, comments_count=2)
+        stale = Comment.objects.get(pk=comment.pk)
+        url = reverse("comment_detail", kwargs={"comment_id": comment.id})
+
+        self.client.delete(url)
+        with patch.object(Comment.objects, "get", return_value=stale):
+            response = self.client.delete(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comments_count, 1)
+        comment.refresh_from_db()
+        self.assertTrue(comment.is_deleted)
+        self.assertIsNotNone(comment.deleted_at)
+
     def test_delete_comment_unauthorized(self):
         """Test deleting comment by unauthorized user"""
         self.client.login(username="testuser2", password="testpass123")
@@ -0,0 +1,141 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection
+from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from network.models import Comment, Like, Post
+
+User = get_user_model()
+
+
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.author = User.objects.create_user(username="author", password="testpass123")
+        self.viewer = User.objects.create_user(username="viewer", password="testpass123")
+        self.post = Post.objects.create(content="Test post", created_by=self.author)
+        Comment.objects.create(post=self.post, content="Test comment", created_by=self.author)
+
+        self.client = Client()
+
+        self.urls = {
+            "posts": reverse("posts"),
+            "post": reverse("post", kwargs={"post_id": self.post.id}),
+            "comments": reverse("comments", kwargs={"post_id": self.post.id}),
+            "user": reverse("user_detail", kwargs={"username": "author"}),
+        }
+
+    def get(self, url, etag=None, **params):
+        headers = {"If-None-Match": etag} if etag else {}
+        return self.client.get(url, params, headers=headers)
+
+    def assertNotModified(self, url, **params):
+        etag = self.get(url, **params)["ETag"]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.get(url, etag, **params)
+
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b"")
+        return [query["sql"] for query in queries]
+
+    def assertModified(self, url, change):
+        etag = self.get(url)["ETag"]
+        change()
+        response = self.get(url, etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response["ETag"], etag)
+
+    def toggle_like(self):
+        url = reverse("like", kwargs={"post_id": self.post.id})
+        if Like.objects.filter(user=self.viewer, post=self.post).exists():
+            self.client.delete(url)
+        else:
+            self.client.post(url)
+
+    def test_not_modified_loads_no_posts(self):
+        """Test a matching If-None-Match is answered without reading post or comment rows"""
+        self.client.force_login(self.viewer)
+
+        for name, url in self.urls.items():
+            with self.subTest(name):
+                queries = self.assertNotModified(url)
+                for sql in queries:
+                    self.assertNotIn("network_post", sql)
+                    self.assertNotIn("network_comment", sql)
+
+    def test_anonymous_not_modified_runs_no_queries(self):
+        """Test the feed revalidates from version stamps alone"""
+        self.assertEqual(self.assertNotModified(self.urls["posts"]), [])
+
+    def test_query_string_is_part_of_etag(self):
+        """Test different pages and options get different tags"""
+        first = self.get(self.urls["posts"])["ETag"]
+        trimmed = self.get(self.urls["posts"], fields="id")["ETag"]
+
+        self.assertNotEqual(first, trimmed)
+        self.assertEqual(self.get(self.urls["posts"], trimmed).status_code, 200)
+
+    def test_viewer_is_part_of_etag(self):
+        """Test a tag issued to one viewer does not validate for another"""
+        anonymous = self.get(self.urls["post"])["ETag"]
+        self.client.force_login(self.viewer)
+
+        self.assertEqual(self.get(self.urls["post"], anonymous).status_code, 200)
+
+    def test_like_changes_etag(self):
+        """Test likes retire the feed, post and profile tags"""
+        self.client.force_login(self.viewer)
+
+        for name in ["posts", "post", "user"]:
+            with self.subTest(name):
+                self.assertModified(self.urls[name], self.toggle_like)
+
+    def test_comment_changes_etag(self):
+        """Test new comments retire the comment listing tag"""
+        self.assertModified(
+            self.urls["comments"],
+            lambda: Comment.objects.create(post=self.post, content="New", created_by=self.viewer),
+        )
+
+    def test_edit_changes_etag(self):
+        """Test editing a post retires its tag"""
+        self.client.force_login(self.author)
+        self.assertModified(
+            self.urls["post"],
+            lambda: self.client.patch(
+                self.urls["post"],
+                json.dumps({"content": "Edited"}),
+                content_type="application/json",
+            ),
+        )
+
+    def test_follow_changes_etag(self):
+        """Test following retires the profile tag"""
+        self.client.force_login(self.viewer)
+        self.assertModified(
+            self.urls["user"],
+            lambda: self.client.post(reverse("follow", kwargs={"username": "author"})),
+        )
+
+    def test_rebuild_counters_changes_etag(self):
+        """Test counters fixed outside the views retire every tag"""
+        Post.objects.filter(pk=self.post.pk).update(likes_count=5)
+
+        self.assertModified(
+            self.urls["post"], lambda: call_command("rebuild_counters", stdout=StringIO())
+        )
+        self.assertEqual(json.loads(self.get(self.urls["post"]).content)["post"]["likes_count"], 0)
+
+    def test_unknown_user_has_no_etag(self):
+        """Test missing users still get a 404"""
+        response = self.get(reverse("user_detail", kwargs={"username": "ghost"}), "anything")
+
+        self.assertEqual(response.status_code, 404)
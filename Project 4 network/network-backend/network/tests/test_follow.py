@@ -1,14 +1,20 @@
 import json
+import os
+import tempfile
 from datetime import timedelta
+from io import StringIO
 from unittest.mock import MagicMock, patch
 
 from django.contrib.auth import get_user_model
 from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import connection
 from django.db.utils import DatabaseError, IntegrityError
-from django.test import Client, TestCase
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
-from network.models import Following, Post
+from network.models import Following, Post, TimelineEntry
 
 User = get_user_model()
 
@@ -187,6 +193,25 @@ class FollowViewTests(TestCase):
         self.assertEqual(data["data"]["following_count"], 0)
         self.assertEqual(data["data"]["target_user_followers"], 0)
 
+    def test_concurrent_unfollow_decrements_once(self):
+        """Test an unfollow that found the follow already deleted does not decrement"""
+        self.client.login(username="testuser1", password="testpass123")
+        Following.objects.create(follower=self.user1, following=self.user2)
+        # Other follows keep the counters above their floor of zero
+        User.adjust_counters(self.user1.pk, following_count=2)
+        User.adjust_counters(self.user2.pk, follower_count=2)
+        url = reverse("follow", kwargs={"username": "testuser2"})
+
+        # Both requests see the follow, as if they checked before either deleted it
+        with patch("django.db.models.query.QuerySet.exists", return_value=True):
+            self.client.delete(url)
+            self.client.delete(url)
+
+        self.user1.refresh_from_db()
+        self.user2.refresh_from_db()
+        self.assertEqual(self.user1.following_count, 1)
+        self.assertEqual(self.user2.follower_count, 1)
+
     def test_unfollow_not_following(self):
         """Test unfollowing a user that's not being followed"""
         self.client.login(username="testuser1", password="testpass123")
@@ -266,6 +291,195 @@ class FollowViewTests(TestCase):
             self.assertEqual(data["error"], "Only accept POST and DELETE method.")
 
 
+class BatchFollowViewTests(TestCase):
+    def setUp(self):
+        # Create test users
+        self.user = User.objects.create_user(username="follower", password="testpass123")
+        self.targets = [
+            User.objects.create_user(username=f"target{i}", password="testpass123")
+            for i in range(3)
+        ]
+        self.url = reverse("batch_follow")
+        self.client = Client()
+        self.client.login(username="follower", password="testpass123")
+
+    def send(self, method, usernames):
+        return getattr(self.client, method)(
+            self.url, json.dumps({"usernames": usernames}), content_type="application/json"
+        )
+
+    def test_follow_many(self):
+        """Test following several users in one request"""
+        Following.objects.create(follower=self.user, following=self.targets[0])
+        User.adjust_counters(self.user.pk, following_count=1)
+        User.adjust_counters(self.targets[0].pk, follower_count=1)
+
+        response = self.send("post", ["target0", "target1", "target2", "nobody", "target1"])
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)["data"]
+        self.assertEqual(data["followed"], ["target1", "target2"])
+        self.assertEqual(data["already_following"], ["target0"])
+        self.assertEqual(data["not_found"], ["nobody"])
+        self.assertEqual(data["following_count"], 3)
+        self.assertEqual(data["target_user_followers"], {"target0": 1, "target1": 1, "target2": 1})
+        self.assertEqual(Following.objects.filter(follower=self.user).count(), 3)
+
+    @override_settings(NETWORK_AUTH_CACHE_TIMEOUT=0)
+    def test_follow_many_queries(self):
+        """Test the number of queries does not grow with the batch"""
+        # The user is loaded on every request, however the batch retires its cache entry
+        with self.assertNumQueries(11):
+            self.send("post", ["target0"])
+        Following.objects.all().delete()
+        User.objects.update(following_count=0, follower_count=0)
+
+        with self.assertNumQueries(11):
+            self.send("post", ["target0", "target1", "target2"])
+
+    @override_settings(
+        NETWORK_AUTH_CACHE_TIMEOUT=0,
+        NETWORK_TIMELINE_ENABLED=True,
+        NETWORK_TIMELINE_BACKFILL_LIMIT=2,
+    )
+    def test_timeline_queries(self):
+        """Test seeding and pulling timelines adds no queries per user in the batch"""
+        for target in self.targets:
+            for i in range(3):
+                Post.objects.create(content=f"Post {i}", created_by=target)
+
+        with CaptureQueriesContext(connection) as one:
+            self.send("post", ["target0"])
+        with CaptureQueriesContext(connection) as many:
+            self.send("post", ["target1", "target2"])
+        self.assertEqual(len(many), len(one))
+        self.assertEqual(
+            sorted(TimelineEntry.objects.values_list("author__username", flat=True)),
+            ["target0", "target0", "target1", "target1", "target2", "target2"],
+        )
+
+        with CaptureQueriesContext(connection) as one:
+            self.send("delete", ["target0"])
+        with CaptureQueriesContext(connection) as many:
+            self.send("delete", ["target1", "target2"])
+        self.assertEqual(len(many), len(one))
+        self.assertFalse(TimelineEntry.objects.exists())
+
+    def test_unfollow_many(self):
+        """Test unfollowing several users in one request"""
+        self.send("post", ["target0", "target1"])
+
+        response = self.send("delete", ["target0", "target2"])
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)["data"]
+        self.assertEqual(data["unfollowed"], ["target0"])
+        self.assertEqual(data["not_following"], ["target2"])
+        self.assertEqual(data["following_count"], 1)
+        self.assertEqual(data["target_user_followers"], {"target0": 0, "target2": 0})
+        self.assertEqual(
+            list(Following.objects.values_list("following__username", flat=True)), ["target1"]
+        )
+
+    def test_follow_many_updates_etag(self):
+        """Test a batch follow changes the followed user's ETag"""
+        url = reverse("user_detail", kwargs={"username": "target0"})
+        etag = self.client.get(url)["ETag"]
+
+        self.send("post", ["target0"])
+
+        response = self.client.get(url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+
+    def test_unauthenticated(self):
+        """Test batch follow when user is not logged in"""
+        self.client.logout()
+
+        response = self.send("post", ["target0"])
+
+        self.assertEqual(response.status_code, 401)
+
+    def test_follow_self(self):
+        """Test a batch containing the user is rejected"""
+        response = self.send("post", ["target0", "follower"])
+
+        self.assertEqual(response.status_code, 403)
+        self.assertFalse(Following.objects.exists())
+
+    def test_invalid_usernames(self):
+        """Test malformed, empty and oversized batches are rejected"""
+        for usernames in ["target0", [1, 2], [], [f"user{i}" for i in range(501)]]:
+            with self.subTest(usernames=usernames):
+                response = self.send("post", usernames)
+                self.assertEqual(response.status_code, 400)
+
+    def test_invalid_json(self):
+        """Test batch follow with a body that is not JSON"""
+        response = self.client.post(self.url, "not json", content_type="application/json")
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(json.loads(response.content)["error"], "Invalid JSON data.")
+
+    def test_database_error(self):
+        """Test database error when following users"""
+        with patch("network.follows.follow_many", side_effect=DatabaseError("Database error")):
+            response = self.send("post", ["target0"])
+
+        self.assertEqual(response.status_code, 500)
+
+    def test_invalid_http_method(self):
+        """Test batch follow with an unsupported method"""
+        response = self.client.get(self.url)
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            json.loads(response.content)["error"], "Only accept POST and DELETE method."
+        )
+
+
+class ImportFollowsCommandTests(TestCase):
+    def setUp(self):
+        # Create test users
+        for name in ["alice", "bob", "carol"]:
+            User.objects.create_user(username=name, password="testpass123")
+        Following.objects.create(
+            follower=User.objects.get(username="alice"), following=User.objects.get(username="bob")
+        )
+
+    def import_csv(self, content, *args):
+        with tempfile.NamedTemporaryFile("w", suffix=".csv", delete=False) as file:
+            file.write(content)
+        self.addCleanup(os.remove, file.name)
+
+        out = StringIO()
+        call_command("import_follows", file.name, *args, stdout=out)
+        return out.getvalue()
+
+    def test_import(self):
+        """Test importing a follow graph creates follows and recounts counters"""
+        output = self.import_csv(
+            "follower,following\n"
+            "alice,bob\n"
+            "alice,carol\n"
+            "bob,carol\n"
+            "carol,carol\n"
+            "dave,alice\n",
+            "--batch-size",
+            "2",
+        )
+
+        self.assertIn("Read 5 rows: 2 follows created, 3 skipped.", output)
+        self.assertEqual(Following.objects.count(), 3)
+        counts = dict(User.objects.values_list("username", "following_count"))
+        self.assertEqual(counts, {"alice": 2, "bob": 1, "carol": 0})
+        self.assertEqual(User.objects.get(username="carol").follower_count, 2)
+
+    def test_missing_columns(self):
+        """Test a CSV without follower and following columns is rejected"""
+        with self.assertRaises(CommandError):
+            self.import_csv("source,target\nalice,bob\n")
+
+
 class PostsFollowingViewTests(TestCase):
     def setUp(self):
         # Create test users
@@ -348,6 +562,32 @@ class PostsFollowingViewTests(TestCase):
         self.assertEqual(posts[0]["content"], "Newer post by user2")
         self.assertEqual(posts[1]["content"], "Test post 1 by user2")
 
+    def test_get_following_posts_paginated(self):
+        """Test that following posts are paged with a cursor"""
+        self.client.login(username="testuser1", password="testpass123")
+
+        for i in range(3):
+            Post.objects.create(content=f"Extra post {i}", created_by=self.user2)
+
+        response = self.client.get(reverse("posts_following"), {"page_size": 2})
+        data = json.loads(response.content)
+
+        self.assertEqual(
+            [post["content"] for post in data["posts"]], ["Extra post 2", "Extra post 1"]
+        )
+        self.assertIsNotNone(data["next"])
+
+        response = self.client.get(
+            reverse("posts_following"), {"page_size": 2, "cursor": data["next"]}
+        )
+        data = json.loads(response.content)
+
+        self.assertEqual(
+            [post["content"] for post in data["posts"]],
+            ["Extra post 0", "Test post 1 by user2"],
+        )
+        self.assertIsNone(data["next"])
+
     def test_invalid_http_method(self):
         """Test invalid HTTP methods"""
         self.client.login(username="testuser1", password="testpass123")
@@ -379,9 +619,9 @@ class PostsFollowingViewTests(TestCase):
     def test_post_does_not_exist(self, mock_select_related):
         """Test handling of Post.DoesNotExist"""
         self.client.login(username="testuser1", password="testpass123")
-        mock_queryset = mock_select_related.return_value.prefetch_related.return_value
+        mock_queryset = mock_select_related.return_value
         mock_chain = mock_queryset.filter.return_value.order_by.return_value
-        mock_chain.__iter__.side_effect = Post.DoesNotExist()
+        mock_chain.__getitem__.return_value.__iter__.side_effect = Post.DoesNotExist()
 
         response = self.client.get(reverse("posts_following"))
 
@@ -0,0 +1,195 @@
+import json
+from io import StringIO
+from unittest.mock import patch
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.core.management.base import SystemCheckError
+from django.db import connection
+from django.test import Client, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from network import like_buffer, likes
+from network.checks import check_like_buffer_cache
+from network.models import Like, Post
+from network.tests.utils import like_buffer_settings
+
+User = get_user_model()
+
+
+@like_buffer_settings()
+class LikeBufferTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        like_buffer.get_cache().clear()
+
+        self.author = User.objects.create_user(username="author", password="testpass123")
+        self.post = Post.objects.create(content="Viral post", created_by=self.author)
+        self.fans = User.objects.bulk_create([User(username=f"fan{i}") for i in range(100)])
+
+        self.client = Client()
+
+    def merged_count(self):
+        response = self.client.get(reverse("post", kwargs={"post_id": self.post.id}))
+        return json.loads(response.content)["post"]["likes_count"]
+
+    def flush(self):
+        while likes.flush_buffer(batch_size=30):
+            pass
+
+    def test_like_is_buffered(self):
+        """Test a buffered like writes nothing and is visible at once"""
+        self.client.force_login(self.fans[0])
+        url = reverse("like", kwargs={"post_id": self.post.id})
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["likes_count"], 1)
+        writes = [
+            query["sql"]
+            for query in queries
+            if query["sql"].startswith(("INSERT", "UPDATE", "DELETE"))
+            and ("network_like" in query["sql"] or "network_post" in query["sql"])
+        ]
+        self.assertEqual(writes, [])
+        self.assertFalse(Like.objects.exists())
+
+        post = json.loads(
+            self.client.get(reverse("post", kwargs={"post_id": self.post.id})).content
+        )["post"]
+        self.assertEqual(post["likes_count"], 1)
+        self.assertTrue(post["is_liked"])
+
+    def test_burst(self):
+        """Test a burst of repeated likes and unlikes flushes to the exact final state"""
+        for fan in self.fans:
+            likes.add_like(fan, self.post.id)
+            likes.add_like(fan, self.post.id)
+        for fan in self.fans[:25]:
+            likes.remove_like(fan, self.post.id)
+        for fan in self.fans[:10]:
+            likes.add_like(fan, self.post.id)
+
+        self.assertEqual(self.merged_count(), 85)
+        self.assertFalse(Like.objects.exists())
+
+        self.flush()
+
+        self.assertEqual(Like.objects.filter(post=self.post).count(), 85)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 85)
+        self.assertEqual(like_buffer.deltas([self.post.id]), {})
+        self.assertEqual(self.merged_count(), 85)
+
+    def test_unlike_flushed_like(self):
+        """Test unliking a like already in the database is buffered and then deleted"""
+        likes.add_like(self.fans[0], self.post.id)
+        self.flush()
+
+        self.assertEqual(likes.remove_like(self.fans[0], self.post.id), 0)
+        self.assertTrue(Like.objects.exists())
+
+        self.flush()
+
+        self.assertFalse(Like.objects.exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
+
+    def test_unlike_waits_for_like(self):
+        """Test an unlike arriving while the same user's like holds the lock is applied after it"""
+        likes.add_like(self.fans[0], self.post.id)
+        like_buffer.acquire(self.post.id, self.fans[0].pk)
+
+        # The like finishes while the unlike waits
+        def finish(seconds):
+            like_buffer.release(self.post.id, self.fans[0].pk)
+
+        with patch("network.like_buffer.time.sleep", side_effect=finish):
+            self.assertEqual(likes.remove_like(self.fans[0], self.post.id), 0)
+
+        self.assertFalse(like_buffer.intent(self.post.id, self.fans[0].pk))
+        self.flush()
+        self.assertFalse(Like.objects.exists())
+
+    @patch("network.like_buffer.LOCK_WAIT", 0)
+    def test_held_lock_is_reported(self):
+        """Test a click that can not take the lock is refused instead of reported as done"""
+        like_buffer.acquire(self.post.id, self.fans[0].pk)
+        self.client.force_login(self.fans[0])
+
+        response = self.client.post(reverse("like", kwargs={"post_id": self.post.id}))
+
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(like_buffer.pending(10), [])
+
+    def test_flush_is_idempotent(self):
+        """Test replaying entries whose acknowledgement was lost does not count them twice"""
+        for fan in self.fans[:5]:
+            likes.add_like(fan, self.post.id)
+
+        with patch("network.like_buffer.acknowledge"):
+            likes.flush_buffer()
+        likes.flush_buffer()
+
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 5)
+        self.assertEqual(self.merged_count(), 5)
+
+    def test_lost_entry_stalls_flush_until_timeout(self):
+        """Test an entry counted but never written is skipped once it is GAP_TIMEOUT old"""
+        # A request that died between taking its sequence number and writing its entry
+        like_buffer.incr(like_buffer.SEQ_KEY, 1)
+        likes.add_like(self.fans[0], self.post.id)
+
+        self.assertEqual(likes.flush_buffer(), 0)
+
+        later = like_buffer.time.time() + like_buffer.GAP_TIMEOUT + 1
+        with patch("network.like_buffer.time.time", return_value=later):
+            self.assertEqual(likes.flush_buffer(), 1)
+
+        self.assertTrue(Like.objects.filter(user=self.fans[0], post=self.post).exists())
+        self.assertEqual(like_buffer.pending(10), [])
+
+    @override_settings(NETWORK_LIKE_BUFFER_CACHE="default")
+    def test_local_cache_is_refused(self):
+        """Test the system check refuses a process-local cache, and requests still work"""
+        self.assertEqual([error.id for error in check_like_buffer_cache(None)], ["network.E001"])
+        with self.assertRaises(SystemCheckError):
+            call_command("check", stdout=StringIO(), stderr=StringIO())
+
+        response = self.client.get(reverse("post", kwargs={"post_id": self.post.id}))
+        self.assertEqual(response.status_code, 200)
+
+    @override_settings(NETWORK_LIKE_BUFFER_ENABLED=False, NETWORK_LIKE_BUFFER_CACHE="default")
+    def test_local_cache_is_fine_when_disabled(self):
+        """Test the system check ignores the buffer cache while the buffer is off"""
+        self.assertEqual(check_like_buffer_cache(None), [])
+
+    def test_deleted_post_is_skipped(self):
+        """Test likes of a post deleted before the flush are dropped"""
+        likes.add_like(self.fans[0], self.post.id)
+        self.post.delete()
+
+        self.assertEqual(likes.flush_buffer(), 1)
+        self.assertFalse(Like.objects.exists())
+        self.assertEqual(like_buffer.pending(10), [])
+
+    def test_missing_post(self):
+        """Test liking a missing post is not buffered"""
+        self.assertIsNone(likes.add_like(self.fans[0], 99999))
+        self.assertEqual(like_buffer.pending(10), [])
+
+    def test_flush_likes_command(self):
+        """Test the management command flushes every buffered entry"""
+        for fan in self.fans[:3]:
+            likes.add_like(fan, self.post.id)
+
+        out = StringIO()
+        call_command("flush_likes", batch_size=2, stdout=out)
+
+        self.assertEqual(out.getvalue().strip(), "Flushed 3 buffered likes.")
+        self.assertEqual(Like.objects.count(), 3)
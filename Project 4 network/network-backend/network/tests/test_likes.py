@@ -1,10 +1,11 @@
 import json
-from unittest.mock import MagicMock, patch
+from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
-from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db.utils import DatabaseError, IntegrityError
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from network.models import Like, Post
 
@@ -35,8 +36,10 @@ class PostLikeViewTests(TestCase):
         data = json.loads(response.content)
         self.assertEqual(data["message"], "Post liked successfully.")
 
-        # Verify like was created
+        # Verify like was created and counted
         self.assertTrue(Like.objects.filter(user=self.user2, post=self.post).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
 
     def test_like_post_unauthenticated(self):
         """Test liking post when not logged in"""
@@ -62,41 +65,63 @@ class PostLikeViewTests(TestCase):
         self.assertEqual(data["error"], "Post not found.")
 
     def test_like_already_liked_post(self):
-        """Test liking already liked post"""
+        """Test liking an already liked post succeeds without counting it twice"""
         self.client.login(username="testuser2", password="testpass123")
-        Like.objects.create(user=self.user2, post=self.post)
+        url = reverse("like", kwargs={"post_id": self.post.id})
 
-        response = self.client.post(
-            reverse("like", kwargs={"post_id": self.post.id}),
-            content_type="application/json",
-        )
+        for _ in range(2):
+            response = self.client.post(url, content_type="application/json")
 
-        self.assertEqual(response.status_code, 400)
-        data = json.loads(response.content)
-        self.assertEqual(data["error"], "You have already liked this post.")
+            self.assertEqual(response.status_code, 200)
+            data = json.loads(response.content)
+            self.assertEqual(data["likes_count"], 1)
+            self.assertTrue(data["is_liked"])
 
-    def test_like_post_integrity_error(self):
-        """Test integrity error when liking post"""
+        self.assertEqual(Like.objects.filter(user=self.user2, post=self.post).count(), 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 1)
+
+    def test_like_returns_fresh_count(self):
+        """Test the response carries the post's new likes_count"""
+        Like.objects.create(user=self.user1, post=self.post)
+        Post.adjust_counters(self.post.pk, likes_count=1)
         self.client.login(username="testuser2", password="testpass123")
 
-        with patch("network.models.Like.objects.create") as mock_create:
-            mock_create.side_effect = IntegrityError()
+        response = self.client.post(reverse("like", kwargs={"post_id": self.post.id}))
 
-            response = self.client.post(
-                reverse("like", kwargs={"post_id": self.post.id}),
-                content_type="application/json",
-            )
+        self.assertEqual(json.loads(response.content)["likes_count"], 2)
 
-            self.assertEqual(response.status_code, 400)
-            data = json.loads(response.content)
-            self.assertEqual(data["error"], "Data integrity error, please check your input.")
+    def test_like_queries(self):
+        """Test liking and unliking each touch the post and like tables in two queries"""
+        self.client.force_login(self.user2)
+        url = reverse("like", kwargs={"post_id": self.post.id})
 
-    def test_like_post_validation_error(self):
-        """Test validation error when liking post"""
+        for method in ["post", "post", "delete", "delete"]:
+            with CaptureQueriesContext(connection) as queries:
+                response = getattr(self.client, method)(url)
+
+            self.assertEqual(response.status_code, 200)
+            statements = [
+                query["sql"]
+                for query in queries
+                if "network_like" in query["sql"] or "network_post" in query["sql"]
+            ]
+            self.assertEqual(len(statements), 2, statements)
+
+    def test_like_nonexistent_post_creates_nothing(self):
+        """Test liking a missing post leaves no like behind"""
         self.client.login(username="testuser2", password="testpass123")
 
-        with patch("network.models.Like.objects.create") as mock_create:
-            mock_create.side_effect = ValidationError("Invalid data")
+        self.client.post(reverse("like", kwargs={"post_id": 99999}))
+
+        self.assertFalse(Like.objects.exists())
+
+    def test_like_post_integrity_error(self):
+        """Test integrity error when liking post"""
+        self.client.login(username="testuser2", password="testpass123")
+
+        with patch("network.likes.add_like") as mock_add:
+            mock_add.side_effect = IntegrityError()
 
             response = self.client.post(
                 reverse("like", kwargs={"post_id": self.post.id}),
@@ -105,14 +130,14 @@ class PostLikeViewTests(TestCase):
 
             self.assertEqual(response.status_code, 400)
             data = json.loads(response.content)
-            self.assertEqual(data["error"], "Validation error: Invalid data")
+            self.assertEqual(data["error"], "Data integrity error, please check your input.")
 
     def test_like_post_database_error(self):
         """Test database error when liking post"""
         self.client.login(username="testuser2", password="testpass123")
 
-        with patch("network.models.Like.objects.create") as mock_create:
-            mock_create.side_effect = DatabaseError()
+        with patch("network.likes.add_like") as mock_add:
+            mock_add.side_effect = DatabaseError()
 
             response = self.client.post(
                 reverse("like", kwargs={"post_id": self.post.id}),
@@ -127,8 +152,8 @@ class PostLikeViewTests(TestCase):
         """Test general error when liking post"""
         self.client.login(username="testuser2", password="testpass123")
 
-        with patch("network.models.Like.objects.create") as mock_create:
-            mock_create.side_effect = Exception("Unexpected error")
+        with patch("network.likes.add_like") as mock_add:
+            mock_add.side_effect = Exception("Unexpected error")
 
             response = self.client.post(
                 reverse("like", kwargs={"post_id": self.post.id}),
@@ -153,11 +178,15 @@ class PostLikeViewTests(TestCase):
         data = json.loads(response.content)
         self.assertEqual(data["message"], "Post unliked successfully.")
 
-        # Verify like was deleted
+        # Verify like was deleted and uncounted
         self.assertFalse(Like.objects.filter(user=self.user2, post=self.post).exists())
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.likes_count, 0)
 
     def test_unlike_not_liked_post(self):
-        """Test unliking not liked post"""
+        """Test unliking a post that is not liked succeeds without changing the count"""
+        Like.objects.create(user=self.user1, post=self.post)
+        Post.adjust_counters(self.post.pk, likes_count=1)
         self.client.login(username="testuser2", password="testpass123")
 
         response = self.client.delete(
@@ -165,21 +194,28 @@ class PostLikeViewTests(TestCase):
             content_type="application/json",
         )
 
-        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.status_code, 200)
         data = json.loads(response.content)
-        self.assertEqual(data["error"], "You have not liked this post.")
+        self.assertEqual(data["message"], "Post unliked successfully.")
+        self.assertEqual(data["likes_count"], 1)
+        self.assertFalse(data["is_liked"])
+
+    def test_unlike_nonexistent_post(self):
+        """Test unliking nonexistent post"""
+        self.client.login(username="testuser2", password="testpass123")
+
+        response = self.client.delete(reverse("like", kwargs={"post_id": 99999}))
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(json.loads(response.content)["error"], "Post not found.")
 
     def test_unlike_post_database_error(self):
         """Test database error when unliking post"""
         self.client.login(username="testuser2", password="testpass123")
         Like.objects.create(user=self.user2, post=self.post)
 
-        with patch("network.models.Like.objects.filter") as mock_filter:
-            mock_queryset = MagicMock()
-            mock_queryset.exists.return_value = True
-            mock_queryset.first.return_value = Like(user=self.user2)
-            mock_queryset.delete.side_effect = DatabaseError()
-            mock_filter.return_value = mock_queryset
+        with patch("network.likes.remove_like") as mock_remove:
+            mock_remove.side_effect = DatabaseError()
 
             response = self.client.delete(
                 reverse("like", kwargs={"post_id": self.post.id}),
@@ -188,19 +224,15 @@ class PostLikeViewTests(TestCase):
 
             self.assertEqual(response.status_code, 500)
             data = json.loads(response.content)
-            self.assertEqual(data["error"], "Database operation error.")
+            self.assertEqual(data["error"], "Database operation error, please try again later.")
 
     def test_unlike_post_general_error(self):
         """Test general error when unliking post"""
         self.client.login(username="testuser2", password="testpass123")
         Like.objects.create(user=self.user2, post=self.post)
 
-        with patch("network.models.Like.objects.filter") as mock_filter:
-            mock_queryset = MagicMock()
-            mock_queryset.exists.return_value = True
-            mock_queryset.first.return_value = Like(user=self.user2)
-            mock_queryset.delete.side_effect = Exception("Unexpected error")
-            mock_filter.return_value = mock_queryset
+        with patch("network.likes.remove_like") as mock_remove:
+            mock_remove.side_effect = Exception("Unexpected error")
 
             response = self.client.delete(
                 reverse("like", kwargs={"post_id": self.post.id}),
@@ -0,0 +1,94 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from network import metrics
+from network.models import Post
+
+User = get_user_model()
+
+
+@override_settings(NETWORK_METRICS_SAMPLE_RATE=1)
+class InstrumentationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        metrics.reset()
+
+        # Create test users and posts
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.staff = User.objects.create_user(
+            username="staffuser", password="testpass123", is_staff=True
+        )
+        Post.objects.bulk_create(
+            [Post(content=f"Post {i}", created_by=self.user) for i in range(3)]
+        )
+
+        self.client = Client()
+
+    def timings(self, response):
+        return dict(
+            entry.split(";", 1) and (entry.split(";")[0], entry)
+            for entry in response["Server-Timing"].split(", ")
+        )
+
+    def test_server_timing(self):
+        """Test sampled responses report SQL, serialization and total time"""
+        response = self.client.get(reverse("posts"))
+
+        timings = self.timings(response)
+        self.assertEqual(set(timings), {"db", "serialize", "total"})
+        self.assertIn('desc="1 queries"', timings["db"])
+
+    def test_metrics_endpoint(self):
+        """Test staff see each view's rolling percentiles"""
+        for _ in range(3):
+            self.client.get(reverse("posts"))
+        self.client.force_login(self.staff)
+
+        response = self.client.get(reverse("metrics"))
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual(data["sample_rate"], 1)
+        posts = data["views"]["posts"]
+        self.assertEqual(posts["count"], 3)
+        self.assertEqual(posts["queries"], {"p50": 1, "p95": 1, "p99": 1})
+        self.assertGreater(posts["bytes"]["p50"], 0)
+        self.assertGreater(posts["total_ms"]["p99"], 0)
+
+    def test_window(self):
+        """Test only the last NETWORK_METRICS_WINDOW samples of a view are kept"""
+        with self.settings(NETWORK_METRICS_WINDOW=2):
+            for _ in range(5):
+                self.client.get(reverse("posts"))
+
+        self.assertEqual(metrics.snapshot()["posts"]["count"], 2)
+
+    def test_metrics_staff_only(self):
+        """Test other users can not see the metrics"""
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        self.client.force_login(self.user)
+        self.assertEqual(self.client.get(reverse("metrics")).status_code, 403)
+
+        self.client.force_login(self.staff)
+        self.assertEqual(self.client.post(reverse("metrics")).status_code, 405)
+
+    def test_not_sampled(self):
+        """Test requests left out of the sample are not instrumented"""
+        with self.settings(NETWORK_METRICS_SAMPLE_RATE=0):
+            response = self.client.get(reverse("posts"))
+
+        self.assertNotIn("Server-Timing", response)
+        self.assertEqual(metrics.snapshot(), {})
+
+    @override_settings(ROOT_URLCONF="network.async_urls")
+    async def test_async_view(self):
+        """Test queries of async views are counted"""
+        response = await self.async_client.get(reverse("posts"))
+
+        self.assertIn('desc="1 queries"', response["Server-Timing"])
+        self.assertEqual(metrics.snapshot()["posts"]["queries"]["p50"], 1)
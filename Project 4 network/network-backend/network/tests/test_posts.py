@@ -3,13 +3,17 @@ from datetime import timedelta
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
 from django.core.exceptions import ValidationError
+from django.db import connection
 from django.db.utils import DatabaseError, IntegrityError
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
 
-from network.models import Like, Post
+from network.models import NOT_DELETED, Comment, Like, Post
+from network.pagination import walk
 
 User = get_user_model()
 
@@ -87,9 +91,11 @@ class PostsListViewTests(TestCase):
     def test_get_posts_object_does_not_exist(self, mock_select_related):
         """Test handling of Post.DoesNotExist error when getting posts"""
         # Mock the chain of queryset methods
-        mock_queryset = mock_select_related.return_value.prefetch_related.return_value
+        mock_queryset = mock_select_related.return_value
         mock_chain = mock_queryset.filter.return_value.order_by.return_value
-        mock_chain.__iter__.side_effect = Post.DoesNotExist("Posts do not exist")
+        mock_chain.__getitem__.return_value.__iter__.side_effect = Post.DoesNotExist(
+            "Posts do not exist"
+        )
 
         response = self.client.get(reverse("posts"))
 
@@ -101,9 +107,9 @@ class PostsListViewTests(TestCase):
     def test_get_posts_database_error(self, mock_select_related):
         """Test handling of DatabaseError when getting posts"""
         # Mock the chain of queryset methods
-        mock_queryset = mock_select_related.return_value.prefetch_related.return_value
+        mock_queryset = mock_select_related.return_value
         mock_chain = mock_queryset.filter.return_value.order_by.return_value
-        mock_chain.__iter__.side_effect = DatabaseError("Database error")
+        mock_chain.__getitem__.return_value.__iter__.side_effect = DatabaseError("Database error")
 
         response = self.client.get(reverse("posts"))
 
@@ -115,9 +121,9 @@ class PostsListViewTests(TestCase):
     def test_get_posts_general_exception(self, mock_select_related):
         """Test handling of general Exception when getting posts"""
         # Mock the chain of queryset methods
-        mock_queryset = mock_select_related.return_value.prefetch_related.return_value
+        mock_queryset = mock_select_related.return_value
         mock_chain = mock_queryset.filter.return_value.order_by.return_value
-        mock_chain.__iter__.side_effect = Exception("Unexpected error")
+        mock_chain.__getitem__.return_value.__iter__.side_effect = Exception("Unexpected error")
 
         response = self.client.get(reverse("posts"))
 
@@ -126,6 +132,358 @@ class PostsListViewTests(TestCase):
         self.assertEqual(data["error"], "Unexpected error")
 
 
+class PostsPaginationTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+
+        # Create 25 posts, newest last
+        self.posts = [
+            Post.objects.create(content=f"Post {i}", created_by=self.user) for i in range(25)
+        ]
+
+        self.client = Client()
+
+    def get_page(self, **params):
+        response = self.client.get(reverse("posts"), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_first_page_default_size(self):
+        """First page holds the 10 newest posts and a next cursor"""
+        data = self.get_page()
+
+        self.assertEqual(len(data["posts"]), 10)
+        self.assertEqual(data["posts"][0]["content"], "Post 24")
+        self.assertEqual(data["posts"][-1]["content"], "Post 15")
+        self.assertIsNotNone(data["next"])
+        self.assertIsNone(data["prev"])
+
+    def test_walk_forward_and_back(self):
+        """Following next then prev cursors returns the same pages"""
+        first = self.get_page()
+        second = self.get_page(cursor=first["next"])
+        third = self.get_page(cursor=second["next"])
+
+        self.assertEqual(second["posts"][0]["content"], "Post 14")
+        self.assertEqual(len(third["posts"]), 5)
+        self.assertIsNone(third["next"])
+        self.assertIsNotNone(third["prev"])
+
+        back = self.get_page(cursor=third["prev"])
+        self.assertEqual(back["posts"], second["posts"])
+
+        back = self.get_page(cursor=back["prev"])
+        self.assertEqual(back["posts"], first["posts"])
+        self.assertIsNone(back["prev"])
+
+    def test_ties_on_created_at(self):
+        """Posts sharing a timestamp are neither skipped nor repeated"""
+        Post.objects.update(created_at=timezone.now())
+
+        seen = []
+        data = self.get_page(page_size=7)
+        seen += [post["id"] for post in data["posts"]]
+        while data["next"]:
+            data = self.get_page(page_size=7, cursor=data["next"])
+            seen += [post["id"] for post in data["posts"]]
+
+        self.assertEqual(seen, sorted((post.id for post in self.posts), reverse=True))
+
+    def test_cursor_seeks_feed_index(self):
+        """Test pages past a cursor seek the feed index instead of scanning up to the cursor"""
+        post = self.posts[10]
+        for direction in ["next", "prev"]:
+            with self.subTest(direction=direction):
+                cursor = (post.created_at, post.id, direction)
+                plan = walk(Post.objects.filter(NOT_DELETED), cursor)[:10].explain()
+
+                self.assertIn("SEARCH network_post USING INDEX post_feed_idx (created_at", plan)
+                self.assertNotIn("TEMP B-TREE", plan)
+
+    def test_page_size_is_bounded(self):
+        """Page size is capped at the maximum"""
+        for i in range(30):
+            Post.objects.create(content=f"Extra {i}", created_by=self.user)
+
+        data = self.get_page(page_size=1000)
+        self.assertEqual(len(data["posts"]), 50)
+
+    def test_invalid_page_size(self):
+        """Non-numeric and non-positive page sizes are rejected"""
+        for page_size in ["abc", "0", "-3"]:
+            response = self.client.get(reverse("posts"), {"page_size": page_size})
+            self.assertEqual(response.status_code, 400)
+
+    def test_invalid_cursor(self):
+        """Malformed cursors are rejected"""
+        response = self.client.get(reverse("posts"), {"cursor": "not-a-cursor"})
+
+        self.assertEqual(response.status_code, 400)
+        data = json.loads(response.content)
+        self.assertEqual(data["error"], "Invalid cursor.")
+
+
+class PostsFeedOptionsTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.post = Post.objects.create(content="Post", created_by=self.user)
+        for i in range(4):
+            Comment.objects.create(post=self.post, content=f"Comment {i}", created_by=self.user)
+        Comment.objects.create(
+            post=self.post, content="Deleted comment", created_by=self.user, is_deleted=True
+        )
+        self.client = Client()
+
+    def get_posts(self, **params):
+        response = self.client.get(reverse("posts"), params)
+        return response.status_code, json.loads(response.content)
+
+    def test_compact_by_default(self):
+        """Test feed posts carry counts but no comment list"""
+        status, data = self.get_posts()
+
+        self.assertEqual(status, 200)
+        post = data["posts"][0]
+        self.assertNotIn("comments", post)
+        self.assertNotIn("latest_comments", post)
+        self.assertIn("comments_count", post)
+
+    def test_latest_comments(self):
+        """Test the latest visible comments are returned newest first"""
+        status, data = self.get_posts(comments=2)
+
+        self.assertEqual(status, 200)
+        comments = data["posts"][0]["latest_comments"]
+        self.assertEqual([c["content"] for c in comments], ["Comment 3", "Comment 2"])
+
+    def test_latest_comments_skip_deleted(self):
+        """Test soft-deleted comments are never included"""
+        status, data = self.get_posts(comments=5)
+
+        self.assertEqual(status, 200)
+        comments = data["posts"][0]["latest_comments"]
+        self.assertEqual(len(comments), 4)
+        self.assertNotIn("Deleted comment", [c["content"] for c in comments])
+
+    def test_invalid_comments(self):
+        """Test comments must be an integer within the allowed range"""
+        for value, error in [
+            ("abc", "Comments must be an integer."),
+            ("-1", "Comments must be between 0 and 5."),
+            ("6", "Comments must be between 0 and 5."),
+        ]:
+            status, data = self.get_posts(comments=value)
+            self.assertEqual(status, 400)
+            self.assertEqual(data["error"], error)
+
+    def test_fields(self):
+        """Test fields trims each post to the selected keys"""
+        status, data = self.get_posts(fields="id,content,latest_comments", comments=1)
+
+        self.assertEqual(status, 200)
+        post = data["posts"][0]
+        self.assertEqual(set(post), {"id", "content", "latest_comments"})
+        self.assertEqual(len(post["latest_comments"]), 1)
+
+    def test_unknown_fields(self):
+        """Test unknown fields are rejected"""
+        status, data = self.get_posts(fields="id,comments,secret")
+
+        self.assertEqual(status, 400)
+        self.assertEqual(data["error"], "Unknown fields: comments, secret.")
+
+    def test_post_detail_options(self):
+        """Test the post detail endpoint accepts the same options"""
+        response = self.client.get(
+            reverse("post", kwargs={"post_id": self.post.id}), {"comments": 1, "fields": "id"}
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(json.loads(response.content)["post"], {"id": self.post.id})
+
+
+class PostsStreamingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="testuser", password="testpassword")
+        self.other_user = User.objects.create_user(username="otheruser", password="testpassword")
+        base = timezone.now()
+        self.posts = [
+            Post.objects.create(
+                content=f"Post {i}", created_by=self.user, created_at=base + timedelta(seconds=i)
+            )
+            for i in range(60)
+        ]
+        Post.objects.create(content="Deleted", created_by=self.user, is_deleted=True)
+        Like.objects.create(user=self.other_user, post=self.posts[-1])
+        Comment.objects.create(post=self.posts[-1], content="Comment", created_by=self.user)
+
+        self.client = Client()
+
+    def stream(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return response, b"".join(response.streaming_content)
+
+    def newest_first(self):
+        return [post.id for post in reversed(self.posts)]
+
+    def test_json_stream_sends_every_post(self):
+        """Test the JSON stream sends all visible posts past the page size cap"""
+        response, content = self.stream(reverse("posts"), stream="json", page_size=5)
+
+        self.assertEqual(response["Content-Type"], "application/json")
+        data = json.loads(content)
+        self.assertEqual(data["message"], "Get posts successfully.")
+        self.assertEqual([post["id"] for post in data["posts"]], self.newest_first())
+
+    def test_ndjson_stream(self):
+        """Test the NDJSON stream sends the envelope and then one post per line"""
+        response, content = self.stream(reverse("posts"), stream="ndjson")
+
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(lines[0], {"message": "Get posts successfully."})
+        self.assertEqual([post["id"] for post in lines[1:]], self.newest_first())
+
+    def test_stream_spans_chunks(self):
+        """Test chunks join into one valid document with the viewer's flags and options"""
+        self.client.force_login(self.other_user)
+
+        with patch("network.streaming.CHUNK_SIZE", 7):
+            _, content = self.stream(reverse("posts"), stream="json", comments=1)
+
+        posts = json.loads(content)["posts"]
+        self.assertEqual([post["id"] for post in posts], self.newest_first())
+        self.assertTrue(posts[0]["is_liked"])
+        self.assertEqual(len(posts[0]["latest_comments"]), 1)
+        self.assertFalse(any(post["is_liked"] for post in posts[1:]))
+
+    def test_stream_from_cursor(self):
+        """Test the stream starts past the given cursor"""
+        first_page = json.loads(self.client.get(reverse("posts"), {"page_size": 10}).content)
+
+        _, content = self.stream(reverse("posts"), stream="json", cursor=first_page["next"])
+
+        ids = [post["id"] for post in json.loads(content)["posts"]]
+        self.assertEqual(ids, self.newest_first()[10:])
+
+    def test_stream_fields(self):
+        """Test fields trims every streamed post"""
+        _, content = self.stream(reverse("posts"), stream="ndjson", fields="id")
+
+        lines = [json.loads(line) for line in content.decode().splitlines()[1:]]
+        self.assertTrue(all(set(post) == {"id"} for post in lines))
+
+    def test_empty_stream(self):
+        """Test a stream with no matching posts is still valid JSON"""
+        Post.objects.update(is_deleted=True)
+
+        _, content = self.stream(reverse("posts"), stream="json")
+
+        self.assertEqual(json.loads(content)["posts"], [])
+
+    def test_user_detail_stream(self):
+        """Test the profile stream sends the user header before the posts"""
+        _, content = self.stream(
+            reverse("user_detail", kwargs={"username": "testuser"}), stream="ndjson"
+        )
+
+        lines = [json.loads(line) for line in content.decode().splitlines()]
+        self.assertEqual(lines[0]["user"]["username"], "testuser")
+        self.assertEqual(len(lines) - 1, len(self.posts))
+
+    def test_following_stream(self):
+        """Test the following feed streams the posts of followed users"""
+        self.client.force_login(self.other_user)
+        self.client.post(reverse("follow", kwargs={"username": "testuser"}))
+
+        _, content = self.stream(reverse("posts_following"), stream="json")
+
+        self.assertEqual([post["id"] for post in json.loads(content)["posts"]], self.newest_first())
+
+    def test_invalid_stream(self):
+        """Test unknown stream formats are rejected"""
+        response = self.client.get(reverse("posts"), {"stream": "xml"})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(
+            json.loads(response.content)["error"], "Stream must be one of: json, ndjson."
+        )
+
+
+class PostsQueryCountTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.viewer = User.objects.create_user(username="viewer", password="testpassword")
+        self.authors = [
+            User.objects.create_user(username=f"author{i}", password="testpassword")
+            for i in range(3)
+        ]
+        self.client = Client()
+        self.client.force_login(self.viewer)
+
+    def create_posts(self, count):
+        """Create posts, each liked by the viewer and commented on by every author"""
+        for i in range(count):
+            post = Post.objects.create(content=f"Post {i}", created_by=self.authors[i % 3])
+            Like.objects.create(user=self.viewer, post=post)
+            for author in self.authors:
+                Comment.objects.create(post=post, content="Comment", created_by=author)
+
+    def count_queries(self, page_size):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("posts"), {"page_size": page_size})
+
+        self.assertEqual(response.status_code, 200)
+        posts = json.loads(response.content)["posts"]
+        self.assertEqual(len(posts), page_size)
+        self.assertTrue(all(post["is_liked"] for post in posts))
+        return len(queries)
+
+    def test_query_count_independent_of_page_size(self):
+        """Serializing a page takes the same number of queries for 2 or 20 posts"""
+        self.create_posts(20)
+
+        self.assertEqual(self.count_queries(2), self.count_queries(20))
+
+    def test_serialize_many_query_count(self):
+        """Counts come from stored columns and is_liked from a single lookup"""
+        self.create_posts(10)
+        posts = list(Post.objects.select_related("created_by"))
+
+        # Cached payloads leave only the batched is_liked lookup
+        Post.serialize_many(posts)
+        with self.assertNumQueries(1):
+            serialized = Post.serialize_many(posts, user=self.viewer)
+
+        self.assertEqual(len(serialized), 10)
+        self.assertTrue(all(post["is_liked"] for post in serialized))
+
+        # Anonymous viewers need no queries at all
+        with self.assertNumQueries(0):
+            Post.serialize_many(posts)
+
+    def test_latest_comments_single_query(self):
+        """Latest comments for a whole page come from one windowed query"""
+        self.create_posts(10)
+        without_comments = self.count_queries(10)
+
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse("posts"), {"page_size": 10, "comments": 2})
+
+        self.assertEqual(len(queries), without_comments + 1)
+        for post in json.loads(response.content)["posts"]:
+            self.assertEqual(len(post["latest_comments"]), 2)
+
+
 class PostsCreateViewTests(TestCase):
     def setUp(self):
         self.user = User.objects.create_user(username="testuser", password="testpassword")
@@ -344,7 +702,7 @@ class PostDetailViewTests(TestCase):
         """Test handling of database errors"""
         with patch("network.models.Post.objects.select_related") as mock_select_related:
             # Simulate database error
-            mock_queryset = mock_select_related.return_value.prefetch_related.return_value
+            mock_queryset = mock_select_related.return_value
             mock_queryset.get.side_effect = DatabaseError()
 
             response = self.client.get(reverse("post", kwargs={"post_id": self.post.id}))
@@ -357,7 +715,7 @@ class PostDetailViewTests(TestCase):
         """Test handling of general exceptions"""
         with patch("network.models.Post.objects.select_related") as mock_select_related:
             # Simulate general exception
-            mock_queryset = mock_select_related.return_value.prefetch_related.return_value
+            mock_queryset = mock_select_related.return_value
             mock_queryset.get.side_effect = Exception("Unexpected error")
 
             response = self.client.get(reverse("post", kwargs={"post_id": self.post.id}))
@@ -541,6 +899,24 @@ class PostEditViewTests(TestCase):
             data = json.loads(response.content)
             self.assertEqual(data["error"], "Unexpected error")
 
+    def test_edit_keeps_concurrent_counters(self):
+        """Test an edit of a post loaded before a like commits does not undo the like"""
+        self.client.login(username="testuser1", password="testpass123")
+        stale = Post.objects.get(pk=self.post.pk)
+        Post.objects.filter(pk=self.post.pk).update(likes_count=1, trend_score=1.0)
+
+        with patch.object(Post.objects, "get", return_value=stale):
+            response = self.client.patch(
+                reverse("post", kwargs={"post_id": self.post.id}),
+                json.dumps({"content": "New content"}),
+                content_type="application/json",
+            )
+
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.content, "New content")
+        self.assertEqual((self.post.likes_count, self.post.trend_score), (1, 1.0))
+
 
 class PostSoftDeleteViewTests(TestCase):
     def setUp(self):
@@ -571,6 +947,20 @@ class PostSoftDeleteViewTests(TestCase):
         self.assertTrue(updated_post.is_deleted)
         self.assertEqual(data["post"], updated_post.serialize())
 
+    def test_soft_delete_keeps_concurrent_counters(self):
+        """Test deleting a post loaded before a comment commits keeps the comment's count"""
+        self.client.login(username="testuser1", password="testpass123")
+        stale = Post.objects.get(pk=self.post.pk)
+        Post.adjust_counters(self.post.pk, comments_count=1)
+
+        with patch.object(Post.objects, "get", return_value=stale):
+            response = self.client.delete(reverse("post", kwargs={"post_id": self.post.id}))
+
+        self.assertEqual(response.status_code, 200)
+        self.post.refresh_from_db()
+        self.assertTrue(self.post.is_deleted)
+        self.assertEqual(self.post.comments_count, 1)
+
     def test_soft_delete_post_unauthenticated(self):
         """Test soft deletion when user is not logged in"""
         response = self.client.delete(
@@ -0,0 +1,127 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from network import suggestions, trending
+from network.models import Comment, Following, Like, Post
+from network.tests.utils import QueryCountMixin, load_budgets
+
+User = get_user_model()
+
+# Page sizes compared; every list below has more results than the largest
+SIZES = [3, 20]
+
+
+# The user is loaded on every request, so each count includes it once
+@override_settings(NETWORK_AUTH_CACHE_TIMEOUT=0, NETWORK_SUGGESTIONS_ENABLED=True)
+class QueryBudgetTests(QueryCountMixin, TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        # 60 users; the viewer follows the first 25, who follow the other 35
+        cls.viewer = User.objects.create_user(username="viewer", password="testpass123")
+        users = User.objects.bulk_create([User(username=f"user{i}") for i in range(60)])
+        # users[0] follows 35 users; users[25] has 25 followers and writes the most
+        cls.follower, cls.author = users[0], users[25]
+        Following.objects.bulk_create(
+            [Following(follower=cls.viewer, following=user) for user in users[:25]]
+            + [
+                Following(follower=follower, following=user)
+                for follower in users[:25]
+                for user in users[25:]
+            ]
+        )
+
+        # Two posts by each user, each liked by the viewer half the time and commented on
+        posts = Post.objects.bulk_create(
+            [
+                Post(content=f"Coffee post {i} of {user.username}", created_by=user)
+                for user in users
+                for i in range(2)
+            ]
+            + [Post(content=f"Coffee note {i}", created_by=cls.author) for i in range(25)]
+        )
+        Like.objects.bulk_create(
+            [Like(user=cls.viewer, post=post) for post in posts[::2]]
+            + [Like(user=users[1], post=post) for post in posts]
+        )
+        Comment.objects.bulk_create(
+            [
+                Comment(post=post, content=f"Coffee reply {i}", created_by=users[i + 1])
+                for post in posts
+                for i in range(2)
+            ]
+        )
+        cls.busy = posts[0]
+        Comment.objects.bulk_create(
+            [Comment(post=cls.busy, content="Busy", created_by=user) for user in users[:30]]
+        )
+        Post.objects.filter(pk__in=[post.pk for post in posts]).update(
+            trend_score=trending.event_score(1)
+        )
+
+        suggestions.recompute_all()
+        cls.budgets = load_budgets()
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.viewer)
+
+    def get(self, url, key, size, **params):
+        """GET a list endpoint with a cold cache, returning the length of its list"""
+        cache.clear()
+        response = self.client.get(url, {"page_size": size, **params})
+        self.assertEqual(response.status_code, 200)
+        return len(json.loads(response.content)[key])
+
+    def check(self, name, url, key, **params):
+        with self.subTest(endpoint=name):
+            self.assertConstantQueries(
+                lambda size: self.get(url, key, size, **params), SIZES, self.budgets[name]
+            )
+
+    def test_post_lists(self):
+        """Test the post feeds do not query per post"""
+        self.check("posts", reverse("posts"), "posts")
+        self.check("posts_with_comments", reverse("posts"), "posts", comments=3)
+        self.check("posts_following", reverse("posts_following"), "posts")
+        self.check("trending_posts", reverse("trending_posts"), "posts")
+        self.check("user_detail", reverse("user_detail", args=[self.author.username]), "posts")
+
+    def test_comment_list(self):
+        """Test the comments of a post do not query per comment"""
+        self.check("comments", reverse("comments", args=[self.busy.id]), "comments")
+
+    def test_user_lists(self):
+        """Test follower, following and suggestion lists do not query per user"""
+        self.check(
+            "user_followers", reverse("user_followers", args=[self.author.username]), "users"
+        )
+        self.check(
+            "user_following", reverse("user_following", args=[self.follower.username]), "users"
+        )
+        self.check("suggested_users", reverse("suggested_users"), "users")
+
+    def test_search(self):
+        """Test search results do not query per result"""
+        self.check("search", reverse("search"), "results", q="coffee")
+
+    def test_budgets_cover_endpoints(self):
+        """Test every budget belongs to an endpoint checked above"""
+        self.assertEqual(
+            set(self.budgets),
+            {
+                "posts",
+                "posts_with_comments",
+                "posts_following",
+                "trending_posts",
+                "user_detail",
+                "comments",
+                "user_followers",
+                "user_following",
+                "suggested_users",
+                "search",
+            },
+        )
@@ -0,0 +1,187 @@
+import json
+from unittest import skipUnless
+
+from django.apps import apps
+from django.contrib.auth import get_user_model
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from network import search
+from network.checks import check_search_triggers
+from network.models import Comment, Like, Post
+from network.signals import verify_search_index
+
+User = get_user_model()
+
+
+class SearchViewTests(TestCase):
+    def setUp(self):
+        # Create test users
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.client = Client()
+        self.url = reverse("search")
+
+        # Create test posts and comments
+        self.coffee = Post.objects.create(
+            content="Morning coffee, coffee and more coffee", created_by=self.user
+        )
+        self.tea = Post.objects.create(
+            content="Afternoon tea with a little coffee", created_by=self.user
+        )
+        self.other = Post.objects.create(content="Nothing to see here", created_by=self.user)
+        self.comment = Comment.objects.create(
+            post=self.other, content="I prefer coffee", created_by=self.user
+        )
+
+    def search(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def ids(self, data):
+        return [(result["type"], result[result["type"]]["id"]) for result in data["results"]]
+
+    def test_ranked_posts_and_comments(self):
+        """Test posts and comments are searched together and ranked by relevance"""
+        data = self.search(q="coffee")
+
+        self.assertEqual(data["message"], "Search successfully.")
+        self.assertEqual(self.ids(data)[0], ("post", self.coffee.id))
+        self.assertCountEqual(
+            self.ids(data),
+            [("post", self.coffee.id), ("post", self.tea.id), ("comment", self.comment.id)],
+        )
+        comment = next(result for result in data["results"] if result["type"] == "comment")
+        self.assertEqual(comment["post_id"], self.other.id)
+
+    def test_every_word_must_match(self):
+        """Test a multi-word query only matches content with every word"""
+        data = self.search(q="tea coffee")
+
+        self.assertEqual(self.ids(data), [("post", self.tea.id)])
+
+    def test_type_filter(self):
+        """Test searching only comments"""
+        data = self.search(q="coffee", type="comments")
+
+        self.assertEqual(self.ids(data), [("comment", self.comment.id)])
+
+    def test_query_syntax_is_literal(self):
+        """Test FTS operators and punctuation in the query are not interpreted"""
+        for query in ['coffee"', "(coffee)", "coffee*", "-coffee", "^coffee:"]:
+            with self.subTest(query=query):
+                self.assertEqual(len(self.search(q=query)["results"]), 3)
+
+        # Operators are plain words that must match too
+        self.assertEqual(self.search(q="coffee OR tea")["results"], [])
+        self.assertEqual(self.search(q="!!!")["results"], [])
+
+    def test_edit_updates_index(self):
+        """Test editing a post replaces its indexed content"""
+        self.tea.content = "Afternoon tea only"
+        self.tea.save()
+
+        self.assertNotIn(("post", self.tea.id), self.ids(self.search(q="coffee")))
+        self.assertEqual(self.ids(self.search(q="only")), [("post", self.tea.id)])
+
+    def test_soft_delete_removes_from_index(self):
+        """Test soft deleted posts and comments are no longer found"""
+        self.coffee.is_deleted = True
+        self.coffee.save()
+        Comment.objects.filter(pk=self.comment.pk).update(is_deleted=True)
+
+        self.assertEqual(self.ids(self.search(q="coffee")), [("post", self.tea.id)])
+
+        # Restoring a post indexes it again
+        Post.objects.filter(pk=self.coffee.pk).update(is_deleted=False)
+        self.assertIn(("post", self.coffee.id), self.ids(self.search(q="coffee")))
+
+    def test_comments_on_deleted_posts_hidden(self):
+        """Test comments are not returned when their post is soft deleted"""
+        Post.objects.filter(pk=self.other.pk).update(is_deleted=True)
+
+        self.assertNotIn(("comment", self.comment.id), self.ids(self.search(q="coffee")))
+
+    def test_hard_delete_removes_from_index(self):
+        """Test deleted rows and their cascaded comments leave the index"""
+        self.other.delete()
+
+        self.assertEqual(self.search(q="prefer")["results"], [])
+
+    def test_bulk_create_is_indexed(self):
+        """Test rows inserted without signals are indexed too"""
+        Post.objects.bulk_create(
+            [Post(content=f"bulk espresso {i}", created_by=self.user) for i in range(3)]
+        )
+
+        self.assertEqual(len(self.search(q="espresso")["results"]), 3)
+
+    def test_pagination(self):
+        """Test next cursors walk the ranked results without repeats"""
+        first = self.search(q="coffee", page_size=2)
+        second = self.search(q="coffee", page_size=2, cursor=first["next"])
+
+        self.assertEqual(len(first["results"]), 2)
+        self.assertEqual(len(second["results"]), 1)
+        self.assertIsNone(second["next"])
+        self.assertEqual(len(set(self.ids(first)) | set(self.ids(second))), 3)
+
+    def test_viewer_like_state(self):
+        """Test found posts carry the viewer's is_liked"""
+        Like.objects.create(user=self.user, post=self.tea)
+        self.client.force_login(self.user)
+
+        posts = {
+            result["post"]["id"]: result["post"]["is_liked"]
+            for result in self.search(q="coffee")["results"]
+            if result["type"] == "post"
+        }
+        self.assertEqual(posts, {self.coffee.id: False, self.tea.id: True})
+
+    def test_invalid_params(self):
+        """Test empty queries, unknown types and bad cursors are rejected"""
+        for params in [
+            {},
+            {"q": "  "},
+            {"q": "x" * 201},
+            {"q": "a", "type": "users"},
+            {"q": "a", "cursor": "bogus"},
+        ]:
+            with self.subTest(params=params):
+                response = self.client.get(self.url, params)
+                self.assertEqual(response.status_code, 400)
+
+    def test_invalid_http_method(self):
+        """Test search only accepts GET"""
+        response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, 405)
+
+
+@skipUnless(connection.vendor == "sqlite", "Only the SQLite index is kept in sync by triggers")
+class SearchIndexGuardTests(TestCase):
+    def drop_trigger(self):
+        # SQLite DDL is transactional, so the test's rollback restores the trigger
+        with connection.cursor() as cursor:
+            cursor.execute("DROP TRIGGER network_post_search_update")
+
+    def test_intact_index_passes(self):
+        """Test a migrated database has every trigger"""
+        self.assertEqual(search.missing_triggers(), [])
+        self.assertEqual(check_search_triggers(None, databases=["default"]), [])
+
+    def test_lost_trigger_is_reported(self):
+        """Test the system check reports a trigger dropped by a table rebuild"""
+        self.drop_trigger()
+
+        self.assertEqual(search.missing_triggers(), ["network_post_search_update"])
+        errors = check_search_triggers(None, databases=["default"])
+        self.assertEqual([error.id for error in errors], ["network.E002"])
+
+    def test_lost_trigger_fails_migrate(self):
+        """Test the post_migrate guard fails loudly on a lost trigger"""
+        self.drop_trigger()
+
+        with self.assertRaises(search.SearchIndexError):
+            verify_search_index(apps.get_app_config("network"), using="default")
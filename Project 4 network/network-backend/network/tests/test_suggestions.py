@@ -0,0 +1,185 @@
+import json
+from datetime import timedelta
+from io import StringIO
+
+from asgiref.sync import sync_to_async
+from django.contrib.auth import get_user_model
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from network import suggestions
+from network.models import Following, Suggestion, SuggestionRefresh
+
+User = get_user_model()
+
+
+@override_settings(NETWORK_SUGGESTIONS_ENABLED=True)
+class SuggestionTests(TestCase):
+    def setUp(self):
+        # Create test users
+        self.users = {
+            name: User.objects.create_user(username=name, password="testpass123")
+            for name in ["reader", "friend1", "friend2", "popular", "niche", "stranger"]
+        }
+
+        # reader follows both friends; both follow popular, friend2 also follows niche
+        self.follow("reader", "friend1")
+        self.follow("reader", "friend2")
+        self.follow("friend1", "popular")
+        self.follow("friend2", "popular")
+        self.follow("friend2", "niche")
+        self.follow("friend1", "reader")
+
+        self.client = Client()
+        self.client.force_login(self.users["reader"])
+
+    def follow(self, follower, following):
+        return Following.objects.create(
+            follower=self.users[follower], following=self.users[following]
+        )
+
+    def suggested(self, username):
+        return [
+            suggestion.candidate.username
+            for suggestion in suggestions.for_user(self.users[username], 20)
+        ]
+
+    def test_rank_by_mutual_count(self):
+        """Test candidates followed by more of the user's followings rank first"""
+        suggestions.recompute_all()
+
+        self.assertEqual(self.suggested("reader"), ["popular", "niche"])
+        self.assertEqual(
+            Suggestion.objects.get(
+                user=self.users["reader"], candidate=self.users["popular"]
+            ).mutual_count,
+            2,
+        )
+
+    def test_rank_ties_by_recency(self):
+        """Test candidates with as many mutuals rank by their latest follow"""
+        self.follow("friend1", "stranger")
+        Following.objects.filter(following=self.users["niche"]).update(
+            created_at=timezone.now() - timedelta(days=1)
+        )
+        suggestions.recompute_all()
+
+        self.assertEqual(self.suggested("reader"), ["popular", "stranger", "niche"])
+
+    def test_excludes_self_and_followed(self):
+        """Test the user and users they already follow are never suggested"""
+        suggestions.recompute_all()
+
+        # friend1 follows reader, who follows friend1 back and friend2
+        self.assertEqual(self.suggested("friend1"), ["friend2"])
+
+    def test_excludes_followed_since_recompute(self):
+        """Test a candidate followed after the recompute is dropped on read"""
+        suggestions.recompute_all()
+        self.follow("reader", "popular")
+
+        self.assertEqual(self.suggested("reader"), ["niche"])
+
+    def test_limit(self):
+        """Test at most NETWORK_SUGGESTIONS_LIMIT suggestions are stored per user"""
+        with self.settings(NETWORK_SUGGESTIONS_LIMIT=1):
+            suggestions.recompute_all()
+
+        self.assertEqual(self.suggested("reader"), ["popular"])
+
+    def test_follows_queue_follower(self):
+        """Test follows and unfollows queue only the follower"""
+        SuggestionRefresh.objects.all().delete()
+
+        self.follow("friend2", "stranger")
+        Following.objects.get(
+            follower=self.users["friend1"], following=self.users["popular"]
+        ).delete()
+
+        self.assertEqual(
+            set(SuggestionRefresh.objects.values_list("user_id", flat=True)),
+            {self.users["friend1"].pk, self.users["friend2"].pk},
+        )
+
+    def test_incremental_recompute(self):
+        """Test only changed users and their followers are recomputed"""
+        suggestions.recompute_all()
+        self.follow("friend2", "stranger")
+
+        changed, recomputed = suggestions.recompute_pending()
+
+        # friend2 changed; reader follows friend2
+        self.assertEqual((changed, recomputed), (1, 2))
+        self.assertEqual(self.suggested("reader"), ["popular", "stranger", "niche"])
+        self.assertFalse(SuggestionRefresh.objects.exists())
+
+    def test_batch_follow_queues_follower(self):
+        """Test batch follows queue the follower although they send no signals"""
+        SuggestionRefresh.objects.all().delete()
+
+        response = self.client.post(
+            reverse("batch_follow"),
+            json.dumps({"usernames": ["stranger"]}),
+            content_type="application/json",
+        )
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            list(SuggestionRefresh.objects.values_list("user_id", flat=True)),
+            [self.users["reader"].pk],
+        )
+
+    def test_disabled(self):
+        """Test nothing is queued when suggestions are off"""
+        SuggestionRefresh.objects.all().delete()
+
+        with self.settings(NETWORK_SUGGESTIONS_ENABLED=False):
+            self.follow("reader", "stranger")
+            with self.assertRaises(CommandError):
+                call_command("recompute_suggestions", stdout=StringIO())
+
+        self.assertFalse(SuggestionRefresh.objects.exists())
+
+    def test_command(self):
+        """Test the command recomputes queued users"""
+        out = StringIO()
+        call_command("recompute_suggestions", stdout=out)
+
+        self.assertIn("Recomputed suggestions of", out.getvalue())
+        self.assertEqual(self.suggested("reader"), ["popular", "niche"])
+
+    def test_endpoint(self):
+        """Test the endpoint lists the viewer's suggestions in one query"""
+        suggestions.recompute_all()
+        self.client.get(reverse("suggested_users"))
+
+        # The session and user come from the cache, leaving the suggestions
+        with self.assertNumQueries(1):
+            response = self.client.get(reverse("suggested_users"), {"page_size": 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            json.loads(response.content)["users"],
+            [{"username": "popular", "mutual_count": 2, "follower_count": 0}],
+        )
+
+    @override_settings(ROOT_URLCONF="network.async_urls")
+    async def test_async_endpoint(self):
+        """Test the async endpoint lists the same suggestions"""
+        await self.async_client.aforce_login(self.users["reader"])
+        await sync_to_async(suggestions.recompute_all)()
+
+        response = await self.async_client.get(reverse("suggested_users"))
+
+        usernames = [user["username"] for user in json.loads(response.content)["users"]]
+        self.assertEqual(usernames, ["popular", "niche"])
+
+    def test_endpoint_requires_login(self):
+        """Test anonymous users get no suggestions"""
+        self.client.logout()
+
+        response = self.client.get(reverse("suggested_users"))
+
+        self.assertEqual(response.status_code, 401)
@@ -0,0 +1,45 @@
+import random
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db.models import F
+from django.test import TestCase
+from django.utils import timezone
+
+from network import synthetic
+from network.models import Comment, Following, Like, Post
+
+
+class SyntheticTests(TestCase):
+    def test_activity_is_spread_over_days(self):
+        """Test posts and follows span the requested days and reactions follow their post"""
+        started = timezone.now()
+        synthetic.generate(random.Random(0), 50, 5, 200, 400, 100, days=10)
+
+        first = Post.objects.earliest("created_at").created_at
+        last = Post.objects.latest("created_at").created_at
+        self.assertGreater(last - first, timedelta(days=8))
+        self.assertGreaterEqual(first, started - timedelta(days=10))
+        self.assertEqual(
+            list(Post.objects.order_by("pk").values_list("pk", flat=True)),
+            list(Post.objects.order_by("created_at", "pk").values_list("pk", flat=True)),
+        )
+        self.assertFalse(Post.objects.exclude(updated_at=F("created_at")).exists())
+        self.assertFalse(Like.objects.filter(created_at__lt=F("post__created_at")).exists())
+        self.assertFalse(Comment.objects.filter(created_at__lt=F("post__created_at")).exists())
+        self.assertLess(Following.objects.earliest("created_at").created_at, started)
+
+    def test_counters_match_rows(self):
+        """Test the counters computed while generating match the rows inserted"""
+        synthetic.generate(random.Random(1), 30, 4, 50, 100, 40, days=1)
+
+        for post in Post.objects.all():
+            self.assertEqual(post.likes_count, post.likes.count())
+            self.assertEqual(post.comments_count, post.comments.count())
+            self.assertEqual(post.trend_score is None, not post.likes_count + post.comments_count)
+
+    def test_command_rejects_negative_days(self):
+        """Test generate_data refuses a negative time span"""
+        with self.assertRaises(CommandError):
+            call_command("generate_data", "--days", "-1", stdout=StringIO())
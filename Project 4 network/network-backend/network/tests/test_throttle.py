@@ -0,0 +1,99 @@
+import json
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from network import throttle
+from network.models import Post
+
+User = get_user_model()
+
+
+@override_settings(
+    NETWORK_RATE_LIMIT_ENABLED=True,
+    NETWORK_RATE_LIMITS={"post": (2, 60), "comment": (2, 60), "like": (2, 60), "follow": (1, 60)},
+)
+class RateLimitTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create test users and a post
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.other = User.objects.create_user(username="otheruser", password="testpass123")
+        self.post = Post.objects.create(content="Test post", created_by=self.other)
+
+        self.client = Client()
+        self.client.force_login(self.user)
+
+    def create_post(self, client=None):
+        return (client or self.client).post(
+            reverse("posts"), json.dumps({"content": "Hello"}), content_type="application/json"
+        )
+
+    def test_burst_then_429(self):
+        """Test requests beyond the burst get 429 with Retry-After and write nothing"""
+        self.assertEqual(self.create_post().status_code, 200)
+        self.assertEqual(self.create_post().status_code, 200)
+
+        with self.assertNumQueries(0):
+            response = self.create_post()
+
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "30")
+        self.assertEqual(Post.objects.filter(created_by=self.user).count(), 2)
+
+    def test_refill(self):
+        """Test a token comes back every period divided by the limit"""
+        self.assertEqual(throttle.take("post", "user:1", now=1000), 0)
+        self.assertEqual(throttle.take("post", "user:1", now=1000), 0)
+        self.assertEqual(throttle.take("post", "user:1", now=1010), 20)
+
+        self.assertEqual(throttle.take("post", "user:1", now=1030), 0)
+        self.assertEqual(throttle.take("post", "user:1", now=1030), 30)
+
+    def test_per_user_and_scope(self):
+        """Test each user and each scope has its own bucket"""
+        self.create_post()
+        self.create_post()
+
+        other = Client()
+        other.force_login(self.other)
+        self.assertEqual(self.create_post(other).status_code, 200)
+
+        response = self.client.post(reverse("like", kwargs={"post_id": self.post.id}))
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_endpoints_share_scope(self):
+        """Test single and batch follows draw from the same bucket"""
+        response = self.client.post(reverse("follow", kwargs={"username": "otheruser"}))
+        self.assertEqual(response.status_code, 200)
+
+        response = self.client.delete(
+            reverse("batch_follow"),
+            json.dumps({"usernames": ["otheruser"]}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 429)
+
+    def test_anonymous_by_address(self):
+        """Test anonymous requests are limited per client address"""
+        anonymous = Client(REMOTE_ADDR="10.0.0.1")
+        for _ in range(2):
+            self.assertEqual(self.create_post(anonymous).status_code, 401)
+        self.assertEqual(self.create_post(anonymous).status_code, 429)
+
+        self.assertEqual(self.create_post(Client(REMOTE_ADDR="10.0.0.2")).status_code, 401)
+
+    def test_reads_not_limited(self):
+        """Test GET requests never draw tokens"""
+        for _ in range(5):
+            self.assertEqual(self.client.get(reverse("posts")).status_code, 200)
+        self.assertEqual(self.create_post().status_code, 200)
+
+    def test_disabled(self):
+        """Test nothing is limited when rate limits are off"""
+        with self.settings(NETWORK_RATE_LIMIT_ENABLED=False):
+            for _ in range(3):
+                self.assertEqual(self.create_post().status_code, 200)
@@ -0,0 +1,182 @@
+import json
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from network.models import Following, Post, TimelineEntry
+
+User = get_user_model()
+
+
+@override_settings(NETWORK_TIMELINE_ENABLED=True, NETWORK_TIMELINE_FANOUT_LIMIT=2)
+class TimelineTests(TestCase):
+    def setUp(self):
+        # Create test users
+        self.reader = User.objects.create_user(username="reader", password="testpass123")
+        self.author = User.objects.create_user(username="author", password="testpass123")
+        self.celebrity = User.objects.create_user(username="celebrity", password="testpass123")
+        self.fans = [
+            User.objects.create_user(username=f"fan{i}", password="testpass123") for i in range(2)
+        ]
+
+        self.client = Client()
+
+        # reader follows author; reader and both fans follow the celebrity
+        self.follow(self.reader, self.author)
+        for user in [self.reader, *self.fans]:
+            self.follow(user, self.celebrity)
+
+    def follow(self, user, target):
+        self.client.force_login(user)
+        response = self.client.post(reverse("follow", kwargs={"username": target.username}))
+        self.assertEqual(response.status_code, 200)
+
+    def create_post(self, user, content):
+        self.client.force_login(user)
+        response = self.client.post(
+            reverse("posts"), json.dumps({"content": content}), content_type="application/json"
+        )
+        self.assertEqual(response.status_code, 200)
+        return Post.objects.get(content=content)
+
+    def get_following(self, **params):
+        self.client.force_login(self.reader)
+        response = self.client.get(reverse("posts_following"), params)
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_post_fans_out_to_followers(self):
+        """Test a new post is written into each follower's timeline"""
+        post = self.create_post(self.author, "Hello followers")
+
+        self.assertTrue(TimelineEntry.objects.filter(user=self.reader, post=post).exists())
+        self.assertEqual(TimelineEntry.objects.filter(post=post).count(), 1)
+
+    def test_popular_author_is_read_on_demand(self):
+        """Test authors above the fan-out limit are merged in at read time"""
+        self.create_post(self.author, "Author post")
+        post = self.create_post(self.celebrity, "Celebrity post")
+
+        self.assertFalse(TimelineEntry.objects.filter(post=post).exists())
+
+        data = self.get_following()
+        self.assertEqual(
+            [post["content"] for post in data["posts"]], ["Celebrity post", "Author post"]
+        )
+
+    def test_merged_pages(self):
+        """Test cursors walk through pushed and pulled posts without gaps"""
+        for i in range(3):
+            self.create_post(self.author, f"Author post {i}")
+            self.create_post(self.celebrity, f"Celebrity post {i}")
+
+        seen = []
+        data = self.get_following(page_size=4)
+        seen += [post["content"] for post in data["posts"]]
+        while data["next"]:
+            data = self.get_following(page_size=4, cursor=data["next"])
+            seen += [post["content"] for post in data["posts"]]
+
+        expected = [
+            f"{name} post {i}" for i in reversed(range(3)) for name in ["Celebrity", "Author"]
+        ]
+        self.assertEqual(seen, expected)
+
+        back = self.get_following(page_size=4, cursor=data["prev"])
+        self.assertEqual([post["content"] for post in back["posts"]], expected[:4])
+
+    def unfollow(self, user, target):
+        self.client.force_login(user)
+        response = self.client.delete(reverse("follow", kwargs={"username": target.username}))
+        self.assertEqual(response.status_code, 200)
+
+    def feed(self, user):
+        self.client.force_login(user)
+        response = self.client.get(reverse("posts_following"))
+        self.assertEqual(response.status_code, 200)
+        return [post["content"] for post in json.loads(response.content)["posts"]]
+
+    def test_author_dropping_below_limit(self):
+        """Test posts pulled while an author was popular stay in feeds after they drop below"""
+        self.create_post(self.celebrity, "Pulled while popular")
+        for fan in self.fans:
+            self.unfollow(fan, self.celebrity)
+        self.create_post(self.celebrity, "Pushed once quiet")
+
+        self.assertEqual(self.feed(self.reader), ["Pushed once quiet", "Pulled while popular"])
+        self.assertEqual(
+            list(TimelineEntry.objects.filter(user=self.reader).values_list("post__content")),
+            [("Pushed once quiet",)],
+        )
+
+    def test_author_rising_above_limit(self):
+        """Test posts pushed before an author became popular reach old and new followers"""
+        self.create_post(self.author, "Pushed while quiet")
+        for fan in self.fans:
+            self.follow(fan, self.author)
+        self.create_post(self.author, "Pulled once popular")
+
+        newcomer = User.objects.create_user(username="newcomer", password="testpass123")
+        self.follow(newcomer, self.author)
+
+        for user in [self.reader, newcomer]:
+            with self.subTest(user=user.username):
+                self.assertEqual(self.feed(user), ["Pulled once popular", "Pushed while quiet"])
+
+    def test_unfollow_pulls_posts(self):
+        """Test unfollowing removes the author's posts from the timeline"""
+        self.create_post(self.author, "Author post")
+
+        self.client.force_login(self.reader)
+        self.client.delete(reverse("follow", kwargs={"username": "author"}))
+
+        self.assertFalse(TimelineEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(self.get_following()["posts"], [])
+
+    def test_follow_seeds_recent_posts(self):
+        """Test following an author brings in their existing posts"""
+        newcomer = User.objects.create_user(username="newcomer", password="testpass123")
+        self.create_post(newcomer, "Before the follow")
+
+        self.follow(self.reader, newcomer)
+
+        data = self.get_following()
+        self.assertEqual([post["content"] for post in data["posts"]], ["Before the follow"])
+
+    def test_soft_delete_tombstones_entries(self):
+        """Test soft-deleted posts are tombstoned and hidden"""
+        post = self.create_post(self.author, "Soon deleted")
+
+        self.client.force_login(self.author)
+        self.client.delete(reverse("post", kwargs={"post_id": post.id}))
+
+        self.assertTrue(TimelineEntry.objects.get(post=post).is_deleted)
+        self.assertEqual(self.get_following()["posts"], [])
+
+    def test_backfill_command(self):
+        """Test the backfill command rebuilds timelines from the follow graph"""
+        self.create_post(self.author, "Author post")
+        self.create_post(self.celebrity, "Celebrity post")
+        TimelineEntry.objects.all().delete()
+
+        # Follows created without going through the views
+        other = User.objects.create_user(username="other", password="testpass123")
+        Following.objects.create(follower=other, following=self.author)
+
+        out = StringIO()
+        call_command("backfill_timelines", stdout=out)
+
+        self.assertIn("with 2 entries", out.getvalue())
+        self.assertEqual(
+            set(TimelineEntry.objects.values_list("user__username", flat=True)),
+            {"reader", "other"},
+        )
+        self.assertEqual(len(self.get_following()["posts"]), 2)
+
+    def test_backfill_unknown_user(self):
+        """Test the backfill command rejects unknown usernames"""
+        with self.assertRaisesMessage(Exception, "Unknown users: ghost"):
+            call_command("backfill_timelines", "ghost", stdout=StringIO())
@@ -0,0 +1,198 @@
+import json
+import math
+from datetime import timedelta
+from io import StringIO
+
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from network import like_buffer, likes, trending
+from network.models import Like, Post
+from network.tests.utils import like_buffer_settings
+
+User = get_user_model()
+
+
+class TrendingTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create test users and posts
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.fans = User.objects.bulk_create([User(username=f"fan{i}") for i in range(5)])
+        self.quiet = Post.objects.create(content="Quiet post", created_by=self.user)
+        self.liked = Post.objects.create(content="Liked post", created_by=self.user)
+        self.discussed = Post.objects.create(content="Discussed post", created_by=self.user)
+
+        self.client = Client()
+        self.url = reverse("trending_posts")
+
+    def like(self, post, count):
+        for fan in self.fans[:count]:
+            likes.add_like(fan, post.id)
+
+    def comment(self, post):
+        self.client.force_login(self.user)
+        response = self.client.post(
+            reverse("comments", kwargs={"post_id": post.id}),
+            json.dumps({"content": "Nice"}),
+            content_type="application/json",
+        )
+        self.assertEqual(response.status_code, 201)
+
+    def trending_ids(self, **params):
+        response = self.client.get(self.url, params)
+        self.assertEqual(response.status_code, 200)
+        return [post["id"] for post in json.loads(response.content)["posts"]]
+
+    def score(self, post):
+        post.refresh_from_db()
+        return post.trend_score
+
+    def test_ranked_by_engagement(self):
+        """Test comments weigh more than likes and posts without engagement are left out"""
+        self.like(self.liked, 2)
+        self.comment(self.discussed)
+        trending.refresh()
+
+        self.assertEqual(self.trending_ids(), [self.discussed.id, self.liked.id])
+
+    def test_score_sums_events(self):
+        """Test the stored score is the log of the summed weights"""
+        self.like(self.liked, 3)
+        trending.record(self.liked.id, trending.COMMENT_WEIGHT)
+
+        self.assertAlmostEqual(
+            self.score(self.liked), trending.event_score(3 + 3), delta=math.log(2) / 3600
+        )
+
+    def test_older_engagement_decays(self):
+        """Test engagement one half-life earlier counts half"""
+        now = timezone.now()
+        old = trending.event_score(4, now - timedelta(seconds=trending.half_life()))
+
+        self.assertAlmostEqual(old, trending.event_score(2, now))
+
+    def test_unlike_keeps_score(self):
+        """Test unlikes leave the score to decay"""
+        self.like(self.liked, 1)
+        score = self.score(self.liked)
+        likes.remove_like(self.fans[0], self.liked.id)
+
+        self.assertEqual(self.score(self.liked), score)
+
+    def test_window_and_size(self):
+        """Test only posts created in the window are kept, at most NETWORK_TRENDING_SIZE"""
+        self.like(self.liked, 1)
+        self.like(self.discussed, 2)
+        Post.objects.filter(pk=self.quiet.pk).update(created_at=timezone.now() - timedelta(days=30))
+        trending.record(self.quiet.id, 100)
+
+        with self.settings(NETWORK_TRENDING_SIZE=1):
+            trending.refresh()
+
+        self.assertEqual(self.trending_ids(), [self.discussed.id])
+
+    def test_deleted_post_discarded(self):
+        """Test a soft deleted post leaves the cached posts at once"""
+        self.like(self.liked, 1)
+        self.like(self.discussed, 2)
+        trending.refresh()
+
+        self.discussed.is_deleted = True
+        self.discussed.save()
+
+        self.assertEqual(self.trending_ids(), [self.liked.id])
+
+    def test_viewer_like_state(self):
+        """Test cached posts carry the viewer's is_liked in one query"""
+        self.like(self.liked, 2)
+        self.like(self.discussed, 1)
+        trending.refresh()
+        self.client.force_login(self.fans[1])
+        self.client.get(self.url)
+
+        # The session and user come from the cache, leaving the viewer's likes
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url)
+
+        posts = {post["id"]: post["is_liked"] for post in json.loads(response.content)["posts"]}
+        self.assertEqual(posts, {self.liked.id: True, self.discussed.id: False})
+
+    def test_counters_are_live(self):
+        """Test likes and comments after the refresh show in the served counters at once"""
+        self.like(self.liked, 1)
+        trending.refresh()
+        likes.add_like(self.fans[1], self.liked.id)
+        self.comment(self.liked)
+
+        self.client.force_login(self.fans[1])
+        response = self.client.get(self.url)
+
+        post = json.loads(response.content)["posts"][0]
+        self.assertEqual((post["likes_count"], post["comments_count"]), (2, 1))
+        self.assertTrue(post["is_liked"])
+
+    @override_settings(NETWORK_TRENDING_CACHE_TIMEOUT=0)
+    def test_expired_ranking_is_refreshed(self):
+        """Test requests refresh the ranking once it expires, without the worker"""
+        self.like(self.liked, 1)
+        self.assertEqual(self.trending_ids(), [self.liked.id])
+
+        self.like(self.discussed, 3)
+
+        self.assertEqual(self.trending_ids(), [self.discussed.id, self.liked.id])
+
+    @like_buffer_settings()
+    def test_buffered_likes_trend_on_flush(self):
+        """Test buffered likes add to the score when they are written"""
+        like_buffer.get_cache().clear()
+        self.like(self.liked, 2)
+        self.assertIsNone(self.score(self.liked))
+
+        likes.flush_buffer()
+
+        self.assertEqual(Like.objects.filter(post=self.liked).count(), 2)
+        self.assertAlmostEqual(
+            self.score(self.liked), trending.event_score(2), delta=math.log(2) / 3600
+        )
+
+    def test_page_size(self):
+        """Test page_size limits the posts and is validated"""
+        self.like(self.liked, 1)
+        self.like(self.discussed, 2)
+
+        self.assertEqual(self.trending_ids(page_size=1), [self.discussed.id])
+        self.assertEqual(self.client.get(self.url, {"page_size": "x"}).status_code, 400)
+
+    def test_command(self):
+        """Test the command caches the trending posts"""
+        self.like(self.liked, 1)
+        out = StringIO()
+        call_command("refresh_trending", stdout=out)
+
+        self.assertIn("Cached 1 trending posts.", out.getvalue())
+        self.assertEqual(
+            [payload["id"] for payload in cache.get(trending.TRENDING_KEY)], [self.liked.id]
+        )
+
+    @override_settings(ROOT_URLCONF="network.async_urls")
+    async def test_async_endpoint(self):
+        """Test the async endpoint returns the same posts"""
+        await Post.objects.filter(pk=self.liked.pk).aupdate(trend_score=trending.event_score(1))
+
+        response = await self.async_client.get(self.url)
+
+        posts = json.loads(response.content)["posts"]
+        self.assertEqual([post["id"] for post in posts], [self.liked.id])
+        self.assertFalse(posts[0]["is_liked"])
+
+    def test_invalid_http_method(self):
+        """Test trending posts only accept GET"""
+        response = self.client.post(self.url)
+
+        self.assertEqual(response.status_code, 405)
@@ -3,11 +3,14 @@ from datetime import timedelta
 from unittest.mock import patch
 
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.db import connection
 from django.db.utils import DatabaseError
 from django.test import Client, TestCase
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from django.utils import timezone
-from network.models import Following, Post
+from network.models import Following, Like, Post
 
 User = get_user_model()
 
@@ -31,6 +34,8 @@ class UserDetailViewTests(TestCase):
 
         # Create follow relationship (follower_user follows user)
         Following.objects.create(follower=self.follower_user, following=self.user)
+        User.adjust_counters(self.follower_user.pk, following_count=1)
+        User.adjust_counters(self.user.pk, follower_count=1)
 
         self.client = Client()
 
@@ -113,7 +118,8 @@ class UserDetailViewTests(TestCase):
 
     def test_database_error_handling(self):
         """Test database error handling"""
-        with patch("network.models.User.objects.get") as mock_get:
+        with patch("network.models.User.objects.annotate") as mock_annotate:
+            mock_get = mock_annotate.return_value.only.return_value.get
             mock_get.side_effect = DatabaseError("Database error")
 
             response = self.client.get(
@@ -126,7 +132,8 @@ class UserDetailViewTests(TestCase):
 
     def test_unexpected_error_handling(self):
         """Test unexpected error handling"""
-        with patch("network.models.User.objects.get") as mock_get:
+        with patch("network.models.User.objects.annotate") as mock_annotate:
+            mock_get = mock_annotate.return_value.only.return_value.get
             mock_get.side_effect = Exception("Unexpected error")
 
             response = self.client.get(
@@ -154,3 +161,186 @@ class UserDetailViewTests(TestCase):
         self.assertEqual(len(posts), 2)
         self.assertEqual(posts[0]["content"], "Newer post")
         self.assertEqual(posts[1]["content"], "Active post")
+
+
+class UserDetailPaginationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        self.user = User.objects.create_user(username="testuser", password="testpass123")
+        self.viewer = User.objects.create_user(username="viewer", password="testpass123")
+        Following.objects.create(follower=self.viewer, following=self.user)
+
+        self.posts = [
+            Post.objects.create(content=f"Post {i}", created_by=self.user) for i in range(25)
+        ]
+        Like.objects.create(user=self.viewer, post=self.posts[-1])
+
+        self.client = Client()
+        self.client.force_login(self.viewer)
+
+    def get_user_detail(self, **params):
+        response = self.client.get(
+            reverse("user_detail", kwargs={"username": self.user.username}), params
+        )
+        self.assertEqual(response.status_code, 200)
+        return json.loads(response.content)
+
+    def test_posts_are_paged(self):
+        """Test the profile pages the user's posts with cursors"""
+        seen = []
+        data = self.get_user_detail()
+        self.assertEqual(len(data["posts"]), 10)
+        while True:
+            seen += [post["content"] for post in data["posts"]]
+            if not data["next"]:
+                break
+            data = self.get_user_detail(cursor=data["next"])
+
+        self.assertEqual(seen, [f"Post {i}" for i in reversed(range(25))])
+
+    def test_viewer_like_state(self):
+        """Test posts carry the viewer's like state"""
+        posts = self.get_user_detail()["posts"]
+
+        self.assertTrue(posts[0]["is_liked"])
+        self.assertFalse(any(post["is_liked"] for post in posts[1:]))
+
+    def test_invalid_page_size(self):
+        """Test invalid pagination parameters are rejected"""
+        response = self.client.get(
+            reverse("user_detail", kwargs={"username": self.user.username}), {"page_size": "x"}
+        )
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_header_query_count(self):
+        """Test the header takes one query and the page is independent of its size"""
+
+        def count_queries(page_size):
+            cache.clear()
+            with CaptureQueriesContext(connection) as queries:
+                data = self.get_user_detail(page_size=page_size)
+            self.assertEqual(len(data["posts"]), page_size)
+            self.assertTrue(data["user"]["is_following"])
+            return [query["sql"] for query in queries]
+
+        queries = count_queries(2)
+        self.assertEqual(len(queries), len(count_queries(20)))
+
+        # is_following is resolved inside the header query rather than on its own
+        following = [sql for sql in queries if "network_following" in sql]
+        self.assertEqual(len(following), 1)
+        self.assertIn('FROM "network_user"', following[0])
+
+
+class FollowListViewTests(TestCase):
+    def setUp(self):
+        cache.clear()
+
+        # Create test users; the first five follow the star, who follows back the first two
+        self.star = User.objects.create_user(username="star", password="testpass123")
+        self.viewer = User.objects.create_user(username="viewer", password="testpass123")
+        self.fans = [
+            User.objects.create_user(username=f"fan{i}", password="testpass123") for i in range(5)
+        ]
+        start = timezone.now()
+        for i, fan in enumerate(self.fans):
+            follow = Following.objects.create(follower=fan, following=self.star)
+            Following.objects.filter(pk=follow.pk).update(created_at=start + timedelta(minutes=i))
+        for fan in self.fans[:2]:
+            Following.objects.create(follower=self.star, following=fan)
+
+        # The viewer follows fan1 and fan3
+        for fan in (self.fans[1], self.fans[3]):
+            Following.objects.create(follower=self.viewer, following=fan)
+
+        self.client = Client()
+        self.followers_url = reverse("user_followers", kwargs={"username": "star"})
+        self.following_url = reverse("user_following", kwargs={"username": "star"})
+
+    def test_followers_newest_first(self):
+        """Test followers are listed newest first across pages"""
+        response = self.client.get(self.followers_url, {"page_size": 3})
+
+        self.assertEqual(response.status_code, 200)
+        data = json.loads(response.content)
+        self.assertEqual([user["username"] for user in data["users"]], ["fan4", "fan3", "fan2"])
+        self.assertIsNone(data["prev"])
+
+        response = self.client.get(self.followers_url, {"page_size": 3, "cursor": data["next"]})
+        data = json.loads(response.content)
+        self.assertEqual([user["username"] for user in data["users"]], ["fan1", "fan0"])
+        self.assertIsNone(data["next"])
+
+    def test_following(self):
+        """Test the users a user follows are listed"""
+        response = self.client.get(self.following_url)
+
+        self.assertEqual(response.status_code, 200)
+        usernames = {user["username"] for user in json.loads(response.content)["users"]}
+        self.assertEqual(usernames, {"fan0", "fan1"})
+
+    def test_is_followed_by_viewer(self):
+        """Test each listed user is flagged when the viewer follows them"""
+        self.client.force_login(self.viewer)
+
+        response = self.client.get(self.followers_url)
+
+        flags = {
+            user["username"]: user["is_followed_by_viewer"]
+            for user in json.loads(response.content)["users"]
+        }
+        self.assertEqual(
+            flags, {"fan0": False, "fan1": True, "fan2": False, "fan3": True, "fan4": False}
+        )
+
+    def test_anonymous_viewer(self):
+        """Test no user is flagged for an anonymous viewer"""
+        response = self.client.get(self.followers_url)
+
+        users = json.loads(response.content)["users"]
+        self.assertFalse(any(user["is_followed_by_viewer"] for user in users))
+
+    def test_query_count(self):
+        """Test a page is a user lookup and one query, whatever its size"""
+        self.client.force_login(self.viewer)
+        self.client.get(self.followers_url)
+
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(self.followers_url, {"page_size": 1})
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(self.followers_url, {"page_size": 5})
+
+        self.assertEqual(len(small), len(large))
+
+    def test_unfollow_changes_etag(self):
+        """Test an unfollow retires the list's ETag"""
+        etag = self.client.get(self.followers_url)["ETag"]
+        self.assertEqual(
+            self.client.get(self.followers_url, headers={"If-None-Match": etag}).status_code, 304
+        )
+
+        Following.objects.get(follower=self.fans[0], following=self.star).delete()
+
+        response = self.client.get(self.followers_url, headers={"If-None-Match": etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(json.loads(response.content)["users"]), 4)
+
+    def test_nonexistent_user(self):
+        """Test listing followers of a user that doesn't exist"""
+        response = self.client.get(reverse("user_followers", kwargs={"username": "nobody"}))
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_invalid_cursor(self):
+        """Test a bad cursor is rejected"""
+        response = self.client.get(self.followers_url, {"cursor": "bogus"})
+
+        self.assertEqual(response.status_code, 400)
+
+    def test_invalid_http_method(self):
+        """Test follower lists only accept GET"""
+        response = self.client.post(self.followers_url)
+
+        self.assertEqual(response.status_code, 405)
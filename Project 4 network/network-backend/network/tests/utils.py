@@ -0,0 +1,78 @@
+import json
+import tempfile
+from pathlib import Path
+
+from django.conf import settings
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+
+# Checked-in query budgets of the list endpoints, by name
+BUDGETS_FILE = Path(__file__).with_name("query_budgets.json")
+
+
+def load_budgets():
+    with open(BUDGETS_FILE) as f:
+        return json.load(f)
+
+
+def like_buffer_settings():
+    """
+    Turn the like buffer on over a file-based cache, as it refuses a LocMemCache
+    Clear it with ``like_buffer.get_cache().clear()`` in setUp.
+    """
+    return override_settings(
+        CACHES={
+            **settings.CACHES,
+            "likes": {
+                "BACKEND": "django.core.cache.backends.filebased.FileBasedCache",
+                "LOCATION": str(Path(tempfile.gettempdir()) / "network-test-likes"),
+                "OPTIONS": {"MAX_ENTRIES": 1000000},
+            },
+        },
+        NETWORK_LIKE_BUFFER_ENABLED=True,
+        NETWORK_LIKE_BUFFER_CACHE="likes",
+    )
+
+
+class QueryCountMixin:
+    """TestCase mixin catching queries that grow with the number of results"""
+
+    def count_queries(self, func):
+        """
+        Run ``func`` and count the queries it issued
+        :return: Tuple of (func's return value, list of captured SQL statements)
+        """
+        with CaptureQueriesContext(connection) as context:
+            result = func()
+        return result, [query["sql"] for query in context.captured_queries]
+
+    def assertConstantQueries(self, fetch, sizes, budget=None):
+        """
+        Fail when ``fetch`` issues more queries for more results, or more than ``budget``
+        :param fetch: Callable taking a result size, e.g. a page size, returning the
+            number of results it got
+        :param sizes: Increasing result sizes to compare; each must be reached
+        :param budget: Most queries allowed at any size, or None for no limit
+        """
+        counts = {}
+        for size in sizes:
+            got, queries = self.count_queries(lambda: fetch(size))
+            self.assertEqual(got, size, f"Fetched {got} results instead of {size}.")
+            counts[size] = queries
+
+        first, *rest = sizes
+        for size in rest:
+            self.assertEqual(
+                len(counts[size]),
+                len(counts[first]),
+                f"{len(counts[first])} queries for {first} results but {len(counts[size])} "
+                f"for {size}; likely an N+1 query:\n" + "\n".join(counts[size]),
+            )
+        if budget is not None:
+            self.assertLessEqual(
+                len(counts[first]),
+                budget,
+                f"{len(counts[first])} queries over the budget of {budget}:\n"
+                + "\n".join(counts[first]),
+            )
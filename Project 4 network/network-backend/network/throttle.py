@@ -0,0 +1,89 @@
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.http import JsonResponse
+
+# Requests allowed per period in seconds, by scope; a full bucket allows them in one burst
+DEFAULT_RATES = {
+    "post": (10, 60),
+    "comment": (30, 60),
+    "like": (120, 60),
+    "follow": (60, 60),
+}
+
+# Only requests that write are limited
+WRITE_METHODS = ("POST", "PUT", "PATCH", "DELETE")
+
+
+def is_enabled():
+    return getattr(settings, "NETWORK_RATE_LIMIT_ENABLED", False)
+
+
+def get_cache():
+    return caches[getattr(settings, "NETWORK_RATE_LIMIT_CACHE", "default")]
+
+
+def get_rate(scope):
+    return getattr(settings, "NETWORK_RATE_LIMITS", DEFAULT_RATES)[scope]
+
+
+def cache_key(scope, ident):
+    return f"network:throttle:{scope}:{ident}"
+
+
+def get_ident(request):
+    """The user for logged in requests, otherwise the client address"""
+    if request.user.is_authenticated:
+        return f"user:{request.user.pk}"
+    # Behind a proxy, have it set REMOTE_ADDR to the client address
+    return f"ip:{request.META.get('REMOTE_ADDR', '')}"
+
+
+def take(scope, ident, now=None):
+    """
+    Take a token from the bucket of ``ident`` in ``scope``, in one cache read and write
+    The bucket is stored as the moment it will be full again: each request pushes that
+    moment one refill interval later, and a request that would push it more than a
+    period ahead finds the bucket empty. Concurrent requests may read the same moment,
+    so a burst of them can exceed the rate by a few requests.
+    :return: Seconds until a token is available, or 0 when one was taken
+    """
+    limit, period = get_rate(scope)
+    now = time.time() if now is None else now
+    store = get_cache()
+    key = cache_key(scope, ident)
+
+    full_at = max(store.get(key, now), now) + period / limit
+    if full_at - now > period:
+        return full_at - now - period
+
+    store.set(key, full_at, timeout=math.ceil(full_at - now))
+    return 0
+
+
+def rate_limit(scope):
+    """
+    Answer writes beyond the rate of ``scope`` with 429 and Retry-After, before the view
+    runs and without querying the database
+    :param scope: Key of ``NETWORK_RATE_LIMITS``
+    """
+
+    def decorator(view):
+        @wraps(view)
+        def inner(request, *args, **kwargs):
+            if request.method in WRITE_METHODS and is_enabled():
+                wait = take(scope, get_ident(request))
+                if wait:
+                    response = JsonResponse(
+                        {"error": "Too many requests, please try again later."}, status=429
+                    )
+                    response["Retry-After"] = str(math.ceil(wait))
+                    return response
+            return view(request, *args, **kwargs)
+
+        return inner
+
+    return decorator
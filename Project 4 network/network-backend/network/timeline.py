@@ -0,0 +1,192 @@
+from typing import NamedTuple
+
+from django.conf import settings
+from django.db.models import F, Window
+from django.db.models.functions import RowNumber
+
+from .models import NOT_DELETED, PULLED, Following, Post, TimelineEntry
+from .pagination import Page, afetch_window, fetch_window, make_page
+
+
+class FeedKey(NamedTuple):
+    created_at: object
+    id: int
+
+
+def is_enabled():
+    return getattr(settings, "NETWORK_TIMELINE_ENABLED", False)
+
+
+def fanout_limit():
+    return getattr(settings, "NETWORK_TIMELINE_FANOUT_LIMIT", 1000)
+
+
+def backfill_limit():
+    return getattr(settings, "NETWORK_TIMELINE_BACKFILL_LIMIT", 200)
+
+
+def push(posts, follower_ids):
+    """
+    Write posts into the timelines of the given followers
+    :param posts: Posts to push, with created_by_id loaded
+    :param follower_ids: Ids of the users whose timelines receive the posts
+    """
+    TimelineEntry.objects.bulk_create(
+        [
+            TimelineEntry(
+                user_id=follower_id,
+                post_id=post.pk,
+                author_id=post.created_by_id,
+                created_at=post.created_at,
+            )
+            for follower_id in follower_ids
+            for post in posts
+        ],
+        batch_size=1000,
+        ignore_conflicts=True,
+    )
+
+
+def fan_out(post):
+    """
+    Push a new post to its author's followers, or mark it pulled when there are too many
+    The choice is kept per post, so an author crossing the limit in either direction
+    leaves every earlier post where the timelines look for it.
+    """
+    if not is_enabled():
+        return
+    if post.created_by.follower_count >= fanout_limit():
+        Post.objects.filter(pk=post.pk).update(is_pulled=True)
+        post.is_pulled = True
+        return
+
+    follower_ids = Following.objects.filter(following_id=post.created_by_id).values_list(
+        "follower_id", flat=True
+    )
+    push([post], follower_ids)
+
+
+def follow(follower, followee):
+    """Seed a new follower's timeline with the followee's recent pushed posts"""
+    follow_many(follower, [followee.pk])
+
+
+def follow_many(follower, followee_ids):
+    """
+    Seed a new follower's timeline with the recent pushed posts of several followees
+    One windowed query ranks each followee's posts, so the batch size adds no queries.
+    """
+    if not is_enabled():
+        return
+
+    # Pulled posts are gathered on read; an author over the limit may still have pushed ones
+    posts = (
+        Post.objects.filter(NOT_DELETED, created_by__in=followee_ids, is_pulled=False)
+        .only("id", "created_at", "created_by_id")
+        .annotate(
+            rank=Window(
+                RowNumber(),
+                partition_by=F("created_by_id"),
+                order_by=[F("created_at").desc(), F("id").desc()],
+            )
+        )
+        .filter(rank__lte=backfill_limit())
+    )
+    push(posts, [follower.pk])
+
+
+def unfollow(follower, followee):
+    """Pull an unfollowed user's posts out of the follower's timeline"""
+    unfollow_many(follower, [followee.pk])
+
+
+def unfollow_many(follower, followee_ids):
+    """Pull the posts of several unfollowed users out of the follower's timeline"""
+    if not is_enabled():
+        return
+
+    TimelineEntry.objects.filter(user=follower, author_id__in=followee_ids).delete()
+
+
+def tombstone(post):
+    """Hide a soft-deleted post from every timeline it was pushed into"""
+    if not is_enabled():
+        return
+
+    TimelineEntry.objects.filter(post=post).update(is_deleted=True)
+
+
+def rebuild(user):
+    """
+    Replace a user's timeline with the most recent posts of the users they follow
+    :return: Number of entries written
+    """
+    TimelineEntry.objects.filter(user=user).delete()
+
+    followee_ids = Following.objects.filter(follower=user).values_list("following_id", flat=True)
+    posts = list(
+        Post.objects.filter(NOT_DELETED, created_by__in=followee_ids, is_pulled=False)
+        .only("id", "created_at", "created_by_id")
+        .order_by("-created_at", "-id")[: backfill_limit()]
+    )
+    push(posts, [user.pk])
+    return len(posts)
+
+
+def pushed_entries(user):
+    """Visible entries written into the user's timeline"""
+    return TimelineEntry.objects.filter(NOT_DELETED, user=user).only("created_at", "post_id")
+
+
+def pulled_posts(user):
+    """Visible posts of followed authors that were not pushed, seeking post_pulled_idx"""
+    followee_ids = Following.objects.filter(follower=user).values_list("following_id", flat=True)
+    return Post.objects.filter(NOT_DELETED, PULLED, created_by__in=followee_ids).only(
+        "id", "created_at"
+    )
+
+
+def merge_windows(pushed, pulled, cursor, page_size):
+    """Merge both windows in walking order into a page of FeedKeys, dropping duplicates"""
+    keys = {FeedKey(entry.created_at, entry.post_id) for entry in pushed}
+    keys.update(FeedKey(post.created_at, post.id) for post in pulled)
+    direction = cursor[2] if cursor else "next"
+    rows = sorted(keys, reverse=direction == "next")[: page_size + 1]
+
+    return make_page(rows, cursor, page_size)
+
+
+def load_page(page, loaded):
+    """Swap the FeedKeys of a page for the posts loaded by id, skipping deleted ones"""
+    items = [loaded[key.id] for key in page.items if key.id in loaded]
+    return Page(items=items, next=page.next, prev=page.prev)
+
+
+def home_page(user, posts, cursor, page_size):
+    """
+    Page through the posts of followed users using the materialized timeline
+    Posts written while their author was above the fan-out limit are gathered on read and
+    merged in.
+    :param user: Viewer whose home timeline is read
+    :param posts: Post queryset used to load the page, with its related lookups
+    :param cursor: Decoded cursor from ``get_page_params``
+    :param page_size: Number of posts per page
+    """
+    limit = page_size + 1
+    pushed = fetch_window(pushed_entries(user), cursor, limit, key="post_id")
+    pulled = fetch_window(pulled_posts(user), cursor, limit)
+    page = merge_windows(pushed, pulled, cursor, page_size)
+
+    loaded = posts.filter(NOT_DELETED).in_bulk([key.id for key in page.items])
+    return load_page(page, loaded)
+
+
+async def ahome_page(user, posts, cursor, page_size):
+    """Async counterpart of ``home_page``"""
+    limit = page_size + 1
+    pushed = await afetch_window(pushed_entries(user), cursor, limit, key="post_id")
+    pulled = await afetch_window(pulled_posts(user), cursor, limit)
+    page = merge_windows(pushed, pulled, cursor, page_size)
+
+    loaded = await posts.filter(NOT_DELETED).ain_bulk([key.id for key in page.items])
+    return load_page(page, loaded)
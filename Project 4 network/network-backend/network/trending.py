@@ -0,0 +1,191 @@
+import math
+from datetime import UTC, datetime, timedelta
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, Exists, F, OuterRef, Value, When
+from django.db.models.functions import Abs, Exp, Greatest, Ln
+from django.utils import timezone
+
+from . import like_buffer
+from .models import NOT_DELETED, Like, Post
+
+# Engagement weights; unlikes and deleted comments do not take weight back
+LIKE_WEIGHT = 1
+COMMENT_WEIGHT = 3
+
+# Scores are natural logarithms of engagement scaled up by how long after the epoch it
+# happened. A new event then never has to decay the older ones: ranking by the stored
+# score ranks by engagement decayed to any common moment, such as now.
+EPOCH = datetime(2025, 1, 1, tzinfo=UTC)
+
+TRENDING_KEY = "network:trending"
+
+
+def half_life():
+    return getattr(settings, "NETWORK_TRENDING_HALF_LIFE", 21600)
+
+
+def window():
+    return getattr(settings, "NETWORK_TRENDING_WINDOW", 259200)
+
+
+def size():
+    return getattr(settings, "NETWORK_TRENDING_SIZE", 50)
+
+
+def cache_timeout():
+    """Seconds the cached trending posts are served before a request refreshes them"""
+    return getattr(settings, "NETWORK_TRENDING_CACHE_TIMEOUT", 300)
+
+
+def event_score(weight, at=None):
+    """
+    Score of one engagement event
+    :param weight: Weight of the event, e.g. ``LIKE_WEIGHT``
+    :param at: When the event happened (default: now)
+    """
+    elapsed = ((at or timezone.now()) - EPOCH).total_seconds()
+    return math.log(weight) + elapsed * math.log(2) / half_life()
+
+
+def record(post_id, weight):
+    """
+    Add an engagement event to a post's score in one UPDATE
+    The log of a sum of exponentials is computed as max + ln(1 + exp(-|difference|)),
+    which never overflows however large the scores grow.
+    :param weight: Total weight of the events, e.g. ``LIKE_WEIGHT`` times a number of likes
+    """
+    if weight <= 0:
+        return
+
+    score = Value(event_score(weight))
+    Post.objects.filter(pk=post_id).update(
+        trend_score=Case(
+            When(trend_score__isnull=True, then=score),
+            default=Greatest(F("trend_score"), score)
+            + Ln(Value(1.0) + Exp(-Abs(F("trend_score") - score))),
+        )
+    )
+
+
+def score_sql(column, weight):
+    """
+    The same addition as ``record`` for raw UPDATE statements
+    :param column: Quoted trend_score column
+    :return: Tuple of (SQL expression, params)
+    """
+    # Django registers LN, EXP and ABS on SQLite, where GREATEST is the scalar MAX
+    greatest = "MAX" if connection.vendor == "sqlite" else "GREATEST"
+    sql = (
+        f"CASE WHEN {column} IS NULL THEN %s "
+        f"ELSE {greatest}({column}, %s) + LN(1 + EXP(-ABS({column} - %s))) END"
+    )
+    return sql, [event_score(weight)] * 3
+
+
+def refresh():
+    """
+    Store the top ``size`` posts of the trending window in the cache
+    :return: Their payloads, best first
+    """
+    since = timezone.now() - timedelta(seconds=window())
+    posts = (
+        Post.objects.select_related("created_by")
+        .filter(NOT_DELETED, trend_score__isnull=False, created_at__gte=since)
+        .order_by("-trend_score", "-id")[: size()]
+    )
+
+    payloads = [post.serialize_payload() for post in posts]
+    cache.set(TRENDING_KEY, payloads, timeout=cache_timeout())
+    return payloads
+
+
+def top():
+    """Payloads of the trending posts, refreshing them if the cache lost them"""
+    payloads = cache.get(TRENDING_KEY)
+    return refresh() if payloads is None else payloads
+
+
+async def atop():
+    """Async counterpart of ``top``"""
+    payloads = await cache.aget(TRENDING_KEY)
+    return await sync_to_async(refresh)() if payloads is None else payloads
+
+
+def live_state(post_ids, user):
+    """
+    Current counters of the trending posts and whether the viewer liked each, in one query
+    The cached payloads are a snapshot taken at the last refresh, so their counters lag.
+    :return: Queryset of (id, likes_count, comments_count, is_liked) of the visible posts
+    """
+    posts = Post.objects.filter(NOT_DELETED, pk__in=post_ids)
+    if user.is_authenticated:
+        posts = posts.annotate(
+            is_liked=Exists(Like.objects.filter(user=user, post_id=OuterRef("pk")))
+        )
+    else:
+        posts = posts.annotate(is_liked=Value(False))
+    return posts.values_list("pk", "likes_count", "comments_count", "is_liked")
+
+
+def serialize(payloads, state, buffered):
+    """
+    Lay the live counters and the viewer's like state over trending payloads
+    :param state: Rows of ``live_state``; posts without one were deleted since the refresh
+    """
+    counters = {pk: (likes_count, comments_count) for pk, likes_count, comments_count, _ in state}
+    liked_ids = {pk for pk, _, _, is_liked in state if is_liked}
+
+    by_id = {}
+    for payload in payloads:
+        if payload["id"] in counters:
+            likes_count, comments_count = counters[payload["id"]]
+            by_id[payload["id"]] = {
+                **payload,
+                "likes_count": likes_count,
+                "comments_count": comments_count,
+            }
+
+    # combine only reads the posts' pk
+    posts = [Post(pk=post_id) for post_id in by_id]
+    return Post.combine(posts, by_id, liked_ids, None, None, buffered)
+
+
+def load(user, count):
+    """
+    Serialized trending posts for a viewer, from the cache plus one query by primary key
+    :param user: Current user instance, possibly anonymous
+    :param count: Maximum number of posts
+    """
+    payloads = top()[:count]
+    post_ids = [payload["id"] for payload in payloads]
+
+    state = list(live_state(post_ids, user)) if post_ids else []
+    buffered = like_buffer.load(post_ids, user) if like_buffer.is_enabled() else None
+
+    return serialize(payloads, state, buffered)
+
+
+async def aload(user, count):
+    """Async counterpart of ``load``"""
+    payloads = (await atop())[:count]
+    post_ids = [payload["id"] for payload in payloads]
+
+    state = [row async for row in live_state(post_ids, user)] if post_ids else []
+    buffered = await like_buffer.aload(post_ids, user) if like_buffer.is_enabled() else None
+
+    return serialize(payloads, state, buffered)
+
+
+def discard(post_id):
+    """Drop a deleted post from the trending posts before the next refresh"""
+    payloads = cache.get(TRENDING_KEY)
+    if payloads and any(payload["id"] == post_id for payload in payloads):
+        cache.set(
+            TRENDING_KEY,
+            [payload for payload in payloads if payload["id"] != post_id],
+            timeout=cache_timeout(),
+        )
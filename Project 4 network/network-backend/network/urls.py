@@ -1,24 +1,52 @@
+from django.conf import settings
 from django.urls import path
 
-from . import views
+from . import async_views, views
 
-urlpatterns = [
-    path("", views.index, name="index"),
-    # Auth API
-    path("login", views.login_view, name="login"),
-    path("logout", views.logout_view, name="logout"),
-    path("register", views.register, name="register"),
-    path("csrf", views.csrf, name="csrf"),
-    path("check_auth", views.check_auth, name="check_auth"),
-    # Posts API
-    path("api/posts", views.posts, name="posts"),
-    path("api/posts/following", views.posts_following, name="posts_following"),
-    path("api/posts/<int:post_id>", views.post_detail, name="post"),
-    path("api/posts/<int:post_id>/like", views.like, name="like"),
-    path("api/posts/<int:post_id>/comments", views.comments, name="comments"),
-    # Comment API
-    path("api/comment/<int:comment_id>", views.comment_detail, name="comment_detail"),
-    # Users API
-    path("api/users/<str:username>", views.user_detail, name="user_detail"),
-    path("api/users/<str:username>/follow", views.follow, name="follow"),
-]
+
+def network_patterns(read_views):
+    """
+    Routes of the network app
+    :param read_views: Module serving the read endpoints, ``views`` or ``async_views``
+    """
+    return [
+        path("", views.index, name="index"),
+        # Auth API
+        path("login", views.login_view, name="login"),
+        path("logout", views.logout_view, name="logout"),
+        path("register", views.register, name="register"),
+        path("csrf", views.csrf, name="csrf"),
+        path("check_auth", views.check_auth, name="check_auth"),
+        # Posts API
+        path("api/posts", read_views.posts, name="posts"),
+        path("api/posts/following", read_views.posts_following, name="posts_following"),
+        path("api/posts/trending", read_views.trending_posts, name="trending_posts"),
+        path("api/posts/<int:post_id>", read_views.post_detail, name="post"),
+        path("api/posts/<int:post_id>/like", views.like, name="like"),
+        path("api/posts/<int:post_id>/comments", read_views.comments, name="comments"),
+        # Comment API
+        path("api/comment/<int:comment_id>", views.comment_detail, name="comment_detail"),
+        # Users API
+        path("api/follows", views.batch_follow, name="batch_follow"),
+        path("api/suggestions", read_views.suggested_users, name="suggested_users"),
+        path("api/search", views.search_view, name="search"),
+        path("api/metrics", views.metrics_view, name="metrics"),
+        path("api/users/<str:username>", read_views.user_detail, name="user_detail"),
+        path("api/users/<str:username>/follow", views.follow, name="follow"),
+        path(
+            "api/users/<str:username>/followers",
+            read_views.user_followers,
+            name="user_followers",
+        ),
+        path(
+            "api/users/<str:username>/following",
+            read_views.user_following,
+            name="user_following",
+        ),
+    ]
+
+
+# Async views save a thread pool hop per request under ASGI but add one under WSGI
+urlpatterns = network_patterns(
+    async_views if getattr(settings, "NETWORK_ASYNC_VIEWS", False) else views
+)
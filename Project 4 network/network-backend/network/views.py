@@ -6,8 +6,23 @@ from django.db import DatabaseError, IntegrityError, transaction
 from django.http import JsonResponse
 from django.middleware.csrf import get_token
 from django.shortcuts import render
-
-from .models import Comment, Following, Like, Post, User
+from django.utils import timezone
+from django.views.decorators.http import condition
+
+from . import accounts, etags, follows, likes, metrics, search, suggestions, timeline, trending
+from .feed import FeedOptionsError, get_feed_options
+from .like_buffer import LockTimeout
+from .models import NOT_DELETED, Comment, Following, Post, User
+from .pagination import (
+    PaginationError,
+    encode_cursor,
+    get_page_params,
+    get_page_size,
+    get_since_params,
+    paginate,
+)
+from .streaming import stream_posts
+from .throttle import rate_limit
 
 
 def index(request):
@@ -32,16 +47,7 @@ def login_view(request):
             if user is not None:
                 login(request, user)
                 return JsonResponse(
-                    {
-                        "message": "Login successful",
-                        "user": {
-                            "id": user.id,
-                            "username": user.username,
-                            "email": user.email,
-                            "following_count": user.following_count,
-                            "follower_count": user.follower_count,
-                        },
-                    },
+                    {"message": "Login successful", "user": accounts.summary(user)},
                     status=200,
                 )
             else:
@@ -89,13 +95,7 @@ def register(request):
                 return JsonResponse(
                     {
                         "message": "Registration successful",
-                        "user": {
-                            "id": user.id,
-                            "username": user.username,
-                            "email": user.email,
-                            "following_count": user.following_count,
-                            "follower_count": user.follower_count,
-                        },
+                        "user": accounts.summary(user),
                     },
                     status=201,
                 )
@@ -120,23 +120,17 @@ def check_auth(request):
     if request.method != "GET":
         return JsonResponse({"error": "GET request required."}, status=405)
 
+    # CachedAuthenticationMiddleware serves request.user without querying the user table
     if request.user.is_authenticated:
         return JsonResponse(
-            {
-                "message": "User is authenticated",
-                "user": {
-                    "id": request.user.id,
-                    "username": request.user.username,
-                    "email": request.user.email,
-                    "following_count": request.user.following_count,
-                    "follower_count": request.user.follower_count,
-                },
-            }
+            {"message": "User is authenticated", "user": accounts.summary(request.user)}
         )
     else:
         return JsonResponse({"error": "User not authenticated"}, status=401)
 
 
+@rate_limit("post")
+@condition(etag_func=etags.posts_etag)
 def posts(request):
 
     # Create new post
@@ -158,7 +152,9 @@ def posts(request):
 
         # Create new post in database
         try:
-            Post.objects.create(content=data.get("content"), created_by=request.user)
+            with transaction.atomic():
+                post = Post.objects.create(content=data.get("content"), created_by=request.user)
+                timeline.fan_out(post)
 
             return JsonResponse({"message": "Post created successfully."}, status=200)
 
@@ -179,17 +175,33 @@ def posts(request):
     # Get posts
     elif request.method == "GET":
         try:
-            posts = (
-                Post.objects.select_related("created_by")
-                .prefetch_related("likes", "comments")
-                .filter(is_deleted=False)
-                .order_by("-created_at")
-            )
+            cursor, page_size = get_page_params(request.GET)
+            options = get_feed_options(request.GET)
+        except (PaginationError, FeedOptionsError) as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        try:
+            posts = Post.objects.select_related("created_by").filter(NOT_DELETED)
+
+            # Streaming sends every post past the cursor instead of one page
+            if options.stream:
+                return stream_posts(
+                    {"message": "Get posts successfully."}, posts, cursor, request.user, options
+                )
+
+            page = paginate(posts, cursor, page_size)
 
             return JsonResponse(
                 {
                     "message": "Get posts successfully.",
-                    "posts": [post.serialize(user=request.user) for post in posts],
+                    "posts": Post.serialize_many(
+                        page.items,
+                        user=request.user,
+                        latest_comments=options.latest_comments,
+                        fields=options.fields,
+                    ),
+                    "next": page.next,
+                    "prev": page.prev,
                 },
                 status=200,
             )
@@ -209,24 +221,32 @@ def posts(request):
         return JsonResponse({"error": "Only accept GET and POST method."}, status=400)
 
 
+@condition(etag_func=etags.post_etag)
 def post_detail(request, post_id):
 
     # Get post detail
     if request.method == "GET":
         try:
-            post = (
-                Post.objects.select_related("created_by")
-                .prefetch_related("likes", "comments")
-                .get(pk=post_id)
-            )
+            options = get_feed_options(request.GET)
+        except FeedOptionsError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        try:
+            post = Post.objects.select_related("created_by").get(pk=post_id)
 
             if post.is_deleted:
                 return JsonResponse(
                     {"error": "This post has been deleted by the author."}, status=410
                 )
 
+            [serialized] = Post.serialize_many(
+                [post],
+                user=request.user,
+                latest_comments=options.latest_comments,
+                fields=options.fields,
+            )
             return JsonResponse(
-                {"message": "Get post successfully.", "post": post.serialize(user=request.user)},
+                {"message": "Get post successfully.", "post": serialized},
                 status=200,
             )
 
@@ -260,10 +280,10 @@ def post_detail(request, post_id):
             if not content:
                 return JsonResponse({"error": "Post content cannot be blank."}, status=400)
 
-            # Save post content
+            # Save post content, leaving the counters to concurrent likes and comments
             with transaction.atomic():
                 post.content = content
-                post.save()
+                post.save(update_fields=["content", "updated_at"])
 
             return JsonResponse(
                 {
@@ -307,8 +327,12 @@ def post_detail(request, post_id):
 
             # Save post deletion state
             with transaction.atomic():
+                # Deleting again keeps the original time, which starts the retention period
+                if not post.is_deleted:
+                    post.deleted_at = timezone.now()
                 post.is_deleted = True
-                post.save()
+                post.save(update_fields=["is_deleted", "deleted_at", "updated_at"])
+                timeline.tombstone(post)
 
             return JsonResponse(
                 {
@@ -333,93 +357,106 @@ def post_detail(request, post_id):
         return JsonResponse({"error": "Only accept GET, PATCH and DELETE methods."}, status=400)
 
 
+@rate_limit("like")
 def like(request, post_id):
 
     # Check if user is authenticated for both POST and DELETE
     if not request.user.is_authenticated:
         return JsonResponse({"error": "You must be logged in to like posts."}, status=401)
 
-    # Check if post exists
-    try:
-        post = Post.objects.get(pk=post_id)
-    except Post.DoesNotExist:
-        return JsonResponse({"error": "Post not found."}, status=404)
-
-    # Like a post
-    if request.method == "POST":
-        # Check if already liked
-        if Like.objects.filter(user=request.user, post=post).exists():
-            return JsonResponse({"error": "You have already liked this post."}, status=400)
-
-        # Create new like
-        try:
-            Like.objects.create(user=request.user, post=post)
-            return JsonResponse({"message": "Post liked successfully."}, status=200)
-
-        except IntegrityError:
-            return JsonResponse(
-                {"error": "Data integrity error, please check your input."}, status=400
-            )
-        except ValidationError as e:
-            return JsonResponse({"error": f'Validation error: {str(e).strip("[]\'")}'}, status=400)
-        except DatabaseError:
-            return JsonResponse(
-                {"error": "Database operation error, please try again later."},
-                status=500,
-            )
-        except Exception as e:
-            return JsonResponse({"error": str(e)}, status=500)
+    # Invalid method
+    if request.method not in ("POST", "DELETE"):
+        return JsonResponse({"error": "Only accept POST and DELETE methods."}, status=405)
 
-    # Unlike a post
-    elif request.method == "DELETE":
-        # Check if like exists
-        like = Like.objects.filter(user=request.user, post=post)
-        if not like.exists():
-            return JsonResponse({"error": "You have not liked this post."}, status=400)
+    # Liking a liked post or unliking an unliked one changes nothing and still succeeds
+    try:
+        if request.method == "POST":
+            likes_count = likes.add_like(request.user, post_id)
+            message = "Post liked successfully."
+        else:
+            likes_count = likes.remove_like(request.user, post_id)
+            message = "Post unliked successfully."
+
+    except LockTimeout as e:
+        return JsonResponse({"error": str(e)}, status=409)
+    except IntegrityError:
+        return JsonResponse({"error": "Data integrity error, please check your input."}, status=400)
+    except DatabaseError:
+        return JsonResponse(
+            {"error": "Database operation error, please try again later."},
+            status=500,
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
 
-        # Remove like
-        try:
-            like.delete()
-            return JsonResponse({"message": "Post unliked successfully."}, status=200)
-        except DatabaseError:
-            return JsonResponse({"error": "Database operation error."}, status=500)
-        except Exception as e:
-            return JsonResponse({"error": str(e)}, status=500)
+    # Check if post exists
+    if likes_count is None:
+        return JsonResponse({"error": "Post not found."}, status=404)
 
-    # Invalid method
-    return JsonResponse({"error": "Only accept POST and DELETE methods."}, status=405)
+    return JsonResponse(
+        {
+            "message": message,
+            "likes_count": likes_count,
+            "is_liked": request.method == "POST",
+        },
+        status=200,
+    )
 
 
+@condition(etag_func=etags.user_etag)
 def user_detail(request, username):
     # Get user detail
     if request.method == "GET":
         try:
-            user = User.objects.get(username=username)
-            is_following = False
-
-            if request.user.is_authenticated:
-                is_following = Following.objects.filter(
-                    follower=request.user, following=user
-                ).exists()
-
-            posts = (
-                Post.objects.filter(created_by=user, is_deleted=False)
-                .select_related("created_by")
-                .prefetch_related("likes", "comments")
-                .order_by("-created_at")
+            cursor, page_size = get_page_params(request.GET)
+            options = get_feed_options(request.GET)
+        except (PaginationError, FeedOptionsError) as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        try:
+            # Counters are stored columns, so the header is a single query
+            user = (
+                User.with_is_following(request.user)
+                .only("username", "email", "following_count", "follower_count")
+                .get(username=username)
             )
 
+            header = {
+                "username": user.username,
+                "email": user.email,
+                "following_count": user.following_count,
+                "follower_count": user.follower_count,
+                "is_following": user.is_following,
+            }
+
+            posts = Post.objects.select_related("created_by").filter(NOT_DELETED, created_by=user)
+            if options.stream:
+                return stream_posts(
+                    {"message": "Get user detail successfully.", "user": header},
+                    posts,
+                    cursor,
+                    request.user,
+                    options,
+                )
+
+            page = paginate(posts, cursor, page_size)
+
             return JsonResponse(
                 {
                     "message": "Get user detail successfully.",
-                    "user": {
-                        "username": user.username,
-                        "email": user.email,
-                        "following_count": user.following_count,
-                        "follower_count": user.follower_count,
-                        "is_following": is_following,
-                    },
-                    "posts": [post.serialize() for post in posts] if posts else None,
+                    "user": header,
+                    "posts": (
+                        Post.serialize_many(
+                            page.items,
+                            user=request.user,
+                            latest_comments=options.latest_comments,
+                            fields=options.fields,
+                        )
+                        if page.items
+                        else None
+                    ),
+                    "next": page.next,
+                    "prev": page.prev,
                 },
                 status=200,
             )
@@ -435,6 +472,55 @@ def user_detail(request, username):
     return JsonResponse({"error": "Only accept GET methods."}, status=405)
 
 
+@condition(etag_func=etags.follows_etag)
+def user_followers(request, username):
+    return follow_list(request, username, "followers")
+
+
+@condition(etag_func=etags.follows_etag)
+def user_following(request, username):
+    return follow_list(request, username, "following")
+
+
+def follow_list(request, username, relation):
+    """
+    Page of a user's followers or followings, newest first
+    :param relation: "followers" or "following"
+    """
+    # Invalid method
+    if request.method != "GET":
+        return JsonResponse({"error": "Only accept GET methods."}, status=405)
+
+    try:
+        cursor, page_size = get_page_params(request.GET)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        user_id = User.objects.filter(username=username).values_list("pk", flat=True).first()
+        if user_id is None:
+            return JsonResponse({"error": "User not found."}, status=404)
+
+        # is_followed_by_viewer is an EXISTS in the page query, not a query per user
+        page = paginate(follows.connections(relation, user_id, request.user), cursor, page_size)
+
+        return JsonResponse(
+            {
+                "message": f"Get {relation} successfully.",
+                "users": [follows.serialize_connection(row, relation) for row in page.items],
+                "next": page.next,
+                "prev": page.prev,
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse({"error": "Database operation failed."}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
+
+
+@rate_limit("follow")
 def follow(request, username):
 
     user = request.user
@@ -466,6 +552,12 @@ def follow(request, username):
         try:
             with transaction.atomic():
                 Following.objects.create(follower=user, following=target_user)
+                User.adjust_counters(user.pk, following_count=1)
+                User.adjust_counters(target_user.pk, follower_count=1)
+                timeline.follow(user, target_user)
+
+            user.refresh_from_db(fields=["following_count"])
+            target_user.refresh_from_db(fields=["follower_count"])
 
             return JsonResponse(
                 {
@@ -496,12 +588,18 @@ def follow(request, username):
     elif request.method == "DELETE":
         try:
             with transaction.atomic():
-                following = Following.objects.filter(follower=user, following=target_user)
+                # Count only what this request deleted, so concurrent unfollows decrement once
+                deleted, _ = Following.objects.filter(follower=user, following=target_user).delete()
 
-                if not following.exists():
+                if not deleted:
                     return JsonResponse({"error": "You are not following this user."}, status=400)
 
-                following.delete()
+                User.adjust_counters(user.pk, following_count=-deleted)
+                User.adjust_counters(target_user.pk, follower_count=-deleted)
+                timeline.unfollow(user, target_user)
+
+            user.refresh_from_db(fields=["following_count"])
+            target_user.refresh_from_db(fields=["follower_count"])
 
             return JsonResponse(
                 {
@@ -527,6 +625,187 @@ def follow(request, username):
         return JsonResponse({"error": "Only accept POST and DELETE method."}, status=400)
 
 
+@rate_limit("follow")
+def batch_follow(request):
+
+    user = request.user
+
+    # Check if user is authenticated
+    if not user.is_authenticated:
+        return JsonResponse(
+            {"error": "You must be logged in to view following posts, follow/unfollow users."},
+            status=401,
+        )
+
+    # Invalid method
+    if request.method not in ("POST", "DELETE"):
+        return JsonResponse({"error": "Only accept POST and DELETE method."}, status=400)
+
+    # Check if JSON data valid
+    try:
+        usernames = follows.get_usernames(json.loads(request.body))
+    except json.JSONDecodeError:
+        return JsonResponse({"error": "Invalid JSON data."}, status=400)
+    except follows.BatchError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    # Check if user is among the targets
+    if user.username in usernames:
+        return JsonResponse({"error": "You can not follow/unfollow yourself."}, status=403)
+
+    # Users already followed or not followed are skipped rather than rejected
+    try:
+        if request.method == "POST":
+            result = follows.follow_many(user, usernames)
+            message = "Follow users successfully."
+            changed, unchanged = "followed", "already_following"
+        else:
+            result = follows.unfollow_many(user, usernames)
+            message = "Unfollow users successfully."
+            changed, unchanged = "unfollowed", "not_following"
+
+    except IntegrityError:
+        return JsonResponse({"error": "Data integrity error, please check your input."}, status=400)
+    except DatabaseError:
+        return JsonResponse(
+            {"error": "Database operation error, please try again later."},
+            status=500,
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+    return JsonResponse(
+        {
+            "message": message,
+            "data": {
+                changed: result.changed,
+                unchanged: result.unchanged,
+                "not_found": result.not_found,
+                "following_count": result.following_count,
+                "target_user_followers": result.follower_counts,
+            },
+        },
+        status=200,
+    )
+
+
+def trending_posts(request):
+
+    # Invalid method
+    if request.method != "GET":
+        return JsonResponse({"error": "Only accept GET methods."}, status=405)
+
+    try:
+        count = get_page_size(request.GET)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return JsonResponse(
+            {
+                "message": "Get trending posts successfully.",
+                "posts": trending.load(request.user, count),
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse(
+            {"error": "Database operation error, please try again later."},
+            status=500,
+        )
+    except Exception as e:
+        return JsonResponse({"error": str(e)}, status=500)
+
+
+def metrics_view(request):
+
+    # Invalid method
+    if request.method != "GET":
+        return JsonResponse({"error": "Only accept GET methods."}, status=405)
+
+    # Metrics name every view and show how loaded each is
+    if not request.user.is_staff:
+        return JsonResponse({"error": "Only staff can view metrics."}, status=403)
+
+    return JsonResponse(
+        {
+            "message": "Get metrics successfully.",
+            "sample_rate": metrics.sample_rate(),
+            "views": metrics.snapshot(),
+        },
+        status=200,
+    )
+
+
+def search_view(request):
+
+    # Invalid method
+    if request.method != "GET":
+        return JsonResponse({"error": "Only accept GET methods."}, status=405)
+
+    if not search.is_supported():
+        return JsonResponse({"error": "Search is not available on this database."}, status=501)
+
+    try:
+        query, kinds, offset = search.get_search_params(request.GET)
+        page_size = get_page_size(request.GET)
+    except (search.SearchError, PaginationError) as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        # One extra match tells whether another page exists
+        matches = search.search(query, kinds, offset, page_size + 1)
+        has_next = len(matches) > page_size and offset + page_size < search.MAX_OFFSET
+
+        return JsonResponse(
+            {
+                "message": "Search successfully.",
+                "results": search.load(matches[:page_size], request.user),
+                "next": search.encode_cursor(offset + page_size) if has_next else None,
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse({"error": "Database operation failed."}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
+
+
+def suggested_users(request):
+
+    # Check if user is authenticated
+    if not request.user.is_authenticated:
+        return JsonResponse({"error": "You must be logged in to view suggestions."}, status=401)
+
+    # Invalid method
+    if request.method != "GET":
+        return JsonResponse({"error": "Only accept GET methods."}, status=405)
+
+    try:
+        count = get_page_size(request.GET)
+    except PaginationError as e:
+        return JsonResponse({"error": str(e)}, status=400)
+
+    try:
+        return JsonResponse(
+            {
+                "message": "Get suggestions successfully.",
+                "users": [
+                    suggestions.serialize(suggestion)
+                    for suggestion in suggestions.for_user(request.user, count)
+                ],
+            },
+            status=200,
+        )
+
+    except DatabaseError:
+        return JsonResponse({"error": "Database operation failed."}, status=500)
+    except Exception as e:
+        return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
+
+
 def posts_following(request):
     user = request.user
 
@@ -540,21 +819,46 @@ def posts_following(request):
     # Get following posts
     if request.method == "GET":
         try:
-            following_users = Following.objects.filter(follower=user).values_list(
-                "following", flat=True
-            )
+            cursor, page_size = get_page_params(request.GET)
+            options = get_feed_options(request.GET)
+        except (PaginationError, FeedOptionsError) as e:
+            return JsonResponse({"error": str(e)}, status=400)
 
-            posts = (
-                Post.objects.select_related("created_by")
-                .prefetch_related("likes", "comments")
-                .filter(created_by__in=following_users, is_deleted=False)
-                .order_by("-created_at")
-            )
+        try:
+            # The stream reads followed authors directly, which the timeline only mirrors
+            if timeline.is_enabled() and not options.stream:
+                posts = Post.objects.select_related("created_by")
+                page = timeline.home_page(user, posts, cursor, page_size)
+            else:
+                following_users = Following.objects.filter(follower=user).values_list(
+                    "following", flat=True
+                )
+
+                posts = Post.objects.select_related("created_by").filter(
+                    NOT_DELETED, created_by__in=following_users
+                )
+                if options.stream:
+                    return stream_posts(
+                        {"message": "Get following posts successfully."},
+                        posts,
+                        cursor,
+                        user,
+                        options,
+                    )
+
+                page = paginate(posts, cursor, page_size)
 
             return JsonResponse(
                 {
                     "message": "Get following posts successfully.",
-                    "posts": [post.serialize() for post in posts],
+                    "posts": Post.serialize_many(
+                        page.items,
+                        user=request.user,
+                        latest_comments=options.latest_comments,
+                        fields=options.fields,
+                    ),
+                    "next": page.next,
+                    "prev": page.prev,
                 },
                 status=200,
             )
@@ -575,6 +879,8 @@ def posts_following(request):
         return JsonResponse({"error": "Only accept GET method."}, status=400)
 
 
+@rate_limit("comment")
+@condition(etag_func=etags.comments_etag)
 def comments(request, post_id):
     # Check if post exists
     try:
@@ -585,16 +891,30 @@ def comments(request, post_id):
     # Get comments
     if request.method == "GET":
         try:
-            comments = (
-                Comment.objects.select_related("created_by")
-                .filter(post=post, is_deleted=False)
-                .order_by("-created_at")
-            )
+            # Polling clients only ask for comments newer than the latest one they have
+            if request.GET.get("since"):
+                cursor, page_size = get_since_params(request.GET)
+            else:
+                cursor, page_size = get_page_params(request.GET)
+        except PaginationError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+        try:
+            comments = Comment.objects.select_related("created_by").filter(NOT_DELETED, post=post)
+            page = paginate(comments, cursor, page_size)
+
+            if page.items:
+                latest = encode_cursor(page.items[0], "prev")
+            else:
+                latest = request.GET.get("since")
 
             return JsonResponse(
                 {
                     "message": "Get comments successfully.",
-                    "comments": [comment.serialize() for comment in comments],
+                    "comments": [comment.serialize() for comment in page.items],
+                    "next": page.next,
+                    "prev": page.prev,
+                    "latest": latest,
                 },
                 status=200,
             )
@@ -630,9 +950,12 @@ def comments(request, post_id):
 
         # Create new comment
         try:
-            comment = Comment.objects.create(
-                created_by=request.user, post=post, content=data.get("content")
-            )
+            with transaction.atomic():
+                comment = Comment.objects.create(
+                    created_by=request.user, post=post, content=data.get("content")
+                )
+                Post.adjust_counters(post.pk, comments_count=1)
+                trending.record(post.pk, trending.COMMENT_WEIGHT)
 
             return JsonResponse(
                 {
@@ -677,10 +1000,10 @@ def comment_detail(request, comment_id):
             if not content:
                 return JsonResponse({"error": "Comment content can not be blank."}, status=400)
 
-            # Save comment content
+            # Save comment content, so an edit racing a delete does not restore the comment
             with transaction.atomic():
                 comment.content = content
-                comment.save()
+                comment.save(update_fields=["content"])
 
             return JsonResponse(
                 {
@@ -718,10 +1041,15 @@ def comment_detail(request, comment_id):
             if comment.created_by != request.user:
                 return JsonResponse({"error": "You can only delete your own comments."}, status=403)
 
-            # Save comment deletion state
+            # Save comment deletion state, decrementing only if this request deleted it
             with transaction.atomic():
-                comment.is_deleted = True
-                comment.save()
+                if Comment.objects.filter(pk=comment.pk, is_deleted=False).update(
+                    is_deleted=True, deleted_at=timezone.now()
+                ):
+                    Post.adjust_counters(comment.post_id, comments_count=-1)
+                # update() sends no signals; saving the stored state retires the caches
+                comment.refresh_from_db(fields=["is_deleted", "deleted_at"])
+                comment.save(update_fields=["is_deleted", "deleted_at"])
 
             return JsonResponse(
                 {
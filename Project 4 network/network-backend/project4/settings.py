@@ -42,12 +42,13 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    "network.middleware.InstrumentationMiddleware",
     "corsheaders.middleware.CorsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
     "django.middleware.csrf.CsrfViewMiddleware",
-    "django.contrib.auth.middleware.AuthenticationMiddleware",
+    "network.middleware.CachedAuthenticationMiddleware",
     "django.contrib.messages.middleware.MessageMiddleware",
     "django.middleware.clickjacking.XFrameOptionsMiddleware",
 ]
@@ -83,6 +84,117 @@ DATABASES = {
     }
 }
 
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+# Use a shared backend (Redis, Memcached) when running more than one worker process
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "network",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+    "sessions": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+        "LOCATION": "network-sessions",
+        "OPTIONS": {"MAX_ENTRIES": 10000},
+    },
+}
+
+# Sessions
+# https://docs.djangoproject.com/en/5.2/topics/http/sessions/#using-cached-sessions
+# Sessions are read from their own cache and written through to the database, so evicting
+# post payloads never evicts sessions. A logout only clears the session from the cache of
+# the worker that served it, so point the "sessions" cache at a shared backend (Redis,
+# Memcached, or FileBasedCache on a single host) when running more than one worker process.
+
+SESSION_ENGINE = "django.contrib.sessions.backends.cached_db"
+SESSION_CACHE_ALIAS = "sessions"
+
+# Home timeline
+# When enabled, new posts are written into each follower's timeline (fan-out-on-write)
+# instead of being gathered from followed users on every read. Authors with at least
+# NETWORK_TIMELINE_FANOUT_LIMIT followers are still gathered on read.
+
+NETWORK_TIMELINE_ENABLED = False
+NETWORK_TIMELINE_FANOUT_LIMIT = 1000
+NETWORK_TIMELINE_BACKFILL_LIMIT = 200
+
+# Async views
+# Serve the read endpoints with native async views (network/async_views.py). Enable when
+# running under ASGI (uvicorn, daphne); under WSGI each async view costs an event loop.
+
+NETWORK_ASYNC_VIEWS = False
+
+# Like buffer
+# When enabled, likes and unlikes are accepted into a write-behind buffer in the cache and
+# written to the database in batches by `manage.py flush_likes --interval 1`. Reads add the
+# buffered changes, so counts look immediate. The cache must be shared by every worker and
+# must not evict entries, so point NETWORK_LIKE_BUFFER_CACHE at e.g. Redis with noeviction;
+# `manage.py check` refuses a LocMemCache. An entry missing for a minute is skipped as lost.
+
+NETWORK_LIKE_BUFFER_ENABLED = False
+NETWORK_LIKE_BUFFER_CACHE = "default"
+
+# Who-to-follow suggestions
+# When enabled, follows and unfollows queue the follower for `manage.py recompute_suggestions`,
+# which stores up to NETWORK_SUGGESTIONS_LIMIT friends-of-friends per user, ranked by
+# mutual follows and then recency. Run it periodically, e.g. with --interval 300.
+
+NETWORK_SUGGESTIONS_ENABLED = False
+NETWORK_SUGGESTIONS_LIMIT = 20
+
+# Trending posts
+# Likes and comments add to a post's score, which halves every NETWORK_TRENDING_HALF_LIFE
+# seconds. `manage.py refresh_trending --interval 60` caches the NETWORK_TRENDING_SIZE best
+# posts created in the last NETWORK_TRENDING_WINDOW seconds for /api/posts/trending. The
+# ranking expires after NETWORK_TRENDING_CACHE_TIMEOUT seconds, so a request refreshes it if
+# the worker stops; counters and is_liked are read live on every request.
+
+NETWORK_TRENDING_HALF_LIFE = 21600  # 6 hours in seconds
+NETWORK_TRENDING_WINDOW = 259200  # 3 days in seconds
+NETWORK_TRENDING_SIZE = 50
+NETWORK_TRENDING_CACHE_TIMEOUT = 300  # 5 minutes in seconds
+
+# Session user cache
+# CachedAuthenticationMiddleware keeps each session's user in the cache for up to
+# NETWORK_AUTH_CACHE_TIMEOUT seconds, so with cached sessions an authenticated request needs
+# no query before the view. Follows, unfollows, saves of the user and logging out retire it.
+# Set to 0 to load the user on every request.
+
+NETWORK_AUTH_CACHE_TIMEOUT = 300  # 5 minutes in seconds
+
+# Rate limits
+# When enabled, creating posts and comments, liking and following are limited per user, or
+# per client address for anonymous requests, to (requests, seconds) of each scope below and
+# answered with 429 and Retry-After beyond it. Buckets live in NETWORK_RATE_LIMIT_CACHE;
+# with more than one worker process it must be shared, or each process has its own buckets.
+
+NETWORK_RATE_LIMIT_ENABLED = False
+NETWORK_RATE_LIMIT_CACHE = "default"
+NETWORK_RATE_LIMITS = {
+    "post": (10, 60),
+    "comment": (30, 60),
+    "like": (120, 60),
+    "follow": (60, 60),
+}
+
+# Instrumentation
+# A NETWORK_METRICS_SAMPLE_RATE fraction of requests record their query count, SQL time,
+# post serialization time and response size, answer with a Server-Timing header, and feed
+# the rolling percentiles of the last NETWORK_METRICS_WINDOW requests of each view served
+# to staff at /api/metrics. Each process keeps its own samples; 0 turns this off.
+
+NETWORK_METRICS_SAMPLE_RATE = 0.01
+NETWORK_METRICS_WINDOW = 1000
+
+# Archiving
+# Soft-deleted posts and comments stay in place for NETWORK_ARCHIVE_RETENTION_DAYS, so a
+# deletion can still be reverted by hand, then `manage.py archive_deleted` moves them into
+# the ArchivedPost and ArchivedComment tables in short batches. Run it daily, e.g. from cron.
+
+NETWORK_ARCHIVE_RETENTION_DAYS = 30
+
 AUTH_USER_MODEL = "network.User"
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"